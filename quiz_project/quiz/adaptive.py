@@ -0,0 +1,398 @@
+"""
+Adaptive question selection (``QUIZ_ADAPTIVE_SELECTION = True``).
+
+Each question gets a weight per user from their QuestionMastery row.
+Unseen questions get a fixed weight. Questions the user keeps missing
+weigh more, and questions answered correctly several times in a row weigh
+less. The weight grows again with the time since the question was last
+answered. A quiz draws questions without replacement in proportion to
+their weights.
+
+Each topic's question IDs (its layout) are loaded once per process and
+shared by every user. A user's weights only cover the questions they have
+answered: those live in a Fenwick (binary indexed) tree over the m
+answered questions, kept in a process-local LRU, and every other question
+weighs UNSEEN_WEIGHT. Building a user's weights costs O(m), drawing k
+questions O(k log m) (unseen ones are drawn by rejection from the layout),
+and a graded submission updates the tree in place in O(log m) per answer.
+The weights are rebuilt from the mastery table (never from the result
+history) when:
+- it is first needed
+- the question bank changes (answer_key.bank_generation)
+- another worker recorded answers for the user (a per-user version number
+  in the shared cache)
+- it is older than ``QUIZ_ADAPTIVE_TREE_TIMEOUT``, which refreshes the
+  time-based part of the weights
+"""
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .answer_key import bank_generation
+from .models import QuestionMastery
+from .question_pool import (
+    asample_questions, fetch_questions, get_question_ids, get_topic_counts, invalidate_question_pool,
+    sample_questions,
+)
+
+VERSION_CACHE_KEY = 'quiz:adaptive:version:{user_id}'
+
+UNSEEN_WEIGHT = 1.0
+
+_lock = threading.Lock()
+_layouts = {}
+_weights = OrderedDict()
+
+
+def adaptive_enabled():
+    """Whether quizzes are drawn by the adaptive engine."""
+    return getattr(settings, 'QUIZ_ADAPTIVE_SELECTION', False)
+
+
+def mastery_weight(attempts, correct, streak, last_answered, now):
+    """
+    Selection weight of a question for one user.
+
+    Args:
+        attempts (int): Times the user answered the question
+        correct (int): Times they were right
+        streak (int): Consecutive right answers
+        last_answered (datetime): When they last answered it
+        now (datetime): Current time
+
+    Returns:
+        float: Weight; UNSEEN_WEIGHT for unseen questions
+    """
+    if not attempts:
+        return UNSEEN_WEIGHT
+    accuracy = (correct + 1) / (attempts + 2)  # smoothed, so one answer is not final
+    days = max(0.0, (now - last_answered).total_seconds() / 86400)
+    return (0.1 + 4 * (1 - accuracy)) / (1 + streak) * (1 + min(days, 28) / 7)
+
+
+class FenwickTree:
+    """
+    Prefix sums over non-negative weights with O(log n) updates and search.
+
+    Attributes:
+        weights (array): Current weight of each position
+        total (float): Sum of all weights
+    """
+
+    def __init__(self, weights):
+        self.weights = array('d', weights)
+        size = len(self.weights)
+        self._tree = array('d', [0.0]) * (size + 1)
+        for index, weight in enumerate(self.weights, start=1):
+            self._tree[index] += weight
+            parent = index + (index & -index)
+            if parent <= size:
+                self._tree[parent] += self._tree[index]
+        self.total = sum(self.weights)
+        self._top = (1 << size.bit_length()) >> 1  # largest power of two <= size
+
+    def __len__(self):
+        return len(self.weights)
+
+    def append(self, weight):
+        """Adds a position with ``weight`` after the last one."""
+        self.weights.append(weight)
+        index = len(self.weights)
+        # The new node sums the positions (index - lowest bit, index]; its
+        # children already hold all of them but the new one.
+        node, child, low = weight, index - 1, index - (index & -index)
+        while child > low:
+            node += self._tree[child]
+            child -= child & -child
+        self._tree.append(node)
+        self.total += weight
+        self._top = (1 << index.bit_length()) >> 1
+
+    def set(self, position, weight):
+        """Changes the weight of one position."""
+        delta = weight - self.weights[position]
+        if not delta:
+            return
+        self.weights[position] = weight
+        self.total += delta
+        index = position + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def find(self, target):
+        """Returns the position whose cumulative weight range holds ``target``."""
+        position, step = 0, self._top
+        while step:
+            candidate = position + step
+            if candidate < len(self._tree) and self._tree[candidate] <= target:
+                position = candidate
+                target -= self._tree[candidate]
+            step >>= 1
+        return min(position, len(self.weights) - 1)
+
+    def sample(self, count, rng=random):
+        """
+        Draws up to ``count`` distinct positions in proportion to their weights.
+
+        Drawn positions are zeroed while sampling and restored afterwards.
+
+        Returns:
+            list: Drawn positions, in draw order
+        """
+        drawn = {}
+        try:
+            while len(drawn) < count and self.total > 1e-9:
+                position = self.find(rng.random() * self.total)
+                if self.weights[position] <= 0:
+                    # Rounding left the target on an emptied position.
+                    self.total = sum(self.weights)
+                    continue
+                drawn[position] = self.weights[position]
+                self.set(position, 0.0)
+        finally:
+            for position, weight in drawn.items():
+                self.set(position, weight)
+        return list(drawn)
+
+
+class _Layout:
+    """Question IDs of one topic and their positions in the trees."""
+
+    def __init__(self, generation, question_ids):
+        self.generation = generation
+        self.question_ids = list(question_ids)
+        self.positions = {question_id: index for index, question_id in enumerate(self.question_ids)}
+
+
+class _UserWeights:
+    """
+    Cached weights of one user and topic.
+
+    Only the questions the user answered are held, as slots of a Fenwick
+    tree; the rest of the layout weighs UNSEEN_WEIGHT.
+    """
+
+    # Random picks tried before listing the unseen questions outright.
+    UNSEEN_TRIES = 32
+
+    def __init__(self, layout, version, weights):
+        self.layout = layout
+        self.version = version
+        self.seen = [question_id for question_id in weights if question_id in layout.positions]
+        self.slots = {question_id: slot for slot, question_id in enumerate(self.seen)}
+        self.tree = FenwickTree(weights[question_id] for question_id in self.seen)
+        self.built = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set(self, question_id, weight):
+        """Changes the weight of a question, giving it a slot if it was unseen."""
+        slot = self.slots.get(question_id)
+        if slot is not None:
+            self.tree.set(slot, weight)
+        elif question_id in self.layout.positions:
+            self.slots[question_id] = len(self.seen)
+            self.seen.append(question_id)
+            self.tree.append(weight)
+
+    def _draw_unseen(self, drawn, rng):
+        """Picks an unseen question not drawn yet, uniformly."""
+        question_ids = self.layout.question_ids
+        for _ in range(self.UNSEEN_TRIES):
+            question_id = question_ids[rng.randrange(len(question_ids))]
+            if question_id not in self.slots and question_id not in drawn:
+                return question_id
+        # The user has seen most of the topic.
+        return rng.choice([
+            question_id for question_id in question_ids
+            if question_id not in self.slots and question_id not in drawn
+        ])
+
+    def sample(self, count, rng=random):
+        """
+        Draws up to ``count`` distinct questions in proportion to their weights.
+
+        Returns:
+            list: Drawn question IDs, in draw order
+        """
+        unseen = len(self.layout.question_ids) - len(self.seen)
+        drawn_unseen = set()
+        drawn_slots = {}
+        drawn = []
+        try:
+            while len(drawn) < count:
+                unseen_total = (unseen - len(drawn_unseen)) * UNSEEN_WEIGHT
+                if unseen_total + self.tree.total <= 1e-9:
+                    break
+                target = rng.random() * (unseen_total + self.tree.total)
+                if target < unseen_total:
+                    question_id = self._draw_unseen(drawn_unseen, rng)
+                    drawn_unseen.add(question_id)
+                else:
+                    slot = self.tree.find(target - unseen_total)
+                    if self.tree.weights[slot] <= 0:
+                        # Rounding left the target on an emptied slot.
+                        self.tree.total = sum(self.tree.weights)
+                        continue
+                    drawn_slots[slot] = self.tree.weights[slot]
+                    self.tree.set(slot, 0.0)
+                    question_id = self.seen[slot]
+                drawn.append(question_id)
+        finally:
+            for slot, weight in drawn_slots.items():
+                self.tree.set(slot, weight)
+        return drawn
+
+
+def _layout(topic, generation):
+    """Returns the topic's layout for the current bank generation."""
+    layout = _layouts.get(topic)
+    if layout is None or layout.generation != generation:
+        layout = _layouts[topic] = _Layout(generation, get_question_ids(topic))
+    return layout
+
+
+def _load_weights(user_id, topic, layout, version):
+    """Builds a user's weights from their mastery rows."""
+    now = timezone.now()
+    rows = QuestionMastery.objects.filter(user_id=user_id, question__topic=topic).values_list(
+        'question_id', 'attempts', 'correct', 'streak', 'last_answered')
+    return _UserWeights(layout, version, {
+        question_id: mastery_weight(attempts, correct, streak, last_answered, now)
+        for question_id, attempts, correct, streak, last_answered in rows
+    })
+
+
+def _user_weights(user_id, topic):
+    """Returns up-to-date cached weights, rebuilding them when stale."""
+    generation = bank_generation()
+    version = cache.get(VERSION_CACHE_KEY.format(user_id=user_id), 0)
+    key = (user_id, topic)
+    max_age = getattr(settings, 'QUIZ_ADAPTIVE_TREE_TIMEOUT', 3600)
+    with _lock:
+        entry = _weights.get(key)
+        if entry is not None:
+            _weights.move_to_end(key)
+    if (
+        entry is None
+        or entry.layout.generation != generation
+        or entry.version != version
+        or time.monotonic() - entry.built > max_age
+    ):
+        entry = _load_weights(user_id, topic, _layout(topic, generation), version)
+        with _lock:
+            _weights[key] = entry
+            _weights.move_to_end(key)
+            while len(_weights) > getattr(settings, 'QUIZ_ADAPTIVE_CACHE_SIZE', 1024):
+                _weights.popitem(last=False)
+    return entry
+
+
+def select_questions(user, topic, count):
+    """
+    Draws questions for a user, weighted by what they need to practise.
+
+    Args:
+        user (User): User taking the quiz
+        topic (str): Topic code
+        count (int): Number of questions wanted
+
+    Returns:
+        list: Question instances in draw order, or None if the topic does
+        not hold enough questions
+    """
+    if get_topic_counts().get(topic, 0) < count:
+        return None
+    entry = _user_weights(user.pk, topic)
+    if len(entry.layout.question_ids) < count:
+        return None
+    with entry.lock:
+        selected_ids = entry.sample(count)
+    questions = fetch_questions(selected_ids)
+    if len(questions) < count:
+        # The pool referenced deleted questions; fall back to a fresh pool.
+        invalidate_question_pool(topic)
+        return sample_questions(topic, count)
+    return [questions[question_id] for question_id in selected_ids]
+
+
+def choose_questions(user, topic, count):
+    """Draws a quiz adaptively when enabled, uniformly otherwise."""
+    if adaptive_enabled():
+        return select_questions(user, topic, count)
+    return sample_questions(topic, count)
+
+
+async def achoose_questions(user, topic, count):
+    """Async variant of choose_questions."""
+    if adaptive_enabled():
+        return await sync_to_async(select_questions)(user, topic, count)
+    return await asample_questions(topic, count)
+
+
+def record_answers(user_id, answer_key, answers):
+    """
+    Folds a graded submission into the user's mastery rows and weights.
+
+    Does nothing unless adaptive selection is enabled.
+
+    Args:
+        user_id (int): Primary key of the user
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+    """
+    if not adaptive_enabled():
+        return
+    now = timezone.now()
+    outcomes = {
+        question_id: answers.get(question_id) == option
+        for question_id, option in answer_key.items()
+    }
+    if not outcomes:
+        return
+    right = [question_id for question_id, correct in outcomes.items() if correct]
+    QuestionMastery.objects.bulk_create(
+        [QuestionMastery(user_id=user_id, question_id=question_id, last_answered=now) for question_id in outcomes],
+        ignore_conflicts=True,
+    )
+    # One UPDATE with F-expressions, so concurrent submissions never lose an increment.
+    QuestionMastery.objects.filter(user_id=user_id, question_id__in=list(outcomes)).update(
+        attempts=F('attempts') + 1,
+        correct=F('correct') + Case(When(question_id__in=right, then=Value(1)), default=Value(0)),
+        streak=Case(When(question_id__in=right, then=F('streak') + 1), default=Value(0)),
+        last_answered=now,
+    )
+
+    key = VERSION_CACHE_KEY.format(user_id=user_id)
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+        version = cache.get(key, 0)
+
+    # Apply the change to this process's weights so they stay current.
+    with _lock:
+        entries = [entry for (cached_user, _), entry in _weights.items() if cached_user == user_id]
+    if not entries:
+        return
+    rows = QuestionMastery.objects.filter(user_id=user_id, question_id__in=list(outcomes)).values_list(
+        'question_id', 'attempts', 'correct', 'streak', 'last_answered')
+    weights = {
+        question_id: mastery_weight(attempts, correct, streak, last_answered, now)
+        for question_id, attempts, correct, streak, last_answered in rows
+    }
+    for entry in entries:
+        with entry.lock:
+            if entry.version != version - 1:
+                continue  # missed another worker's update; rebuilt on next use
+            for question_id, weight in weights.items():
+                entry.set(question_id, weight)
+            entry.version = version
@@ -1,3 +1,179 @@
-from django.contrib import admin
+"""
+Admin changelists for the question bank and quiz results.
 
-# Register your models here.
+Both are built for large tables: related rows are joined with
+``list_select_related`` instead of fetched per row, filters use indexed
+columns, and the results changelist never counts the whole table. Bulk
+actions run as single UPDATE statements rather than saving objects one by
+one.
+"""
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+from .answer_key import invalidate_answer_keys
+from .leaderboard import refresh_users as refresh_leaderboard_users
+from .models import Question, QuizAnswer, QuizResult, UserQuizStats, UserTopicStats
+from .question_pool import invalidate_question_pool
+from .search import search_question_ids
+from .snapshot import rebuild_snapshot_on_commit
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator that stops counting after COUNT_LIMIT rows.
+
+    ``COUNT(*)`` over millions of rows is a full scan, so the count runs on
+    ``LIMIT COUNT_LIMIT + 1`` instead; pages past the limit are not listed.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.COUNT_LIMIT + 1].count()
+
+
+class QuestionActionForm(ActionForm):
+    """Action bar with the target topic of the "move to topic" action."""
+    topic = forms.ChoiceField(
+        choices=[('', 'Target topic')] + Question.TOPIC_CHOICES,
+        required=False,
+    )
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    """Question bank, with each question's answer statistics."""
+    list_display = ('id', '__str__', 'topic', 'correct_option', 'answer_count', 'correct_rate')
+    list_filter = ('topic',)
+    list_select_related = ('stats',)
+    search_fields = ('text',)
+    search_help_text = 'Words of the text or options'
+    ordering = ('topic', 'id')
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+    action_form = QuestionActionForm
+    actions = ['move_to_topic']
+
+    def get_search_results(self, request, queryset, search_term):
+        """Looks the words up in the full-text index (quiz.search) instead of scanning every text."""
+        if not search_term.strip():
+            return queryset, False
+        ids = search_question_ids(search_term, limit=CappedCountPaginator.COUNT_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
+    @staticmethod
+    def _stats(question):
+        try:
+            return question.stats
+        except Question.stats.RelatedObjectDoesNotExist:
+            return None
+
+    @admin.display(description='Answers')
+    def answer_count(self, question):
+        """Times the question was answered."""
+        stats = self._stats(question)
+        return stats.attempts if stats else 0
+
+    @admin.display(description='Correct rate')
+    def correct_rate(self, question):
+        """Share of correct answers, as a percentage."""
+        stats = self._stats(question)
+        rate = stats.correct_rate() if stats else None
+        return '-' if rate is None else f'{rate * 100:.1f}%'
+
+    @admin.action(description='Move selected questions to the chosen topic')
+    def move_to_topic(self, request, queryset):
+        """Moves questions to the topic picked in the action bar with one UPDATE."""
+        topic = request.POST.get('topic')
+        if topic not in dict(Question.TOPIC_CHOICES):
+            self.message_user(request, 'Choose a target topic first.', messages.ERROR)
+            return
+        moved = queryset.update(topic=topic)
+        # update() sends no signals; refresh the cached pools, answers and snapshot here.
+        invalidate_question_pool()
+        invalidate_answer_keys()
+        rebuild_snapshot_on_commit()
+        self.message_user(request, f'Moved {moved} question(s) to {topic}.', messages.SUCCESS)
+
+
+class QuizAnswerInline(admin.TabularInline):
+    """Answers of one quiz attempt."""
+    model = QuizAnswer
+    extra = 0
+    raw_id_fields = ('question',)
+
+
+@admin.register(QuizResult)
+class QuizResultAdmin(admin.ModelAdmin):
+    """
+    Quiz results.
+
+    Filtering by user goes through an exact username search (served by the
+    unique index on username) rather than a list filter holding every user.
+    """
+    list_display = ('id', 'user', 'topic', 'date_taken', 'score', 'total_questions', 'percentage')
+    list_filter = ('topic', 'date_taken')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    search_help_text = 'Exact username'
+    date_hierarchy = 'date_taken'
+    ordering = ('-date_taken', '-id')
+    raw_id_fields = ('user',)
+    show_full_result_count = False
+    paginator = CappedCountPaginator
+    inlines = [QuizAnswerInline]
+    actions = ['rescore']
+
+    def get_search_results(self, request, queryset, search_term):
+        """Matches the username exactly; a case-insensitive match would skip its index."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(user__username=search_term), False
+
+    @admin.display(description='Percentage')
+    def percentage(self, result):
+        """Score as a percentage."""
+        return f'{result.percentage():.0f}%'
+
+    @admin.action(description='Re-score selected results from their stored answers')
+    def rescore(self, request, queryset):
+        """
+        Re-grades answers against the current answer key, then recomputes scores.
+
+        Runs as two UPDATE statements, one over the answers and one over the
+        results. Results stored without per-question answers are left alone.
+        The statistics and leaderboard entries of the affected users are
+        then recomputed from their results.
+        """
+        groups = set(queryset.order_by().values_list('user_id', 'topic').distinct())
+        with transaction.atomic():
+            QuizAnswer.objects.filter(result__in=queryset.values('pk')).update(
+                is_correct=Exists(Question.objects.filter(
+                    pk=OuterRef('question_id'), correct_option=OuterRef('chosen_option'),
+                )),
+            )
+            correct = (
+                QuizAnswer.objects.filter(result=OuterRef('pk'), is_correct=True)
+                .order_by().values('result').annotate(count=Count('id')).values('count')
+            )
+            rescored = queryset.filter(Exists(QuizAnswer.objects.filter(result=OuterRef('pk')))).update(
+                score=Coalesce(Subquery(correct), Value(0)),
+            )
+            user_ids = {user_id for user_id, _ in groups}
+            for user_id in user_ids:
+                UserQuizStats.refresh_for_user(user_id)
+            for user_id, topic in groups:
+                UserTopicStats.refresh(user_id=user_id, topic=topic)
+            refresh_leaderboard_users(user_ids)
+        self.message_user(
+            request,
+            f'Re-scored {rescored} result(s). Run rebuild_question_stats to refresh the question statistics.',
+            messages.SUCCESS,
+        )
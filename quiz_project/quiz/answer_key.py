@@ -0,0 +1,276 @@
+"""
+Answer-key cache used to grade quiz submissions.
+
+Grading only needs each question's correct option. The mapping lives in a
+process-local dict, backed by the shared Django cache and finally by the
+database. Every cache entry is scoped by the bank's generation token, kept
+in the QuestionBankVersion row. Changing the bank replaces the token in the
+same transaction, which invalidates the shared entries and the local dicts
+of every worker once it commits. Workers re-read the token at most every
+QUIZ_BANK_VERSION_CHECK_INTERVAL seconds, so other processes pick up a
+change within that interval; the process making the change forgets its
+token at once and again on commit.
+
+When a question snapshot is loaded (quiz.snapshot), answers are read from
+it first; only questions missing from it go through the caches.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .models import Question, QuestionBankVersion
+from .snapshot import get_snapshot
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_KEY = 'quiz:answer_key:{generation}:{question_id}'
+
+_lock = threading.Lock()
+_local_answers = {}
+_local_generation = None
+_checked_generation = None  # (token, time.monotonic() of the read)
+
+
+def _timeout():
+    """Seconds an answer may live in the shared cache."""
+    return getattr(settings, 'QUIZ_ANSWER_KEY_TIMEOUT', 3600)
+
+
+def _check_interval():
+    """Seconds a worker may use the token it last read."""
+    return getattr(settings, 'QUIZ_BANK_VERSION_CHECK_INTERVAL', 1)
+
+
+def _checked():
+    """Returns the token read less than a check interval ago, or None."""
+    with _lock:
+        if _checked_generation is not None:
+            token, checked_at = _checked_generation
+            if time.monotonic() - checked_at < _check_interval():
+                return token
+    return None
+
+
+def _store_checked(token):
+    """Remembers a freshly read token."""
+    global _checked_generation
+    with _lock:
+        _checked_generation = (token, time.monotonic())
+    return token
+
+
+def _unreadable():
+    """Falls back to the last known token when the version row cannot be read."""
+    logger.warning("Could not read the question bank version", exc_info=True)
+    with _lock:
+        return _checked_generation[0] if _checked_generation else ''
+
+
+def _forget_generation():
+    """Makes the next lookup re-read the token."""
+    global _checked_generation
+    with _lock:
+        _checked_generation = None
+
+
+def _current_generation():
+    """Returns the bank's generation token, re-reading it once per check interval."""
+    token = _checked()
+    if token is None:
+        try:
+            token = _store_checked(QuestionBankVersion.current())
+        except DatabaseError:
+            token = _unreadable()
+    return token
+
+
+async def _acurrent_generation():
+    """Async variant of _current_generation."""
+    token = _checked()
+    if token is None:
+        try:
+            token = _store_checked(await QuestionBankVersion.acurrent())
+        except DatabaseError:
+            token = _unreadable()
+    return token
+
+
+def _sync_local(generation):
+    """Drops the local answers if the bank changed since they were loaded."""
+    global _local_generation
+    if generation != _local_generation:
+        _local_answers.clear()
+        _local_generation = generation
+
+
+def _local_lookup(generation, question_ids):
+    """Returns the answers of ``question_ids`` held by this process."""
+    with _lock:
+        _sync_local(generation)
+        return {
+            question_id: _local_answers[question_id]
+            for question_id in question_ids
+            if question_id in _local_answers
+        }
+
+
+def _remember(generation, answers):
+    """Keeps answers loaded from the shared cache or database in this process."""
+    with _lock:
+        if generation == _local_generation:
+            _local_answers.update(answers)
+
+
+def _shared_keys(generation, question_ids):
+    """Maps shared cache keys back to the question IDs they hold."""
+    return {
+        ANSWER_CACHE_KEY.format(generation=generation, question_id=question_id): question_id
+        for question_id in question_ids
+    }
+
+
+def get_answer_key(question_ids):
+    """
+    Maps question IDs to their correct option.
+
+    Reads the snapshot when one is loaded. Otherwise (or for questions
+    newer than the snapshot) looks in the process-local dict, then the
+    shared cache, and only queries the database for IDs found in neither.
+
+    Args:
+        question_ids (iterable): IDs of the questions being graded
+
+    Returns:
+        dict: {question_id: correct_option} for the questions that exist
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        answer_key = snapshot.answer_key(question_ids)
+        if len(answer_key) == len(set(question_ids)):
+            return answer_key
+    generation = _current_generation()
+    answer_key = _local_lookup(generation, question_ids)
+
+    missing = [question_id for question_id in question_ids if question_id not in answer_key]
+    if missing:
+        keys = _shared_keys(generation, missing)
+        found = {keys[key]: option for key, option in cache.get_many(list(keys)).items()}
+
+        still_missing = [question_id for question_id in missing if question_id not in found]
+        if still_missing:
+            loaded = dict(
+                Question.objects.filter(id__in=still_missing)
+                .values_list('id', 'correct_option')
+            )
+            cache.set_many({
+                key: loaded[question_id]
+                for key, question_id in _shared_keys(generation, loaded).items()
+            }, _timeout())
+            found.update(loaded)
+
+        _remember(generation, found)
+        answer_key.update(found)
+
+    return answer_key
+
+
+async def aget_answer_key(question_ids):
+    """Async variant of get_answer_key."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        answer_key = snapshot.answer_key(question_ids)
+        if len(answer_key) == len(set(question_ids)):
+            return answer_key
+    generation = await _acurrent_generation()
+    answer_key = _local_lookup(generation, question_ids)
+
+    missing = [question_id for question_id in question_ids if question_id not in answer_key]
+    if missing:
+        keys = _shared_keys(generation, missing)
+        found = {keys[key]: option for key, option in (await cache.aget_many(list(keys))).items()}
+
+        still_missing = [question_id for question_id in missing if question_id not in found]
+        if still_missing:
+            loaded = {
+                question_id: option async for question_id, option in
+                Question.objects.filter(id__in=still_missing).values_list('id', 'correct_option')
+            }
+            await cache.aset_many({
+                key: loaded[question_id]
+                for key, question_id in _shared_keys(generation, loaded).items()
+            }, _timeout())
+            found.update(loaded)
+
+        _remember(generation, found)
+        answer_key.update(found)
+
+    return answer_key
+
+
+def grade_answers(answer_key, answers):
+    """
+    Counts correct answers.
+
+    Args:
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+
+    Returns:
+        int: Number of answers matching the key
+    """
+    return sum(
+        1 for question_id, option in answers.items()
+        if answer_key.get(question_id) == option
+    )
+
+
+def invalidate_answer_keys():
+    """
+    Retires the current generation so every process reloads its answers.
+
+    The new token is written inside the caller's transaction, so other
+    connections keep using the old answers until the change commits. This
+    process forgets its token now, for the rest of the transaction, and
+    again on commit, so that a token read by another thread in between is
+    not kept.
+    """
+    QuestionBankVersion.bump()
+    _forget_generation()
+    transaction.on_commit(_forget_generation)
+
+
+def bank_generation():
+    """
+    Returns a token that changes whenever the question bank changes.
+
+    Other caches derived from the bank store it to detect that they are stale.
+    """
+    return _current_generation()
+
+
+async def abank_generation():
+    """Async variant of bank_generation."""
+    return await _acurrent_generation()
+
+
+def warm_answer_keys():
+    """
+    Loads the whole answer key into this process.
+
+    Meant to run once per worker at startup so grading never has to touch
+    the question table. Database errors (e.g. before migrations have run)
+    are logged and leave the cache to fill lazily.
+    """
+    generation = _current_generation()
+    try:
+        answers = dict(Question.objects.values_list('id', 'correct_option').iterator())
+    except DatabaseError:
+        logger.warning("Could not warm the answer-key cache", exc_info=True)
+        return
+    with _lock:
+        _sync_local(generation)
+        _local_answers.update(answers)
@@ -0,0 +1,82 @@
+"""
+Per-answer records of graded attempts, feeding item-difficulty statistics.
+
+Every graded submission stores one QuizAnswer per question with a single
+``bulk_create``, and folds them into QuestionStats with two more queries,
+however many questions the attempt holds. Call store_answers in the same
+transaction as the results, so an attempt is never stored without them.
+"""
+import uuid
+
+from django.db import transaction
+
+from .models import QuestionStats, QuizAnswer, QuizResult
+
+
+def build_answers(result, answer_key, answers):
+    """
+    Creates the (unsaved) answer rows of one graded attempt.
+
+    Args:
+        result (QuizResult): The stored result of the attempt
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+
+    Returns:
+        list: Unsaved QuizAnswer instances
+    """
+    return [
+        QuizAnswer(
+            result=result,
+            question_id=question_id,
+            chosen_option=answers[question_id],
+            is_correct=answers[question_id] == correct_option,
+        )
+        for question_id, correct_option in answer_key.items()
+        if question_id in answers
+    ]
+
+
+def store_answers(graded):
+    """
+    Stores the answers of graded attempts and updates the question statistics.
+
+    Args:
+        graded (iterable): (stored QuizResult, answer key, answers) tuples
+
+    Returns:
+        list: The created QuizAnswer instances
+    """
+    rows = [row for result, answer_key, answers in graded for row in build_answers(result, answer_key, answers)]
+    if not rows:
+        return []
+    created = QuizAnswer.objects.bulk_create(rows)
+    QuestionStats.record_answers(created)
+    return created
+
+
+def store_result(user, topic, score, answer_key, answers, reference=None):
+    """
+    Stores a graded attempt and its answers in one transaction.
+
+    Args:
+        user (User): User who took the quiz
+        topic (str): Topic of the quiz
+        score (int): Number of correct answers
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+        reference (str): Reference allocated when the attempt started;
+            a new one when omitted
+
+    Returns:
+        QuizResult: The stored result
+
+    Raises:
+        IntegrityError: If a result with this reference is already stored
+    """
+    with transaction.atomic():
+        result = QuizResult.objects.create(
+            user=user, topic=topic, score=score, total_questions=len(answer_key),
+            reference=reference or uuid.uuid4())
+        store_answers([(result, answer_key, answers)])
+    return result
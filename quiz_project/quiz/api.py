@@ -0,0 +1,370 @@
+"""
+JSON API for starting and submitting quizzes without the template layer.
+
+Endpoints use the regular session login and CSRF protection (send the
+``X-CSRFToken`` header on POST). Attempts always travel as signed attempt
+tokens (see quiz.attempts), so a client can start several quizzes, go
+offline, and later submit every completed attempt in one batch request.
+"""
+import json
+import uuid
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from .adaptive import choose_questions, record_answers
+from .answer_key import get_answer_key, grade_answers
+from .answers import store_answers
+from .attempts import (
+    InvalidAttemptToken, claim_attempt, issue_attempt_token, read_attempt_token, release_attempt,
+)
+from .decorators import api_login_required
+from .forms import QuizAnswerForm
+from .metrics import NOT_ENOUGH_QUESTIONS, QUIZ_STARTS, QUIZ_SUBMISSIONS
+from .models import Question, QuizResult
+from .pagination import paginate
+from .signals import results_created
+from .views import QUESTIONS_PER_QUIZ, TOPICS, history_querysets, history_stats
+
+
+class ApiError(Exception):
+    """A client error reported as ``{"error": message}``."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def error_response(message, status=400):
+    """Builds the JSON body used for every API error."""
+    return JsonResponse({'error': message}, status=status)
+
+
+def read_json(request):
+    """
+    Parses the request body as a JSON object.
+
+    Raises:
+        ApiError: If the body is not a JSON object
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ApiError('Request body must be valid JSON.')
+    if not isinstance(payload, dict):
+        raise ApiError('Request body must be a JSON object.')
+    return payload
+
+
+def read_topic(code, default=Question.DEFAULT_TOPIC):
+    """
+    Validates a topic code sent by the client.
+
+    Args:
+        code (str): Submitted topic code; None when omitted
+        default: Returned when no topic was sent
+
+    Raises:
+        ApiError: If the code names no known topic
+    """
+    if code is None:
+        return default
+    if code not in TOPICS:
+        raise ApiError(f'Unknown topic {code!r}.')
+    return code
+
+
+def serialize_result(result):
+    """Returns the JSON representation of a QuizResult."""
+    return {
+        'id': result.id,
+        'reference': str(result.reference),
+        'topic': result.topic,
+        'score': result.score,
+        'total_questions': result.total_questions,
+        'percentage': result.percentage(),
+        'feedback': result.feedback_message(),
+        'date_taken': result.date_taken.isoformat(),
+    }
+
+
+def read_attempt(user, item):
+    """
+    Verifies the token of a submitted attempt.
+
+    Args:
+        user (User): User submitting the attempt
+        item (dict): ``{"attempt_token": ..., "answers": {...}}``
+
+    Returns:
+        Attempt: The attempt described by the token
+
+    Raises:
+        ApiError: If the item is malformed or its token is invalid
+    """
+    if not isinstance(item, dict) or not isinstance(item.get('answers'), dict):
+        raise ApiError('Each attempt needs an attempt_token and an answers object.')
+    try:
+        return read_attempt_token(str(item.get('attempt_token', '')), user)
+    except InvalidAttemptToken:
+        raise ApiError('Invalid or expired attempt token.')
+
+
+def grade_attempt(user, attempt, answers, answer_key):
+    """
+    Validates and grades one attempt.
+
+    Args:
+        user (User): User submitting the attempt
+        attempt (Attempt): The verified attempt
+        answers (dict): ``{"<question id>": option number}``
+        answer_key (dict): Answer key covering the attempt's questions
+
+    Returns:
+        tuple: (unsaved QuizResult, attempt answer key, submitted answers),
+        the last two for ``record_answers`` once the result is stored
+
+    Raises:
+        ApiError: If answers are missing or invalid, or the attempt was
+            already submitted
+    """
+    attempt_key = {
+        question_id: answer_key[question_id]
+        for question_id in attempt.question_ids
+        if question_id in answer_key
+    }
+    form = QuizAnswerForm(attempt_key, {
+        f'question_{question_id}': option for question_id, option in answers.items()
+    })
+    if not attempt_key or not form.is_valid():
+        QUIZ_SUBMISSIONS.inc(channel='api', outcome='invalid')
+        raise ApiError('Please answer all questions.')
+    if not claim_attempt(attempt):
+        QUIZ_SUBMISSIONS.inc(channel='api', outcome='replayed')
+        raise ApiError('This attempt has already been submitted.', status=409)
+    result = QuizResult(
+        user=user,
+        topic=attempt.topic,
+        score=grade_answers(attempt_key, form.answers()),
+        total_questions=len(attempt_key),
+        reference=uuid.UUID(attempt.reference) if attempt.reference else uuid.uuid4(),
+    )
+    return result, attempt_key, form.answers()
+
+
+def store_attempts(graded):
+    """
+    Stores graded attempts, their answers and derived statistics in one transaction.
+
+    Args:
+        graded (list): (unsaved QuizResult, attempt answer key, answers)
+            tuples as returned by grade_attempt
+
+    Returns:
+        list: The created QuizResult instances, in order
+
+    Raises:
+        IntegrityError: If any attempt is already stored; nothing is stored
+    """
+    with transaction.atomic():
+        created = QuizResult.objects.bulk_create([result for result, *_ in graded])
+        # bulk_create sends no post_save.
+        results_created(created)
+        store_answers((result, *rest) for result, (_, *rest) in zip(created, graded))
+    return created
+
+
+def already_stored(attempt, result):
+    """Whether an IntegrityError storing ``result`` means the attempt was stored by another request."""
+    return attempt.reference is not None and QuizResult.objects.filter(reference=result.reference).exists()
+
+
+@require_POST
+@api_login_required
+def start_quiz(request):
+    """
+    Starts a quiz.
+
+    Body (optional, JSON):
+        ``{"topic": "<topic code>"}``; a 'topic' query parameter works too,
+        and the default topic is used when neither is sent
+
+    Returns:
+        JsonResponse: ``attempt_token`` plus the questions and their options
+    """
+    try:
+        payload = read_json(request) if request.content_type == 'application/json' else {}
+        topic = read_topic(payload.get('topic', request.GET.get('topic')))
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+    questions = choose_questions(request.user, topic, QUESTIONS_PER_QUIZ)
+    if questions is None:
+        NOT_ENOUGH_QUESTIONS.inc(channel='api')
+        return error_response('Not enough questions.', status=409)
+    QUIZ_STARTS.inc(channel='api')
+    return JsonResponse({
+        'attempt_token': issue_attempt_token(request.user, [q.id for q in questions], topic),
+        'topic': topic,
+        'questions': [
+            {
+                'id': question.id,
+                'text': question.text,
+                'options': [question.option1, question.option2, question.option3, question.option4],
+            }
+            for question in questions
+        ],
+    })
+
+
+@require_POST
+@api_login_required
+def submit_quiz(request):
+    """
+    Grades and stores one attempt.
+
+    Body:
+        ``{"attempt_token": "...", "answers": {"<question id>": <option 1-4>}}``
+
+    Returns:
+        JsonResponse: The stored result (201)
+    """
+    try:
+        item = read_json(request)
+        attempt = read_attempt(request.user, item)
+        answer_key = get_answer_key(attempt.question_ids)
+        result, attempt_key, answers = grade_attempt(request.user, attempt, item['answers'], answer_key)
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+    try:
+        with transaction.atomic():
+            result.save()
+            store_answers([(result, attempt_key, answers)])
+    except IntegrityError:
+        if not already_stored(attempt, result):
+            release_attempt(attempt)
+            raise
+        # Stored by an earlier submission whose claim has expired.
+        QUIZ_SUBMISSIONS.inc(channel='api', outcome='replayed')
+        return error_response('This attempt has already been submitted.', status=409)
+    except Exception:
+        release_attempt(attempt)
+        raise
+    record_answers(request.user.pk, attempt_key, answers)
+    QUIZ_SUBMISSIONS.inc(channel='api', outcome='graded')
+    return JsonResponse({'result': serialize_result(result)}, status=201)
+
+
+@require_POST
+@api_login_required
+def batch_submit(request):
+    """
+    Grades and stores many completed attempts in one request.
+
+    The answer key of every attempt is fetched at once and all valid
+    attempts are inserted with a single ``bulk_create``. Each attempt
+    succeeds or fails on its own: if another request stored one of them
+    meanwhile, the attempts are stored one at a time instead.
+
+    Body:
+        ``{"attempts": [{"attempt_token": "...", "answers": {...}}, ...]}``
+
+    Returns:
+        JsonResponse: ``results`` in request order, each holding either
+        ``result`` or ``error``
+    """
+    try:
+        items = read_json(request).get('attempts')
+        if not isinstance(items, list) or not items:
+            raise ApiError('attempts must be a non-empty list.')
+        max_batch = getattr(settings, 'QUIZ_API_MAX_BATCH_SIZE', 100)
+        if len(items) > max_batch:
+            raise ApiError(f'At most {max_batch} attempts per batch.', status=413)
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+
+    outcomes = [None] * len(items)
+    attempts = {}
+    for index, item in enumerate(items):
+        try:
+            attempts[index] = read_attempt(request.user, item)
+        except ApiError as exc:
+            outcomes[index] = {'error': exc.message}
+
+    answer_key = get_answer_key(list({
+        question_id for attempt in attempts.values() for question_id in attempt.question_ids
+    }))
+
+    pending = {}
+    for index, attempt in attempts.items():
+        try:
+            pending[index] = grade_attempt(request.user, attempt, items[index]['answers'], answer_key)
+        except ApiError as exc:
+            outcomes[index] = {'error': exc.message}
+
+    # Attempts whose claim expired may already be stored; one copy is enough.
+    stored = set(QuizResult.objects.filter(
+        reference__in=[graded[0].reference for graded in pending.values()],
+    ).order_by().values_list('reference', flat=True)) if pending else set()
+    for index in [index for index, graded in pending.items() if graded[0].reference in stored]:
+        del pending[index]
+        outcomes[index] = {'error': 'This attempt has already been submitted.'}
+        QUIZ_SUBMISSIONS.inc(channel='api', outcome='replayed')
+
+    if pending:
+        created = {}
+        try:
+            try:
+                created = dict(zip(pending, store_attempts(list(pending.values()))))
+            except IntegrityError:
+                # A concurrent request stored one of the attempts first.
+                for index, graded in pending.items():
+                    try:
+                        created[index] = store_attempts([graded])[0]
+                    except IntegrityError:
+                        if not already_stored(attempts[index], graded[0]):
+                            raise
+                        outcomes[index] = {'error': 'This attempt has already been submitted.'}
+                        QUIZ_SUBMISSIONS.inc(channel='api', outcome='replayed')
+        except Exception:
+            # Let the client retry attempts that were not stored.
+            for index in pending:
+                if index not in created:
+                    release_attempt(attempts[index])
+            raise
+        for index, result in created.items():
+            outcomes[index] = {'result': serialize_result(result)}
+            record_answers(request.user.pk, *pending[index][1:])
+        QUIZ_SUBMISSIONS.inc(len(created), channel='api', outcome='graded')
+
+    return JsonResponse({'results': outcomes})
+
+
+@require_GET
+@api_login_required
+def history(request):
+    """
+    Returns the user's statistics and one keyset page of results.
+
+    Query parameters 'before' and 'after' take the cursors returned as
+    ``older_cursor`` and ``newer_cursor``; 'topic' limits the statistics
+    and results to one topic.
+    """
+    try:
+        topic = read_topic(request.GET.get('topic'), None)
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+    results, user_stats = history_querysets(request.user, topic)
+    page = paginate(
+        results,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+    return JsonResponse({
+        'stats': history_stats(user_stats.first()),
+        'results': [serialize_result(result) for result in page.items],
+        'older_cursor': page.older_cursor,
+        'newer_cursor': page.newer_cursor,
+    })
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class QuizConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quiz'
+
+    def ready(self):
+        """Connects the signal handlers that keep cached quiz data fresh."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,169 @@
+"""
+Native async versions of the quiz, results and history views.
+
+Selected with ``QUIZ_ASYNC_VIEWS = True``. Under ASGI they run on the event
+loop and use Django's async ORM and cache APIs, instead of occupying a
+thread of the sync-to-async pool for the whole request.
+"""
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, redirect, render
+
+from .adaptive import achoose_questions, record_answers
+from .answer_key import aget_answer_key, grade_answers
+from .answers import store_result
+from .attempts import aattempt_in_flight, aclaim_attempt, aload_attempt, astart_attempt, release_attempt
+from .decks import apop_deck, deck_pool_enabled
+from .decorators import alogin_required
+from .forms import QuizAnswerForm, QuizForm
+from .metrics import NOT_ENOUGH_QUESTIONS, QUIZ_STARTS, QUIZ_SUBMISSIONS
+from .models import QuizResult
+from .pagination import apaginate
+from .question_pool import aget_topic_counts
+from .views import QUESTIONS_PER_QUIZ, TOPICS, history_querysets, history_stats, parse_topic
+from .writebehind import find_pending_result, submit_result, write_behind_enabled
+
+
+@alogin_required
+async def quiz(request):
+    """
+    Async version of ``views.quiz``.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: Quiz form, results redirect, or error page
+    """
+    if request.method == 'POST':
+        attempt = await aload_attempt(request)
+        answer_key = await aget_answer_key(attempt.question_ids)
+        form = QuizAnswerForm(answer_key, request.POST)
+        valid = bool(answer_key) and form.is_valid()
+
+        if valid and await aclaim_attempt(attempt):
+            answers = form.answers()
+            score = grade_answers(answer_key, answers)
+
+            try:
+                if write_behind_enabled():
+                    reference = await sync_to_async(submit_result)(
+                        request.user, attempt.topic, score, answer_key, answers, reference=attempt.reference)
+                    QUIZ_SUBMISSIONS.inc(channel='web', outcome='graded')
+                    return redirect('quiz:result_reference', reference=reference)
+
+                result = await sync_to_async(store_result)(
+                    request.user, attempt.topic, score, answer_key, answers, reference=attempt.reference)
+            except IntegrityError:
+                if attempt.reference is None or not await QuizResult.objects.filter(
+                        reference=attempt.reference, user=request.user).aexists():
+                    await sync_to_async(release_attempt)(attempt)
+                    raise
+                QUIZ_SUBMISSIONS.inc(channel='web', outcome='replayed')
+                return redirect('quiz:result_reference', reference=attempt.reference)
+            except Exception:
+                await sync_to_async(release_attempt)(attempt)
+                raise
+            await sync_to_async(record_answers)(request.user.pk, answer_key, answers)
+
+            QUIZ_SUBMISSIONS.inc(channel='web', outcome='graded')
+            return redirect('quiz:results', result_id=result.id)
+        QUIZ_SUBMISSIONS.inc(channel='web', outcome='replayed' if valid else 'invalid')
+        if valid and attempt.reference is not None:
+            return redirect('quiz:result_reference', reference=attempt.reference)
+
+    topic = parse_topic(request.GET.get('topic'))
+    deck = await apop_deck(topic, QUESTIONS_PER_QUIZ) if deck_pool_enabled() else None
+    if deck is not None:
+        question_ids, questions_html = deck
+        form = None
+    else:
+        selected_questions = await achoose_questions(request.user, topic, QUESTIONS_PER_QUIZ)
+        if selected_questions is None:
+            NOT_ENOUGH_QUESTIONS.inc(channel='web')
+            return render(request, 'quiz/not_enough_questions.html', {'topic_name': TOPICS[topic]})
+        question_ids, questions_html = [q.id for q in selected_questions], None
+        form = QuizForm(selected_questions)
+    QUIZ_STARTS.inc(channel='web')
+
+    attempt_token = await astart_attempt(request, question_ids, topic)
+    return render(request, 'quiz/quiz.html', {
+        'form': form,
+        'questions_html': questions_html,
+        'attempt_token': attempt_token,
+        'topic': topic,
+        'topic_name': TOPICS[topic],
+    })
+
+
+@alogin_required
+async def results(request, result_id):
+    """
+    Async version of ``views.results``.
+
+    Args:
+        request (HttpRequest): The incoming request object
+        result_id (int): ID of the QuizResult to display
+
+    Returns:
+        HttpResponse: Rendered results page
+
+    Raises:
+        Http404: If result doesn't exist or doesn't belong to user
+    """
+    result = await aget_object_or_404(QuizResult, id=result_id, user=request.user)
+    return render(request, 'quiz/results.html', {'result': result})
+
+
+@alogin_required
+async def result_by_reference(request, reference):
+    """
+    Async version of ``views.result_by_reference``.
+
+    Args:
+        request (HttpRequest): The incoming request object
+        reference (UUID): Reference of the QuizResult to display
+
+    Returns:
+        HttpResponse: Rendered results page, or the pending page (202)
+
+    Raises:
+        Http404: If result doesn't exist or doesn't belong to user
+    """
+    result = await sync_to_async(find_pending_result)(reference, request.user.pk)
+    if result is None:
+        result = await QuizResult.objects.filter(reference=reference, user=request.user).afirst()
+    if result is None:
+        if await aattempt_in_flight(reference, request.user.pk):
+            return render(request, 'quiz/result_pending.html', status=202)
+        raise Http404("No QuizResult matches the given query.")
+    return render(request, 'quiz/results.html', {'result': result})
+
+
+@alogin_required
+async def results_history(request):
+    """
+    Async version of ``views.results_history``.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: Rendered history page with stats
+    """
+    topic = parse_topic(request.GET.get('topic'), None)
+    results, user_stats = history_querysets(request.user, topic)
+    page = await apaginate(
+        results,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+
+    return render(request, 'quiz/history.html', {
+        'results': page.items,
+        'page': page,
+        'stats': history_stats(await user_stats.afirst()),
+        'topic': topic,
+        'topics': [(code, TOPICS[code]) for code in sorted(await aget_topic_counts())],
+    })
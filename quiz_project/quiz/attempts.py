@@ -0,0 +1,242 @@
+"""
+Tracks which questions belong to the quiz attempt being submitted.
+
+By default the selected question IDs and their topic are kept in the user's
+session. With ``QUIZ_ATTEMPT_TOKENS = True`` they are instead packed,
+together with the issue time and a random nonce, into an HMAC-signed token that travels in the
+quiz form. Tokens avoid a session write on every quiz start. The signature
+keeps the question list tamper-proof, the timestamp bounds its lifetime, and
+the nonce is claimed in the cache on submission so each token is accepted
+only once.
+
+Every attempt also gets a reference when it starts, which becomes the
+``QuizResult.reference`` of its result. A submission claims the reference
+in the cache (tokens issued before references existed claim their nonce),
+so a resubmitted attempt (double click, browser resubmit, proxy retry) is
+recognized without touching the database. The claim is released when the
+result cannot be stored, so the user can retry. The unique reference
+column still refuses a second result when the claim was missed, e.g.
+after the cache entry expired.
+"""
+import secrets
+import uuid
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .models import Question
+
+TOKEN_SALT = 'quiz.attempts'
+CLAIM_CACHE_KEY = 'quiz:attempt_claim:{claim}'
+SESSION_KEY = 'quiz_questions'
+TOPIC_SESSION_KEY = 'quiz_topic'
+REFERENCE_SESSION_KEY = 'quiz_reference'
+
+
+class InvalidAttemptToken(Exception):
+    """Raised when an attempt token is forged, expired or issued to another user."""
+
+
+@dataclass
+class Attempt:
+    """
+    A quiz attempt awaiting submission.
+
+    Attributes:
+        question_ids (list): IDs of the questions the user was shown
+        nonce (str): Single-use nonce of a token attempt, None for session attempts
+        topic (str): Topic the questions were drawn from
+        reference (str): Reference of the attempt's result, as a UUID
+            string; None for attempts started before references existed
+        user_id (int): User submitting the attempt
+    """
+    question_ids: list
+    nonce: str = None
+    topic: str = Question.DEFAULT_TOPIC
+    reference: str = None
+    user_id: int = None
+
+    def claim_key(self):
+        """Cache key claimed when the attempt is submitted, or None."""
+        # Token attempts started before references existed only have a nonce.
+        claim = self.reference or self.nonce
+        return CLAIM_CACHE_KEY.format(claim=claim) if claim else None
+
+
+def tokens_enabled():
+    """Whether attempts travel in signed tokens instead of the session."""
+    return getattr(settings, 'QUIZ_ATTEMPT_TOKENS', False)
+
+
+def token_max_age():
+    """Seconds a quiz attempt token stays valid."""
+    return getattr(settings, 'QUIZ_ATTEMPT_TOKEN_MAX_AGE', 3600)
+
+
+def issue_attempt_token(user, question_ids, topic=Question.DEFAULT_TOPIC):
+    """
+    Signs a compact token describing a new attempt.
+
+    Args:
+        user (User): User taking the quiz
+        question_ids (list): IDs of the selected questions
+        topic (str): Topic the questions were drawn from
+
+    Returns:
+        str: URL-safe signed token
+    """
+    payload = [user.pk, secrets.token_urlsafe(9), list(question_ids), topic, str(uuid.uuid4())]
+    return signing.dumps(payload, salt=TOKEN_SALT, compress=True)
+
+
+def read_attempt_token(token, user):
+    """
+    Verifies a token and unpacks its attempt.
+
+    Args:
+        token (str): Token submitted with the quiz form
+        user (User): User submitting the quiz
+
+    Returns:
+        Attempt: The attempt described by the token
+
+    Raises:
+        InvalidAttemptToken: If the signature is bad, the token expired or
+            it was issued to a different user
+    """
+    try:
+        # Tokens issued before topics and references were added lack them.
+        user_id, nonce, question_ids, *optional = signing.loads(
+            token, salt=TOKEN_SALT, max_age=token_max_age())
+    except (signing.BadSignature, TypeError, ValueError) as exc:
+        raise InvalidAttemptToken(str(exc)) from exc
+    if user_id != user.pk:
+        raise InvalidAttemptToken("Token was issued to another user")
+    return Attempt(
+        question_ids=question_ids,
+        nonce=nonce,
+        topic=optional[0] if optional else Question.DEFAULT_TOPIC,
+        reference=optional[1] if len(optional) > 1 else None,
+        user_id=user_id,
+    )
+
+
+def start_attempt(request, question_ids, topic=Question.DEFAULT_TOPIC):
+    """
+    Records the questions of a newly started quiz.
+
+    Args:
+        request (HttpRequest): The quiz request
+        question_ids (list): IDs of the selected questions
+        topic (str): Topic the questions were drawn from
+
+    Returns:
+        str: Token to embed in the quiz form, or None in session mode
+    """
+    if tokens_enabled():
+        return issue_attempt_token(request.user, question_ids, topic)
+    request.session[SESSION_KEY] = list(question_ids)
+    request.session[TOPIC_SESSION_KEY] = topic
+    request.session[REFERENCE_SESSION_KEY] = str(uuid.uuid4())
+    return None
+
+
+async def astart_attempt(request, question_ids, topic=Question.DEFAULT_TOPIC):
+    """Async variant of start_attempt."""
+    if tokens_enabled():
+        return issue_attempt_token(request.user, question_ids, topic)
+    await request.session.aset(SESSION_KEY, list(question_ids))
+    await request.session.aset(TOPIC_SESSION_KEY, topic)
+    await request.session.aset(REFERENCE_SESSION_KEY, str(uuid.uuid4()))
+    return None
+
+
+def load_attempt(request):
+    """
+    Returns the attempt a quiz submission refers to.
+
+    Invalid or missing tokens yield an empty attempt, which is never graded.
+
+    Args:
+        request (HttpRequest): The quiz submission
+
+    Returns:
+        Attempt: The submitted attempt
+    """
+    if tokens_enabled():
+        try:
+            return read_attempt_token(request.POST.get('attempt_token', ''), request.user)
+        except InvalidAttemptToken:
+            return Attempt(question_ids=[])
+    return Attempt(
+        question_ids=request.session.get(SESSION_KEY, []),
+        topic=request.session.get(TOPIC_SESSION_KEY, Question.DEFAULT_TOPIC),
+        reference=request.session.get(REFERENCE_SESSION_KEY),
+        user_id=request.user.pk,
+    )
+
+
+async def aload_attempt(request):
+    """Async variant of load_attempt."""
+    if tokens_enabled():
+        return load_attempt(request)
+    return Attempt(
+        question_ids=await request.session.aget(SESSION_KEY, []),
+        topic=await request.session.aget(TOPIC_SESSION_KEY, Question.DEFAULT_TOPIC),
+        reference=await request.session.aget(REFERENCE_SESSION_KEY),
+        user_id=request.user.pk,
+    )
+
+
+def claim_attempt(attempt):
+    """
+    Marks an attempt as submitted so it cannot be replayed.
+
+    Attempts are claimed by reference (older tokens by nonce). A claim
+    whose result could not be stored must be released, so that the user
+    can submit again.
+
+    Args:
+        attempt (Attempt): The attempt about to be recorded
+
+    Returns:
+        bool: False if the attempt was already submitted
+    """
+    key = attempt.claim_key()
+    if key is None:
+        return True
+    return cache.add(key, attempt.user_id or True, token_max_age())
+
+
+async def aclaim_attempt(attempt):
+    """Async variant of claim_attempt."""
+    key = attempt.claim_key()
+    if key is None:
+        return True
+    return await cache.aadd(key, attempt.user_id or True, token_max_age())
+
+
+def attempt_in_flight(reference, user_id):
+    """
+    Whether a user's submission of this attempt was claimed but its result
+    may not be stored yet.
+
+    Args:
+        reference (UUID): Reference of the attempt's result
+        user_id (int): User who submitted it
+    """
+    return cache.get(CLAIM_CACHE_KEY.format(claim=str(reference))) == user_id
+
+
+async def aattempt_in_flight(reference, user_id):
+    """Async variant of attempt_in_flight."""
+    return await cache.aget(CLAIM_CACHE_KEY.format(claim=str(reference))) == user_id
+
+
+def release_attempt(attempt):
+    """Frees a claimed attempt whose result could not be stored."""
+    key = attempt.claim_key()
+    if key is not None:
+        cache.delete(key)
@@ -0,0 +1,430 @@
+"""
+Load-test harness for the quiz request paths, used by ``benchmark_quiz``.
+
+The benchmark runs against a throwaway test database, never the configured
+one. It seeds a configurable number of questions, users and results, then
+drives the real URL routes with the Django test client. It runs once
+sequentially and once with concurrent worker threads, each with its own
+client and database connection. For every route it records latency
+percentiles, throughput and SQL query counts and time. Reports are plain
+JSON so a saved run can serve as the baseline of later runs.
+
+The ``login`` scenario is CPU-bound on password hashing. Its sequential
+throughput is the login rate of one core; run it with different password
+profiles (``password_profile``) to compare work factors.
+
+With ``snapshot`` on, questions are served from a question snapshot
+(quiz.snapshot) built from the seeded bank, instead of the ORM.
+"""
+import os
+import platform
+import random
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from .answer_key import invalidate_answer_keys
+from .hashers import profile_iterations
+from .importers import build_question, import_questions
+from .instrumentation import percentile
+from .leaderboard import rebuild as rebuild_leaderboard
+from .models import QuizResult, UserQuizStats, UserTopicStats
+from .question_pool import invalidate_question_pool
+from .snapshot import build_snapshot
+
+QUESTION_FIELD = re.compile(r'name="question_(\d+)"')
+ATTEMPT_TOKEN_FIELD = re.compile(r'name="attempt_token" value="([^"]+)"')
+PASSWORD = 'benchmark-password'
+
+
+@dataclass
+class BenchmarkConfig:
+    """
+    Sizes and repetition counts of a benchmark run.
+
+    Attributes:
+        questions (int): Questions seeded into the bank
+        users (int): Users seeded
+        results_per_user (int): Past results seeded per user
+        iterations (int): Requests per route in each mode
+        workers (int): Threads used by the concurrent run (0 skips it)
+        seed (int): Seed of every random choice, for reproducible runs
+        scenarios (tuple): Names of the routes to exercise
+        password_profile (str): QUIZ_PASSWORD_PROFILE of the run, or None
+            for the configured one
+        snapshot (bool): Serve questions from a question snapshot
+    """
+    questions: int = 200
+    users: int = 20
+    results_per_user: int = 50
+    iterations: int = 100
+    workers: int = 4
+    seed: int = 0
+    scenarios: tuple = ()
+    password_profile: str = None
+    snapshot: bool = False
+
+
+@dataclass
+class Fixtures:
+    """
+    Data seeded for a benchmark run.
+
+    Attributes:
+        users (list): Seeded users
+        result_ids (dict): {user_id: [result_id, ...]}
+    """
+    users: list
+    result_ids: dict
+
+
+def seed_data(config):
+    """
+    Fills the (test) database with questions, users and results.
+
+    Statistics and leaderboards are rebuilt afterwards, as if the results
+    had been submitted one by one.
+
+    Returns:
+        Fixtures: The seeded users and their result IDs
+    """
+    rng = random.Random(config.seed)
+    import_questions(
+        build_question({
+            'text': f'Benchmark question {number}',
+            'option1': f'Answer {number}-1',
+            'option2': f'Answer {number}-2',
+            'option3': f'Answer {number}-3',
+            'option4': f'Answer {number}-4',
+            'correct_option': rng.randint(1, 4),
+        })
+        for number in range(config.questions)
+    )
+
+    # One hash shared by every user; hashing per user would dominate seeding.
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f'benchmark-{number}', password=password)
+        for number in range(config.users)
+    )
+    users = list(User.objects.filter(username__startswith='benchmark-').order_by('id'))
+
+    QuizResult.objects.bulk_create(
+        (
+            QuizResult(user=user, score=rng.randint(0, 5), total_questions=5)
+            for user in users
+            for _ in range(config.results_per_user)
+        ),
+        batch_size=1000,
+    )
+    UserQuizStats.rebuild()
+    UserTopicStats.rebuild()
+    rebuild_leaderboard()
+
+    result_ids = {}
+    for result_id, user_id in QuizResult.objects.values_list('id', 'user_id').iterator():
+        result_ids.setdefault(user_id, []).append(result_id)
+    return Fixtures(users, result_ids)
+
+
+def quiz_page(client, user, rng, fixtures):
+    """GET /quiz/: draws and renders a new quiz."""
+    return lambda: client.get(reverse('quiz:quiz'))
+
+
+def quiz_submit(client, user, rng, fixtures):
+    """POST /quiz/: grades and stores an attempt (the GET before it is not timed)."""
+    page = client.get(reverse('quiz:quiz')).content.decode()
+    data = {f'question_{question_id}': str(rng.randint(1, 4)) for question_id in QUESTION_FIELD.findall(page)}
+    token = ATTEMPT_TOKEN_FIELD.search(page)
+    if token:
+        data['attempt_token'] = token.group(1)
+    return lambda: client.post(reverse('quiz:quiz'), data)
+
+
+def results_page(client, user, rng, fixtures):
+    """GET /quiz/results/<id>/: one of the user's past results."""
+    result_id = rng.choice(fixtures.result_ids[user.id])
+    return lambda: client.get(reverse('quiz:results', args=[result_id]))
+
+
+def history_page(client, user, rng, fixtures):
+    """GET /history/: statistics and the newest page of results."""
+    return lambda: client.get(reverse('quiz:history'))
+
+
+def leaderboard_page(client, user, rng, fixtures):
+    """GET /leaderboard/: cached top-N table plus the user's rank."""
+    return lambda: client.get(reverse('quiz:leaderboard'))
+
+
+def login_submit(client, user, rng, fixtures):
+    """POST /login/: verifies the password and opens a session, from a new client."""
+    anonymous = Client()
+    return lambda: anonymous.post(reverse('quiz:login'), {'username': user.username, 'password': PASSWORD})
+
+
+# A scenario does any untimed preparation and returns a callable that
+# performs the request being measured.
+SCENARIOS = {
+    'quiz': quiz_page,
+    'quiz_submit': quiz_submit,
+    'results': results_page,
+    'history': history_page,
+    'leaderboard': leaderboard_page,
+    'login': login_submit,
+}
+
+
+def summarize(samples, elapsed):
+    """
+    Reduces ``(latency_s, query_count, sql_time_s)`` samples to a report entry.
+
+    Args:
+        samples (list): One tuple per request
+        elapsed (float): Wall time of the whole run in seconds
+
+    Returns:
+        dict: Latency percentiles (ms), throughput and query statistics
+    """
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    count = len(samples)
+    return {
+        'requests': count,
+        'mean_ms': round(sum(latencies) / count, 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p90_ms': round(percentile(latencies, 90), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'requests_per_s': round(count / elapsed, 1) if elapsed else None,
+        'queries_mean': round(sum(sample[1] for sample in samples) / count, 2),
+        'queries_max': max(sample[1] for sample in samples),
+        'sql_ms_mean': round(sum(sample[2] for sample in samples) * 1000 / count, 3),
+    }
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def measure(scenario, client, user, rng, fixtures):
+    """
+    Times one request of a scenario and counts its queries.
+
+    Returns:
+        tuple: (latency_s, query_count, sql_time_s)
+
+    Raises:
+        RuntimeError: If the route answers with a server or client error
+    """
+    request = scenario(client, user, rng, fixtures)
+    queries = QueryTimer()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        response = request()
+        latency = time.perf_counter() - started
+    if response.status_code >= 400:
+        raise RuntimeError(f'{scenario.__name__} answered {response.status_code}')
+    return latency, queries.count, queries.seconds
+
+
+def logged_in_client(user):
+    """Returns a test client with a session for ``user``."""
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def run_sequential(config, fixtures, names):
+    """Runs every scenario ``iterations`` times from a single client."""
+    rng = random.Random(config.seed)
+    clients = {user.id: logged_in_client(user) for user in fixtures.users}
+    report = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        measure(scenario, clients[fixtures.users[0].id], fixtures.users[0], rng, fixtures)  # warm-up
+        samples = []
+        started = time.perf_counter()
+        for _ in range(config.iterations):
+            user = rng.choice(fixtures.users)
+            samples.append(measure(scenario, clients[user.id], user, rng, fixtures))
+        report[name] = summarize(samples, time.perf_counter() - started)
+    return report
+
+
+def run_concurrent(config, fixtures, names):
+    """
+    Runs every scenario from ``workers`` threads at once.
+
+    Each worker logs in as its own user and performs its share of the
+    ``iterations`` requests on its own database connection.
+    """
+    def work(worker, scenario, requests):
+        rng = random.Random(f'{config.seed}-{worker}')
+        user = fixtures.users[worker % len(fixtures.users)]
+        try:
+            client = logged_in_client(user)
+            return [measure(scenario, client, user, rng, fixtures) for _ in range(requests)]
+        finally:
+            connections.close_all()
+
+    report = {}
+    shares = [config.iterations // config.workers + (worker < config.iterations % config.workers)
+              for worker in range(config.workers)]
+    with ThreadPoolExecutor(max_workers=config.workers) as pool:
+        for name in names:
+            scenario = SCENARIOS[name]
+            started = time.perf_counter()
+            futures = [pool.submit(work, worker, scenario, share) for worker, share in enumerate(shares)]
+            samples = [sample for future in futures for sample in future.result()]
+            report[name] = summarize(samples, time.perf_counter() - started)
+    return report
+
+
+def login_throughput(report):
+    """
+    Logins per second per CPU core, from the ``login`` scenario of a report.
+
+    The sequential rate is that of one core. The concurrent rate is divided
+    by the number of cores the workers could use; PBKDF2 releases the GIL,
+    so worker threads hash in parallel.
+
+    Returns:
+        dict: ``sequential`` and ``concurrent`` rates (None when not run)
+    """
+    workers = report['meta']['config']['workers']
+    cores = min(workers, report['meta']['cpu_count'] or 1)
+    concurrent = report['concurrent'].get('login')
+    return {
+        'sequential': report['sequential']['login']['requests_per_s'],
+        'concurrent': concurrent['requests_per_s'] / cores if concurrent else None,
+    }
+
+
+def _measure_run(config, names):
+    """Seeds the test database and runs the scenarios; the body of run()."""
+    fixtures = seed_data(config)
+    if config.snapshot:
+        build_snapshot()
+    report = {
+        'meta': {
+            'config': asdict(config) | {'scenarios': names},
+            'database': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'password_iterations': profile_iterations(),
+        },
+        'sequential': run_sequential(config, fixtures, names),
+        'concurrent': run_concurrent(config, fixtures, names) if config.workers > 0 else {},
+    }
+    if 'login' in names:
+        report['login_throughput'] = login_throughput(report)
+    return report
+
+
+def run(config):
+    """
+    Creates a test database, seeds it, and benchmarks the chosen scenarios.
+
+    SQLite runs use a temporary database file instead of the in-memory test
+    database so that concurrent workers exercise real file locking.
+
+    Returns:
+        dict: ``meta``, ``sequential`` and ``concurrent`` sections, plus
+        ``login_throughput`` when the login scenario ran
+    """
+    names = list(config.scenarios or SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if config.password_profile:
+        profile_iterations(config.password_profile)  # Rejects unknown profiles early.
+
+    directory = tempfile.mkdtemp()
+    # Never let the seeded bank replace the configured snapshot.
+    overrides = {'QUIZ_SNAPSHOT_PATH': os.path.join(directory, 'questions.snapshot') if config.snapshot else None}
+    if config.password_profile:
+        overrides['QUIZ_PASSWORD_PROFILE'] = config.password_profile
+
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    old_name = connection.settings_dict['NAME']
+    if connection.vendor == 'sqlite':
+        test_settings['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+
+    setup_test_environment()
+    random.seed(config.seed)
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            invalidate_question_pool()
+            invalidate_answer_keys()
+            with override_settings(**overrides):
+                report = _measure_run(config, names)
+        finally:
+            # Cached question IDs and answers refer to the test database.
+            invalidate_question_pool()
+            invalidate_answer_keys()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+        shutil.rmtree(directory, ignore_errors=True)
+    return report
+
+
+def compare(baseline, report, tolerance=0.25):
+    """
+    Flags routes that got slower or issue more queries than in a baseline.
+
+    A route regresses when its p95 latency grows by more than ``tolerance``
+    (a fraction) or its mean query count grows by more than half a query.
+
+    Args:
+        baseline (dict): Previously saved report
+        report (dict): Report of the current run
+        tolerance (float): Allowed relative latency growth
+
+    Returns:
+        list: Human-readable description of each regression
+    """
+    regressions = []
+    for mode in ('sequential', 'concurrent'):
+        for name, current in report.get(mode, {}).items():
+            previous = baseline.get(mode, {}).get(name)
+            if previous is None:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f"{mode} {name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms"
+                )
+            if current['queries_mean'] > previous['queries_mean'] + 0.5:
+                regressions.append(
+                    f"{mode} {name}: queries {previous['queries_mean']} -> {current['queries_mean']}"
+                )
+    return regressions
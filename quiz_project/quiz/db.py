@@ -0,0 +1,23 @@
+"""
+Per-connection tuning for the database profiles defined in settings.py.
+"""
+from django.conf import settings
+
+
+def configure_sqlite_connection(connection):
+    """
+    Applies ``QUIZ_SQLITE_PRAGMAS`` to a freshly opened SQLite connection.
+
+    ``journal_mode=wal`` is persistent in the database file, but the other
+    PRAGMAs (synchronous, busy_timeout, mmap_size) only last for the
+    connection, so they are set every time one is opened.
+
+    Args:
+        connection (DatabaseWrapper): The new connection
+    """
+    pragmas = getattr(settings, 'QUIZ_SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,248 @@
+"""
+Pool of pre-generated quiz decks (``QUIZ_DECK_POOL = True``).
+
+Starting a quiz normally samples its questions, loads them and renders
+the question cards on the request thread. With the deck pool, that work
+is done ahead of time: each topic keeps a queue of decks in the shared
+cache. A deck is a random draw of questions plus the HTML of their cards
+(quiz/quiz_questions.html), and a quiz start just pops the next deck.
+
+A topic's queue is two counters and one key per deck::
+
+    quiz:decks:{generation}:{topic}:{size}:head    decks popped so far
+    quiz:decks:{generation}:{topic}:{size}:tail    decks written so far
+    quiz:decks:{generation}:{topic}:{size}:{n}     deck number n
+
+Popping is one ``incr`` of the head, then reading and deleting that deck:
+a constant number of cache operations, whatever the size of the bank.
+Concurrent pops get distinct numbers, so a deck is never served twice. A
+refill writes new decks before moving the tail, and only one refill per
+topic runs at a time (a lock key taken with ``cache.add``). When the
+queue drops below QUIZ_DECK_POOL_LOW_WATER decks, the pop starts a refill
+in a background thread; ``manage.py fill_deck_pool`` fills the queues
+ahead of traffic (e.g. on deploy or from cron).
+
+Keys are scoped by the bank generation (answer_key.bank_generation), so
+any change to the question bank retires every queue at once. An empty or
+evicted queue makes the caller draw the quiz inline as before. Decks are
+not used with adaptive selection, which draws per user.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .adaptive import adaptive_enabled
+from .answer_key import abank_generation, bank_generation
+from .forms import QuizForm
+from .question_pool import aget_topic_counts, get_topic_counts, sample_questions
+
+logger = logging.getLogger(__name__)
+
+DECK_CACHE_KEY = 'quiz:decks:{generation}:{topic}:{size}:{name}'
+REFILL_LOCK_TIMEOUT = 60
+
+
+def deck_pool_enabled():
+    """Whether quiz starts pop pre-generated decks."""
+    return getattr(settings, 'QUIZ_DECK_POOL', False) and not adaptive_enabled()
+
+
+def pool_size():
+    """Decks a refill keeps queued per topic."""
+    return getattr(settings, 'QUIZ_DECK_POOL_SIZE', 200)
+
+
+def low_water():
+    """Queued decks below which a pop starts a refill."""
+    return getattr(settings, 'QUIZ_DECK_POOL_LOW_WATER', 50)
+
+
+def _timeout():
+    """Seconds a deck may wait in the cache."""
+    return getattr(settings, 'QUIZ_DECK_TIMEOUT', 3600)
+
+
+def _key(generation, topic, size, name):
+    return DECK_CACHE_KEY.format(generation=generation, topic=topic, size=size, name=name)
+
+
+def _incr(key, delta=1):
+    """Increments a counter, creating it at zero first."""
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key, delta)
+    except ValueError:  # Evicted between add and incr.
+        cache.add(key, 0, None)
+        return cache.incr(key, delta)
+
+
+async def _aincr(key, delta=1):
+    """Async variant of _incr."""
+    await cache.aadd(key, 0, None)
+    try:
+        return await cache.aincr(key, delta)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        return await cache.aincr(key, delta)
+
+
+def build_deck(topic, size):
+    """
+    Draws and renders one deck.
+
+    Args:
+        topic (str): Topic code
+        size (int): Questions per deck
+
+    Returns:
+        tuple: (question IDs, question cards HTML), or None if the topic
+        holds fewer than ``size`` questions
+    """
+    questions = sample_questions(topic, size)
+    if questions is None:
+        return None
+    html = render_to_string('quiz/quiz_questions.html', {'form': QuizForm(questions)})
+    return [question.id for question in questions], html
+
+
+def _counters(generation, topic, size):
+    """Returns (head, tail) of a topic's queue."""
+    head_key, tail_key = _key(generation, topic, size, 'head'), _key(generation, topic, size, 'tail')
+    counters = cache.get_many([head_key, tail_key])
+    return counters.get(head_key, 0), counters.get(tail_key, 0)
+
+
+def queued_decks(topic, size):
+    """Number of decks waiting in a topic's queue."""
+    head, tail = _counters(bank_generation(), topic, size)
+    return max(0, tail - head)
+
+
+def _fill(generation, topic, size, target):
+    """Writes decks until ``target`` are queued; the caller holds the refill lock."""
+    head, tail = _counters(generation, topic, size)
+    # Pops racing an empty queue may have moved the head past the tail.
+    start = max(head, tail)
+    decks = {}
+    for _ in range(target - max(0, tail - head)):
+        deck = build_deck(topic, size)
+        if deck is None:
+            break
+        decks[_key(generation, topic, size, start + len(decks) + 1)] = deck
+    if decks:
+        # Decks first, then the tail: a pop never finds a number it cannot read.
+        cache.set_many(decks, _timeout())
+        cache.set(_key(generation, topic, size, 'tail'), start + len(decks), None)
+    return len(decks)
+
+
+def refill_decks(topic, size, target=None):
+    """
+    Tops a topic's queue up to ``target`` decks.
+
+    Returns without doing anything when another refill of the topic holds
+    the lock.
+
+    Args:
+        topic (str): Topic code
+        size (int): Questions per deck
+        target (int): Decks to have queued, defaulting to QUIZ_DECK_POOL_SIZE
+
+    Returns:
+        int: Number of decks added
+    """
+    generation = bank_generation()
+    lock = _key(generation, topic, size, 'refill')
+    if not cache.add(lock, True, REFILL_LOCK_TIMEOUT):
+        return 0
+    try:
+        return _fill(generation, topic, size, pool_size() if target is None else target)
+    finally:
+        cache.delete(lock)
+
+
+def _start_refill(generation, topic, size, lock):
+    """Refills a topic's queue in a daemon thread that releases ``lock``."""
+    def run():
+        try:
+            _fill(generation, topic, size, pool_size())
+        except Exception:
+            logger.exception("Could not refill the %s deck pool", topic)
+        finally:
+            cache.delete(lock)
+            # The thread ends here: close its connections whatever their age.
+            connections.close_all()
+
+    threading.Thread(target=run, name=f'quiz-deck-refill-{topic}', daemon=True).start()
+
+
+def _unpack(deck):
+    if deck is None:
+        return None
+    question_ids, html = deck
+    return question_ids, mark_safe(html)
+
+
+def _popped(deck, remaining, generation, topic, size):
+    """Starts a refill when the queue runs low and unpacks the popped deck."""
+    if remaining < low_water() and get_topic_counts().get(topic, 0) >= size:
+        lock = _key(generation, topic, size, 'refill')
+        if cache.add(lock, True, REFILL_LOCK_TIMEOUT):
+            _start_refill(generation, topic, size, lock)
+    return _unpack(deck)
+
+
+async def _apopped(deck, remaining, generation, topic, size):
+    """Async variant of _popped."""
+    if remaining < low_water() and (await aget_topic_counts()).get(topic, 0) >= size:
+        lock = _key(generation, topic, size, 'refill')
+        if await cache.aadd(lock, True, REFILL_LOCK_TIMEOUT):
+            _start_refill(generation, topic, size, lock)
+    return _unpack(deck)
+
+
+def pop_deck(topic, size):
+    """
+    Takes the next pre-generated deck of a topic.
+
+    Args:
+        topic (str): Topic code
+        size (int): Questions per deck
+
+    Returns:
+        tuple: (question IDs, question cards HTML), or None when the queue
+        is empty; the caller then draws the quiz itself
+    """
+    generation = bank_generation()
+    head, tail = _counters(generation, topic, size)
+    if head >= tail:
+        return _popped(None, 0, generation, topic, size)
+    head = _incr(_key(generation, topic, size, 'head'))
+    if head > tail:
+        return _popped(None, 0, generation, topic, size)
+    deck_key = _key(generation, topic, size, head)
+    deck = cache.get(deck_key)
+    cache.delete(deck_key)
+    return _popped(deck, tail - head, generation, topic, size)
+
+
+async def apop_deck(topic, size):
+    """Async variant of pop_deck."""
+    generation = await abank_generation()
+    head_key, tail_key = _key(generation, topic, size, 'head'), _key(generation, topic, size, 'tail')
+    counters = await cache.aget_many([head_key, tail_key])
+    head, tail = counters.get(head_key, 0), counters.get(tail_key, 0)
+    if head >= tail:
+        return await _apopped(None, 0, generation, topic, size)
+    head = await _aincr(head_key)
+    if head > tail:
+        return await _apopped(None, 0, generation, topic, size)
+    deck_key = _key(generation, topic, size, head)
+    deck = await cache.aget(deck_key)
+    await cache.adelete(deck_key)
+    return await _apopped(deck, tail - head, generation, topic, size)
@@ -0,0 +1,129 @@
+"""
+Streaming export of quiz results, used by the staff export view and the
+``export_results`` command.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)``, with the
+username joined in the same query, and encoded one at a time as CSV or
+JSONL. Memory use does not depend on how many results match; no model
+instances are built.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Question, QuizResult, feedback_message_for
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+LINES_PER_BLOCK = 500
+COLUMNS = ('id', 'username', 'topic', 'date_taken', 'score', 'total_questions', 'percentage', 'feedback')
+
+
+class InvalidExportFilter(ValueError):
+    """Raised when an export filter cannot be understood."""
+
+
+def _start_of(value, name):
+    """Parses a YYYY-MM-DD date into the aware datetime of its midnight."""
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise InvalidExportFilter(f"{name} must be a date in YYYY-MM-DD format")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_queryset(date_from=None, date_to=None, topic=None, username=None):
+    """
+    Selects the results to export.
+
+    Args:
+        date_from (str): First day included (YYYY-MM-DD), or None
+        date_to (str): Last day included (YYYY-MM-DD), or None
+        topic (str): Topic code, or None for every topic
+        username (str): Only this user's results, or None for every user
+
+    Returns:
+        QuerySet: Tuples in COLUMNS order, up to ``percentage``
+
+    Raises:
+        InvalidExportFilter: If a date or the topic is invalid
+    """
+    results = QuizResult.objects.all()
+    if date_from:
+        results = results.filter(date_taken__gte=_start_of(date_from, 'from'))
+    if date_to:
+        results = results.filter(date_taken__lt=_start_of(date_to, 'to') + timedelta(days=1))
+    if topic:
+        if topic not in dict(Question.TOPIC_CHOICES):
+            raise InvalidExportFilter(f"topic must be one of {', '.join(sorted(dict(Question.TOPIC_CHOICES)))}")
+        results = results.filter(topic=topic)
+    if username:
+        results = results.filter(user__username=username)
+    return results.order_by('date_taken', 'id').values_list(
+        'id', 'user__username', 'topic', 'date_taken', 'score', 'total_questions',
+    )
+
+
+def iter_records(queryset, chunk_size=2000):
+    """
+    Streams export rows, adding the percentage and feedback columns.
+
+    Args:
+        queryset (QuerySet): Result of export_queryset
+        chunk_size (int): Rows fetched from the database at a time
+
+    Yields:
+        tuple: One row in COLUMNS order
+    """
+    for result_id, username, topic, date_taken, score, total in queryset.iterator(chunk_size=chunk_size):
+        percentage = score / total * 100 if total else 0.0
+        yield (
+            result_id, username, topic, date_taken.isoformat(), score, total,
+            round(percentage, 2), feedback_message_for(percentage),
+        )
+
+
+class _Line:
+    """File-like object handing back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(records):
+    """Encodes rows as CSV lines, header first."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(COLUMNS)
+    for record in records:
+        yield writer.writerow(record)
+
+
+def iter_jsonl(records):
+    """Encodes rows as JSON objects, one per line."""
+    for record in records:
+        yield json.dumps(dict(zip(COLUMNS, record)), ensure_ascii=False) + '\n'
+
+
+def iter_export(fmt, queryset, chunk_size=2000):
+    """
+    Streams an export as text blocks of up to LINES_PER_BLOCK lines, so a
+    response is not written one row at a time.
+
+    Args:
+        fmt (str): 'csv' or 'jsonl'
+        queryset (QuerySet): Result of export_queryset
+        chunk_size (int): Rows fetched from the database at a time
+
+    Yields:
+        str: Consecutive blocks of the export
+    """
+    records = iter_records(queryset, chunk_size)
+    lines = iter_csv(records) if fmt == 'csv' else iter_jsonl(records)
+    while block := ''.join(islice(lines, LINES_PER_BLOCK)):
+        yield block
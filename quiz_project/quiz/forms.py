@@ -45,23 +45,29 @@ class LoginForm(AuthenticationForm):
         self.fields['password'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Password'})
 
 
-class QuizForm(forms.Form):
-    def __init__(self, questions, *args, **kwargs):
+class QuizAnswerForm(forms.Form):
+    """
+    Validates submitted answers using question IDs only.
+
+    Each answer is checked against the option numbers 1-4, so grading a
+    submission does not require loading question or option text.
+
+    Args:
+        question_ids (iterable): IDs of the questions in the quiz
+    """
+    OPTION_CHOICES = [(number, number) for number in range(1, 5)]
+
+    def __init__(self, question_ids, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        for question in questions:
-            choices = [
-                (1, question.option1),
-                (2, question.option2),
-                (3, question.option3),
-                (4, question.option4),
-            ]
-            self.fields[f'question_{question.id}'] = forms.ChoiceField(
-                label=question.text,
-                choices=choices,
+        for question_id in question_ids:
+            self.fields[f'question_{question_id}'] = forms.TypedChoiceField(
+                choices=self.OPTION_CHOICES,
+                coerce=int,
                 widget=forms.RadioSelect(attrs={
                     'class': 'radio-input'
                 })
             )
+
     def clean(self):
         """
         Validate that all questions have been answered.
@@ -76,4 +82,31 @@ class QuizForm(forms.Form):
         for field_name, value in cleaned_data.items():
             if field_name.startswith('question_') and not value:
                 raise forms.ValidationError("Please answer all questions.")
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+    def answers(self):
+        """
+        Returns:
+            dict: {question_id: chosen option number} for a valid form
+        """
+        return {
+            int(field_name[len('question_'):]): value
+            for field_name, value in self.cleaned_data.items()
+            if field_name.startswith('question_')
+        }
+
+
+class QuizForm(QuizAnswerForm):
+    """Renders a quiz, labelling each question with its text and option text."""
+
+    def __init__(self, questions, *args, **kwargs):
+        super().__init__([question.id for question in questions], *args, **kwargs)
+        for question in questions:
+            field = self.fields[f'question_{question.id}']
+            field.label = question.text
+            field.choices = [
+                (1, question.option1),
+                (2, question.option2),
+                (3, question.option3),
+                (4, question.option4),
+            ]
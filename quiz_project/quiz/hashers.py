@@ -0,0 +1,50 @@
+"""
+Password hasher with a configurable work factor.
+
+``QUIZ_PASSWORD_PROFILE`` picks the PBKDF2 iteration count. The algorithm
+name stays ``pbkdf2_sha256``, so existing hashes keep verifying. Django
+rehashes a password whenever its stored iteration count differs from the
+hasher's, and it does so during the login that verifies it. Changing the
+profile therefore moves every user to the new work factor the next time
+they sign in, at the cost of one extra hash for that login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.exceptions import ImproperlyConfigured
+
+# Iterations of each profile. 'django' follows the installed Django release;
+# 'owasp' is the OWASP Password Storage Cheat Sheet minimum for
+# PBKDF2-HMAC-SHA256, at roughly 60% of Django's CPU cost per login. It is
+# below Django's default, so switching to it rehashes passwords downwards.
+PROFILES = {
+    'django': PBKDF2PasswordHasher.iterations,
+    'owasp': 600_000,
+}
+
+
+def profile_iterations(profile=None):
+    """
+    Resolves a password profile to its PBKDF2 iteration count.
+
+    Args:
+        profile (str): Profile name, or None for ``QUIZ_PASSWORD_PROFILE``
+
+    Returns:
+        int: Iterations of the profile
+
+    Raises:
+        ImproperlyConfigured: If the profile is unknown
+    """
+    profile = profile or getattr(settings, 'QUIZ_PASSWORD_PROFILE', 'django')
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ImproperlyConfigured(f"Unknown QUIZ_PASSWORD_PROFILE {profile!r}") from None
+
+
+class ProfiledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 hasher whose iterations follow ``QUIZ_PASSWORD_PROFILE``."""
+
+    @property
+    def iterations(self):
+        return profile_iterations()
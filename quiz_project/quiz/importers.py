@@ -0,0 +1,165 @@
+"""
+Streaming question importer used by the ``load_questions`` command.
+
+Rows are parsed lazily from CSV or JSONL sources and written in batches with
+``bulk_create``. Each question is keyed by its content hash, so re-running an
+import updates existing rows instead of creating duplicates.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.db import transaction
+
+from .answer_key import invalidate_answer_keys
+from .models import Question, question_content_hash
+from .question_pool import invalidate_question_pool
+from .search import index_questions
+from .snapshot import rebuild_snapshot_on_commit
+
+QUESTION_FIELDS = ('text', 'option1', 'option2', 'option3', 'option4', 'correct_option')
+FORMATS = ('csv', 'jsonl')
+
+
+class InvalidRow(ValueError):
+    """Raised when a source row cannot be turned into a question."""
+
+
+def iter_csv_rows(stream):
+    """
+    Yields ``(line_number, row)`` pairs from a CSV stream with a header row.
+
+    Args:
+        stream (file): Text stream opened with ``newline=''``
+    """
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_jsonl_rows(stream):
+    """
+    Yields ``(line_number, row)`` pairs from a stream of JSON objects, one per line.
+
+    Args:
+        stream (file): Text stream
+
+    Raises:
+        InvalidRow: If a non-blank line is not a JSON object
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise InvalidRow(f"line {line_number}: {exc}") from exc
+        if not isinstance(row, dict):
+            raise InvalidRow(f"line {line_number}: expected a JSON object")
+        yield line_number, row
+
+
+def iter_rows(stream, fmt):
+    """Dispatches to the row parser for ``fmt`` ('csv' or 'jsonl')."""
+    if fmt == 'csv':
+        return iter_csv_rows(stream)
+    return iter_jsonl_rows(stream)
+
+
+def build_question(row, default_topic=Question.DEFAULT_TOPIC):
+    """
+    Builds an unsaved Question (with its content hash) from a parsed row.
+
+    Args:
+        row (dict): Parsed source row
+        default_topic (str): Topic used when the row does not name one
+
+    Returns:
+        Question: Unsaved instance ready for ``bulk_create``
+
+    Raises:
+        InvalidRow: If a field is missing or out of range
+    """
+    missing = [field for field in QUESTION_FIELDS if not str(row.get(field) or '').strip()]
+    if missing:
+        raise InvalidRow(f"missing {', '.join(missing)}")
+
+    topic = str(row.get('topic') or default_topic).strip()
+    if topic not in dict(Question.TOPIC_CHOICES):
+        raise InvalidRow(f"unknown topic {topic!r}")
+
+    try:
+        correct_option = int(row['correct_option'])
+    except (TypeError, ValueError):
+        raise InvalidRow("correct_option must be an integer")
+    if not 1 <= correct_option <= 4:
+        raise InvalidRow("correct_option must be between 1 and 4")
+
+    values = {field: str(row[field]).strip() for field in QUESTION_FIELDS[:-1]}
+    return Question(
+        topic=topic,
+        correct_option=correct_option,
+        content_hash=question_content_hash(**values),
+        **values
+    )
+
+
+def batched(iterable, size):
+    """Yields lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_questions(questions):
+    """
+    Inserts a batch of questions, updating rows whose content already exists.
+
+    Args:
+        questions (list): Unsaved Question instances
+
+    Returns:
+        int: Number of distinct questions written
+    """
+    # Duplicates inside one batch would hit the same row twice in ON CONFLICT.
+    unique = list({question.content_hash: question for question in questions}.values())
+    with transaction.atomic():
+        Question.objects.bulk_create(
+            unique,
+            update_conflicts=True,
+            unique_fields=['content_hash'],
+            update_fields=['topic', 'correct_option'],
+        )
+        # bulk_create sends no post_save; index the batch here.
+        index_questions(unique)
+    return len(unique)
+
+
+def import_questions(questions, batch_size=1000, on_batch=None):
+    """
+    Writes an iterable of unsaved questions in batches.
+
+    Args:
+        questions (iterable): Unsaved Question instances, consumed lazily
+        batch_size (int): Rows per ``bulk_create`` call
+        on_batch (callable): Optional ``on_batch(rows_written)`` progress callback
+
+    Returns:
+        int: Number of rows written
+    """
+    written = 0
+    try:
+        for batch in batched(questions, batch_size):
+            written += upsert_questions(batch)
+            if on_batch is not None:
+                on_batch(written)
+    finally:
+        # bulk_create does not send post_save, so refresh cached data here.
+        invalidate_question_pool()
+        invalidate_answer_keys()
+        rebuild_snapshot_on_commit()
+    return written
@@ -0,0 +1,220 @@
+"""
+Per-request SQL and timing instrumentation, used by
+quiz.middleware.InstrumentationMiddleware.
+
+The state of the request being handled lives in a context variable, so it
+follows the request into the threads ``sync_to_async`` runs database code
+in. A wrapper installed on every database connection counts and times
+queries. The TimedDjangoTemplates backend (set in TEMPLATES) times
+top-level template rendering, which includes any lazy queries made from
+inside templates. Finished requests are kept in bounded per-route windows,
+summarized on demand.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('quiz_request_timings', default=None)
+_install_lock = threading.Lock()
+_installed = False
+
+
+@dataclass
+class RequestTimings:
+    """
+    Measurements of one request.
+
+    Attributes:
+        queries (int): SQL statements executed
+        db_seconds (float): Time spent executing them
+        template_seconds (float): Time spent rendering top-level templates
+        total_seconds (float): Time spent handling the request
+    """
+    queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+    total_seconds: float = 0.0
+    _template_depth: int = 0
+
+    def server_timing(self):
+        """Formats the measurements as a ``Server-Timing`` header value."""
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.2f}',
+            f'view;dur={self.total_seconds * 1000:.2f}',
+        ])
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's timings."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def _wrap_connection(connection, **kwargs):
+    """Installs record_query on a database connection once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """Template of TimedDjangoTemplates; adds top-level render time to the current request."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        if timings is None:
+            return self.template.render(context, request)
+        # Templates rendered from inside another one (e.g. by a template
+        # tag) are already part of the outer render time.
+        timings._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            timings._template_depth -= 1
+            if not timings._template_depth:
+                timings.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    Django template backend whose templates report their render time.
+
+    Costs one context variable lookup per render while no request is being
+    measured.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def install():
+    """Hooks query timing into every database connection. Safe to call repeatedly."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        connection_created.connect(_wrap_connection, dispatch_uid='quiz.instrumentation')
+        for connection in connections.all(initialized_only=True):
+            _wrap_connection(connection)
+        _installed = True
+
+
+def start_request():
+    """
+    Begins measuring a request in the current context.
+
+    Returns:
+        tuple: (RequestTimings, token to pass to finish_request)
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token):
+    """Stops measuring the request started with ``token``."""
+    _current.reset(token)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+
+class RouteStats:
+    """
+    Rolling per-route aggregates of finished requests.
+
+    Each route keeps its last ``QUIZ_INSTRUMENTATION_WINDOW`` requests. The
+    data is per process; every worker reports only what it served.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(self._window)
+
+    @staticmethod
+    def _window():
+        return deque(maxlen=getattr(settings, 'QUIZ_INSTRUMENTATION_WINDOW', 1000))
+
+    def record(self, route, timings):
+        """Adds a finished request, warning when it issued too many queries."""
+        with self._lock:
+            self._routes[route].append((
+                timings.total_seconds, timings.queries, timings.db_seconds, timings.template_seconds,
+            ))
+        threshold = getattr(settings, 'QUIZ_INSTRUMENTATION_QUERY_WARNING', 20)
+        if threshold and timings.queries > threshold:
+            logger.warning("%s issued %d queries (threshold %d)", route, timings.queries, threshold)
+
+    def snapshot(self):
+        """
+        Summarizes every route.
+
+        Returns:
+            dict: {route: {requests, mean/p50/p95/max ms, query and db/template means}}
+        """
+        with self._lock:
+            routes = {route: list(samples) for route, samples in self._routes.items()}
+        summary = {}
+        for route, samples in sorted(routes.items()):
+            durations = sorted(sample[0] * 1000 for sample in samples)
+            count = len(samples)
+            summary[route] = {
+                'requests': count,
+                'mean_ms': round(sum(durations) / count, 3),
+                'p50_ms': round(percentile(durations, 50), 3),
+                'p95_ms': round(percentile(durations, 95), 3),
+                'max_ms': round(durations[-1], 3),
+                'queries_mean': round(sum(sample[1] for sample in samples) / count, 2),
+                'queries_max': max(sample[1] for sample in samples),
+                'db_ms_mean': round(sum(sample[2] for sample in samples) * 1000 / count, 3),
+                'template_ms_mean': round(sum(sample[3] for sample in samples) * 1000 / count, 3),
+            }
+        return summary
+
+    def clear(self):
+        """Forgets every recorded request."""
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
+
+
+def view_name(request):
+    """Names the view that handled a request, e.g. 'quiz:history'."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def route_name(request):
+    """Names the route of a request for aggregation, e.g. 'GET quiz:history'."""
+    return f'{request.method} {view_name(request)}'
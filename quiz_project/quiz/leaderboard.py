@@ -0,0 +1,330 @@
+"""
+Incrementally maintained leaderboards.
+
+Every result updates one LeaderboardEntry per time window ('all', the
+current month and the current ISO week) for its user and topic. A user's
+best percentage is also counted in a LeaderboardBucket histogram, which
+answers "what is my rank" by summing at most 1001 bucket rows instead of
+counting users. Rendered top-N tables are cached for a short time.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import LeaderboardBucket, LeaderboardEntry, QuizResult
+
+WINDOWS = [window for window, _ in LeaderboardEntry.WINDOW_CHOICES]
+
+METRICS = {
+    'best': '-best_percentage',
+    'average': '-average_percentage',
+    'attempts': '-attempts',
+}
+
+TOP_CACHE_KEY = 'quiz:leaderboard:{topic}:{window}:{period}:{metric}:{limit}'
+
+
+def period_for(window, when=None):
+    """
+    Names the period of a window that contains a moment.
+
+    Args:
+        window (str): 'all', 'month' or 'week'
+        when (datetime): Moment to locate; defaults to now
+
+    Returns:
+        str: 'YYYY-MM' for months, 'YYYY-Www' for ISO weeks, '' for all time
+    """
+    local = timezone.localtime(when or timezone.now())
+    if window == 'month':
+        return local.strftime('%Y-%m')
+    if window == 'week':
+        year, week, _ = local.isocalendar()
+        return f'{year}-W{week:02d}'
+    return ''
+
+
+def to_bucket(percentage):
+    """Maps a percentage onto its histogram bucket (tenths of a percent)."""
+    return int(round(percentage * 10))
+
+
+def _board_filter(keys, fields):
+    """ORs together one filter per key tuple, naming its values ``fields``."""
+    condition = Q(pk__in=[])
+    for key in keys:
+        condition |= Q(**dict(zip(fields, key)))
+    return condition
+
+
+def shift_buckets(deltas):
+    """
+    Adds users to histogram buckets, creating the missing ones.
+
+    Missing rows are inserted first; every bucket then changes by one
+    UPDATE using F-expressions, so concurrent submissions never lose a
+    shift.
+
+    Args:
+        deltas (dict): {(topic, window, period, bucket): users to add},
+            negative to remove
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    fields = ['topic', 'window', 'period', 'bucket']
+    LeaderboardBucket.objects.bulk_create(
+        [LeaderboardBucket(users=0, **dict(zip(fields, key))) for key in deltas],
+        ignore_conflicts=True,
+    )
+    LeaderboardBucket.objects.filter(_board_filter(deltas, fields)).update(users=F('users') + Case(
+        *(When(Q(**dict(zip(fields, key))), then=Value(delta)) for key, delta in deltas.items()),
+        default=Value(0),
+    ))
+
+
+def record_results(results):
+    """
+    Updates the leaderboards for newly created results.
+
+    Every affected entry (one per user, topic and window) is written with
+    a constant number of queries, whatever the number of results:
+    missing entries are inserted empty, the entries are locked and read
+    once, changed by a single UPDATE using F-expressions, and the bucket
+    shifts are applied together.
+
+    Args:
+        results (iterable): Newly created QuizResult instances
+    """
+    totals = {}
+    for result in results:
+        if not result.total_questions:
+            continue
+        for window in WINDOWS:
+            key = (result.user_id, result.topic, window, period_for(window, result.date_taken))
+            total = totals.setdefault(key, [0, 0, 0, 0.0])
+            total[0] += 1
+            total[1] += result.score
+            total[2] += result.total_questions
+            total[3] = max(total[3], result.percentage())
+    if not totals:
+        return
+
+    fields = ['user_id', 'topic', 'window', 'period']
+    with transaction.atomic():
+        LeaderboardEntry.objects.bulk_create(
+            [LeaderboardEntry(**dict(zip(fields, key))) for key in totals],
+            ignore_conflicts=True,
+        )
+        entries = (
+            LeaderboardEntry.objects.select_for_update()
+            .filter(_board_filter(totals, fields))
+            .values_list('id', *fields, 'attempts', 'best_percentage')
+        )
+        changes = {}
+        buckets = Counter()
+        for pk, *key, attempts, old_best in entries:
+            key = tuple(key)
+            changes[pk] = totals[key]
+            board, best = key[1:], totals[key][3]
+            if not attempts:
+                # Inserted empty above: the user is new on this board.
+                buckets[(*board, to_bucket(best))] += 1
+            elif to_bucket(best) > to_bucket(old_best):
+                buckets[(*board, to_bucket(old_best))] -= 1
+                buckets[(*board, to_bucket(best))] += 1
+
+        def delta(index):
+            return Case(
+                *(When(pk=pk, then=Value(total[index])) for pk, total in changes.items()),
+                default=Value(0),
+            )
+
+        score_sum, question_sum = F('score_sum') + delta(1), F('question_sum') + delta(2)
+        LeaderboardEntry.objects.filter(pk__in=list(changes)).update(
+            attempts=F('attempts') + delta(0),
+            score_sum=score_sum,
+            question_sum=question_sum,
+            average_percentage=ExpressionWrapper(score_sum * 100.0 / question_sum, output_field=FloatField()),
+            best_percentage=Greatest('best_percentage', Case(
+                *(When(pk=pk, then=Value(total[3])) for pk, total in changes.items()),
+                default=Value(0.0),
+            )),
+        )
+        shift_buckets(buckets)
+
+
+def forget_user(user_id):
+    """
+    Removes a user's entries from the bucket histograms.
+
+    Called before the user (and, by cascade, their entries) is deleted.
+
+    Args:
+        user_id (int): Primary key of the user
+    """
+    buckets = Counter()
+    entries = LeaderboardEntry.objects.filter(user_id=user_id).values_list(
+        'topic', 'window', 'period', 'best_percentage')
+    for topic, window, period, best in entries:
+        buckets[(topic, window, period, to_bucket(best))] -= 1
+    shift_buckets(buckets)
+
+
+def top_entries(topic, window, metric='best', limit=10, when=None):
+    """
+    Returns the leading entries of a board, read through a covering index.
+
+    Args:
+        topic (str): Topic code
+        window (str): 'all', 'month' or 'week'
+        metric (str): 'best', 'average' or 'attempts'
+        limit (int): Number of entries
+        when (datetime): Moment selecting the month/week; defaults to now
+
+    Returns:
+        list: LeaderboardEntry instances with their users loaded
+    """
+    return list(
+        LeaderboardEntry.objects
+        .filter(topic=topic, window=window, period=period_for(window, when))
+        .select_related('user')
+        .order_by(METRICS[metric], 'id')[:limit]
+    )
+
+
+def render_top_entries(topic, window, metric='best', limit=10):
+    """
+    Renders the top-N table of a board, cached for
+    ``QUIZ_LEADERBOARD_CACHE_TIMEOUT`` seconds.
+
+    Returns:
+        str: Safe HTML of the table
+    """
+    period = period_for(window)
+    key = TOP_CACHE_KEY.format(topic=topic, window=window, period=period, metric=metric, limit=limit)
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string('quiz/leaderboard_table.html', {
+            'entries': top_entries(topic, window, metric, limit),
+            'metric': metric,
+        })
+        cache.set(key, html, getattr(settings, 'QUIZ_LEADERBOARD_CACHE_TIMEOUT', 60))
+    return html
+
+
+def user_standing(user, topic, window):
+    """
+    Finds a user's entry and rank (by best percentage) on a board.
+
+    Args:
+        user (User): The user to locate
+        topic (str): Topic code
+        window (str): 'all', 'month' or 'week'
+
+    Returns:
+        tuple: (entry, rank), or (None, None) if the user has no entry
+    """
+    board = {'topic': topic, 'window': window, 'period': period_for(window)}
+    entry = LeaderboardEntry.objects.filter(user=user, **board).first()
+    if entry is None:
+        return None, None
+    ahead = LeaderboardBucket.objects.filter(
+        bucket__gt=to_bucket(entry.best_percentage), **board
+    ).aggregate(users=Sum('users'))['users']
+    return entry, (ahead or 0) + 1
+
+
+def _entry_totals(results, batch_size=1000):
+    """
+    Sums results into {(user_id, topic, window, period): [attempts,
+    score_sum, question_sum, best_percentage]}.
+    """
+    totals = {}
+    rows = results.values_list('user_id', 'topic', 'date_taken', 'score', 'total_questions')
+    for user_id, topic, date_taken, score, total_questions in rows.iterator(chunk_size=batch_size):
+        if not total_questions:
+            continue
+        percentage = score / total_questions * 100
+        for window in WINDOWS:
+            key = (user_id, topic, window, period_for(window, date_taken))
+            entry = totals.setdefault(key, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += score
+            entry[2] += total_questions
+            entry[3] = max(entry[3], percentage)
+    return totals
+
+
+def _entries(totals):
+    """Builds unsaved LeaderboardEntry rows from ``_entry_totals``."""
+    return [
+        LeaderboardEntry(
+            user_id=user_id, topic=topic, window=window, period=period,
+            attempts=attempts, score_sum=score_sum, question_sum=question_sum,
+            best_percentage=best, average_percentage=score_sum * 100 / question_sum,
+        )
+        for (user_id, topic, window, period), (attempts, score_sum, question_sum, best) in totals.items()
+    ]
+
+
+def refresh_users(user_ids):
+    """
+    Recomputes the entries of some users from the results table.
+
+    Used when stored results change score, which the incremental updates
+    cannot express. The users' entries are replaced and the histograms
+    shifted from their old best percentages to the new ones.
+
+    Args:
+        user_ids (iterable): Primary keys of the users
+    """
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        old = (
+            LeaderboardEntry.objects.select_for_update().filter(user_id__in=user_ids)
+            .values_list('topic', 'window', 'period', 'best_percentage')
+        )
+        buckets = Counter()
+        for topic, window, period, best in old:
+            buckets[(topic, window, period, to_bucket(best))] -= 1
+        LeaderboardEntry.objects.filter(user_id__in=user_ids).delete()
+        entries = _entries(_entry_totals(QuizResult.objects.filter(user_id__in=user_ids).order_by()))
+        for entry in entries:
+            buckets[(entry.topic, entry.window, entry.period, to_bucket(entry.best_percentage))] += 1
+        LeaderboardEntry.objects.bulk_create(entries)
+        shift_buckets(buckets)
+
+
+def rebuild(batch_size=1000):
+    """
+    Recomputes every entry and bucket from the results table.
+
+    Returns:
+        int: Number of entries written
+    """
+    totals = _entry_totals(QuizResult.objects.order_by(), batch_size)
+
+    buckets = {}
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardBucket.objects.all().delete()
+        entries = _entries(totals)
+        for entry in entries:
+            bucket_key = (entry.topic, entry.window, entry.period, to_bucket(entry.best_percentage))
+            buckets[bucket_key] = buckets.get(bucket_key, 0) + 1
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=batch_size)
+        LeaderboardBucket.objects.bulk_create(
+            [
+                LeaderboardBucket(topic=topic, window=window, period=period, bucket=bucket, users=users)
+                for (topic, window, period, bucket), users in buckets.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(entries)
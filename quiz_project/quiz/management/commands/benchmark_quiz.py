@@ -0,0 +1,94 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from quiz.benchmarks import SCENARIOS, BenchmarkConfig, compare, run
+from quiz.hashers import PROFILES
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the quiz routes against a throwaway test database seeded '
+        'with generated data, sequentially and with concurrent workers. '
+        'Saves the report as JSON and compares it with a saved baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=200, help='Questions to seed (default: 200)')
+        parser.add_argument('--users', type=int, default=20, help='Users to seed (default: 20)')
+        parser.add_argument('--results-per-user', type=int, default=50,
+                            help='Past results to seed per user (default: 50)')
+        parser.add_argument('--iterations', type=int, default=100,
+                            help='Requests per route in each mode (default: 100)')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Threads of the concurrent run; 0 skips it (default: 4)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), dest='scenarios',
+                            help='Route to benchmark; repeat for several (default: all)')
+        parser.add_argument('--password-profile', choices=sorted(PROFILES),
+                            help='Password hashing profile of the run (default: QUIZ_PASSWORD_PROFILE)')
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Serve questions from a question snapshot built from the seeded bank')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--baseline', help='Compare against a previously saved JSON report')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 growth before flagging a regression (default: 0.25)')
+
+    def handle(self, *args, **options):
+        if options['questions'] < 5 or options['users'] < 1 or options['results_per_user'] < 1:
+            raise CommandError('Seed at least 5 questions, 1 user and 1 result per user')
+        if options['iterations'] < 1 or options['workers'] < 0:
+            raise CommandError('--iterations must be positive and --workers not negative')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as stream:
+                    baseline = json.load(stream)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        config = BenchmarkConfig(
+            questions=options['questions'],
+            users=options['users'],
+            results_per_user=options['results_per_user'],
+            iterations=options['iterations'],
+            workers=options['workers'],
+            seed=options['seed'],
+            scenarios=tuple(options['scenarios'] or ()),
+            password_profile=options['password_profile'],
+            snapshot=options['snapshot'],
+        )
+        report = run(config)
+        self.print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, indent=2, sort_keys=True)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(baseline, report, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(self.style.ERROR(f'Regression: {regression}'))
+                raise CommandError(f'{len(regressions)} regression(s) against {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def print_report(self, report):
+        """Prints one line per mode and route."""
+        header = f"{'mode':<11}{'route':<13}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'sql ms':>9}"
+        self.stdout.write(header)
+        for mode in ('sequential', 'concurrent'):
+            for name, stats in report[mode].items():
+                self.stdout.write(
+                    f"{mode:<11}{name:<13}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                    f"{stats['p99_ms']:>9.2f}{stats['requests_per_s']:>9.1f}"
+                    f"{stats['queries_mean']:>9.1f}{stats['sql_ms_mean']:>9.2f}"
+                )
+        if 'login_throughput' in report:
+            throughput = report['login_throughput']
+            line = (f"Logins per second per core ({report['meta']['password_iterations']} PBKDF2 "
+                    f"iterations): {throughput['sequential']:.1f} sequential")
+            if throughput['concurrent'] is not None:
+                line += f", {throughput['concurrent']:.1f} concurrent"
+            self.stdout.write(line)
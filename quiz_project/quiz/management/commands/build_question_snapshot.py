@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.snapshot import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles the question bank into the binary snapshot that workers '
+        'memory-map, and atomically replaces the previous snapshot'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Snapshot file to write (default: QUIZ_SNAPSHOT_PATH)')
+
+    def handle(self, *args, **options):
+        path = options['output'] or snapshot_path()
+        if path is None:
+            raise CommandError('Set QUIZ_SNAPSHOT_PATH or pass --output')
+        count = build_snapshot(path)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} questions to {path}'))
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from quiz.exports import FORMATS, InvalidExportFilter, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports quiz results as CSV or JSONL, optionally filtered by date range, '
+        'topic and user. Rows are streamed, so memory use stays constant.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=FORMATS, default='csv',
+            help='Output format (default: csv)'
+        )
+        parser.add_argument('--from', dest='date_from', help='First day included (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day included (YYYY-MM-DD)')
+        parser.add_argument('--topic', help='Only results of this topic code')
+        parser.add_argument('--user', dest='username', help='Only results of this username')
+        parser.add_argument(
+            '--output', default='-',
+            help='File to write, or "-" for stdout (default)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=getattr(settings, 'QUIZ_EXPORT_CHUNK_SIZE', 2000),
+            help='Rows fetched from the database at a time'
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        try:
+            results = export_queryset(
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                topic=options['topic'],
+                username=options['username'],
+            )
+        except InvalidExportFilter as exc:
+            raise CommandError(str(exc))
+
+        blocks = iter_export(options['format'], results, options['chunk_size'])
+        if options['output'] == '-':
+            for block in blocks:
+                self.stdout.write(block, ending='')
+            return
+        try:
+            stream = open(options['output'], 'w', encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(f"Cannot write {options['output']}: {exc}")
+        with stream:
+            for block in blocks:
+                stream.write(block)
+        self.stdout.write(self.style.SUCCESS(f"Exported results to {options['output']}"))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from quiz.decks import low_water, pool_size, queued_decks, refill_decks
+from quiz.models import Question
+from quiz.views import QUESTIONS_PER_QUIZ
+
+
+class Command(BaseCommand):
+    help = 'Fills the per-topic queues of pre-generated quiz decks (QUIZ_DECK_POOL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topic', action='append', choices=[code for code, _ in Question.TOPIC_CHOICES],
+                            help='Topic to fill; repeat for several (default: every topic)')
+        parser.add_argument('--size', type=int, default=None,
+                            help='Decks to have queued per topic (default: QUIZ_DECK_POOL_SIZE)')
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running, topping up queues below QUIZ_DECK_POOL_LOW_WATER every N seconds')
+
+    def handle(self, *args, **options):
+        size = pool_size() if options['size'] is None else options['size']
+        if size < 1:
+            raise CommandError('--size must be at least 1')
+        topics = options['topic'] or [code for code, _ in Question.TOPIC_CHOICES]
+        for topic in topics:
+            added = refill_decks(topic, QUESTIONS_PER_QUIZ, target=size)
+            self.stdout.write(f'{topic}: {added} decks added, {queued_decks(topic, QUESTIONS_PER_QUIZ)} queued')
+        if options['every'] is None:
+            self.stdout.write(self.style.SUCCESS('Deck pool filled'))
+            return
+        while True:
+            time.sleep(options['every'])
+            for topic in topics:
+                if queued_decks(topic, QUESTIONS_PER_QUIZ) < low_water():
+                    refill_decks(topic, QUESTIONS_PER_QUIZ, target=size)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from quiz.writebehind import ResultWriter, journal_dir
+
+
+class Command(BaseCommand):
+    help = (
+        'Stores quiz results left in the write-behind journal by processes '
+        'that stopped before flushing them. Segments of running processes '
+        'are left alone.'
+    )
+
+    def handle(self, *args, **options):
+        replayed = ResultWriter(journal_dir()).replay_orphans()
+        self.stdout.write(self.style.SUCCESS(f'Replayed {replayed} journaled results'))
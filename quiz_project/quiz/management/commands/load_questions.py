@@ -1,183 +1,135 @@
-from django.core.management.base import BaseCommand
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from quiz.importers import FORMATS, InvalidRow, build_question, import_questions, iter_rows
 from quiz.models import Question
+from quiz.search import NEAR_DUPLICATE_THRESHOLD, find_near_duplicates, search_backend
+
+DEFAULT_SOURCE = Path(__file__).resolve().parents[2] / 'data' / 'french_questions.jsonl'
 
 
 class Command(BaseCommand):
-    help = 'Loads French language questions into the database'
+    help = (
+        'Imports questions from CSV or JSONL files (or "-" for stdin). '
+        'Rows are upserted by content, so re-running an import is safe. '
+        'Without arguments the bundled French questions are loaded.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources', nargs='*',
+            help='CSV/JSONL files to import, or "-" to read stdin'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Source format; inferred from the file extension when omitted (stdin defaults to jsonl)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows written per bulk insert (default: 1000)'
+        )
+        parser.add_argument(
+            '--topic', default=Question.DEFAULT_TOPIC,
+            help=f'Topic for rows that do not specify one (default: {Question.DEFAULT_TOPIC})'
+        )
+        parser.add_argument(
+            '--near-duplicates', choices=('report', 'skip'),
+            help='Look up every row in the full-text index and report (or skip) rows '
+                 'worded almost like an existing question of the same topic'
+        )
+        parser.add_argument(
+            '--similarity', type=float, default=NEAR_DUPLICATE_THRESHOLD,
+            help=f'Share of common words that makes a near duplicate (default: {NEAR_DUPLICATE_THRESHOLD})'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['near_duplicates'] and search_backend() is None:
+            raise CommandError('--near-duplicates needs the SQLite or PostgreSQL full-text index')
+        sources = options['sources'] or [str(DEFAULT_SOURCE)]
+
+        started = time.perf_counter()
+        written = 0
+        for source in sources:
+            fmt = options['format'] or self.detect_format(source)
+            with self.open_source(source) as stream:
+                questions = self.iter_questions(source, iter_rows(stream, fmt), options['topic'])
+                if options['near_duplicates']:
+                    questions = self.check_near_duplicates(
+                        source, questions, options['similarity'], skip=options['near_duplicates'] == 'skip')
+                written += import_questions(
+                    questions,
+                    batch_size=options['batch_size'],
+                    on_batch=lambda count: self.report_progress(written + count, started, options),
+                )
+
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {written} questions in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
+
+    def detect_format(self, source):
+        """Infers the source format from its extension."""
+        if source == '-':
+            return 'jsonl'
+        suffix = Path(source).suffix.lower().lstrip('.')
+        if suffix == 'csv':
+            return 'csv'
+        if suffix in ('jsonl', 'ndjson', 'json'):
+            return 'jsonl'
+        raise CommandError(f'Cannot infer the format of {source}; pass --format')
+
+    @contextmanager
+    def open_source(self, source):
+        """Opens a source file, or yields stdin for "-"."""
+        if source == '-':
+            yield sys.stdin
+            return
+        try:
+            stream = open(source, encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f'Cannot read {source}: {exc}')
+        with stream:
+            yield stream
+
+    def iter_questions(self, source, rows, default_topic):
+        """Lazily turns parsed rows into unsaved questions, failing on the first bad row."""
+        try:
+            for line_number, row in rows:
+                try:
+                    yield build_question(row, default_topic)
+                except InvalidRow as exc:
+                    raise CommandError(f'{source}, line {line_number}: {exc}')
+        except InvalidRow as exc:
+            raise CommandError(f'{source}, {exc}')
 
-    def handle(self, *args, **kwargs):
-        questions = [
-            {
-                'text': 'What is the French word for "hello"?',
-                'option1': 'Bonjour',
-                'option2': 'Au revoir',
-                'option3': 'Merci',
-                'option4': 'S\'il vous plaît',
-                'correct_option': 1,
-            },
-            {
-                'text': 'How do you say "goodbye" in French?',
-                'option1': 'Bonjour',
-                'option2': 'Au revoir',
-                'option3': 'Merci',
-                'option4': 'Excusez-moi',
-                'correct_option': 2,
-            },
-            {
-                'text': 'What does "merci" mean in English?',
-                'option1': 'Please',
-                'option2': 'Thank you',
-                'option3': 'Hello',
-                'option4': 'Goodbye',
-                'correct_option': 2,
-            },
-            {
-                'text': 'How do you say "please" in French?',
-                'option1': 'Pardon',
-                'option2': 'Merci',
-                'option3': 'S\'il vous plaît',
-                'option4': 'Excusez-moi',
-                'correct_option': 3,
-            },
-            {
-                'text': 'What is the French word for "water"?',
-                'option1': 'Pain',
-                'option2': 'Fromage',
-                'option3': 'Eau',
-                'option4': 'Vin',
-                'correct_option': 3,
-            },
-            {
-                'text': 'How do you say "bread" in French?',
-                'option1': 'Fromage',
-                'option2': 'Pain',
-                'option3': 'Beurre',
-                'option4': 'Lait',
-                'correct_option': 2,
-            },
-            {
-                'text': 'What does "je m\'appelle" mean in English?',
-                'option1': 'I am happy',
-                'option2': 'My name is',
-                'option3': 'I am hungry',
-                'option4': 'I don\'t know',
-                'correct_option': 2,
-            },
-            {
-                'text': 'How do you say "I don\'t understand" in French?',
-                'option1': 'Je ne sais pas',
-                'option2': 'Je ne comprends pas',
-                'option3': 'Je ne parle pas français',
-                'option4': 'Je suis désolé',
-                'correct_option': 2,
-            },
-            {
-                'text': 'What is the French word for "cat"?',
-                'option1': 'Chien',
-                'option2': 'Oiseau',
-                'option3': 'Chat',
-                'option4': 'Poisson',
-                'correct_option': 3,
-            },
-            {
-                'text': 'How do you say "dog" in French?',
-                'option1': 'Chat',
-                'option2': 'Cheval',
-                'option3': 'Chien',
-                'option4': 'Lapin',
-                'correct_option': 3,
-            },
-            {
-                'text': 'What does "aujourd\'hui" mean in English?',
-                'option1': 'Yesterday',
-                'option2': 'Tomorrow',
-                'option3': 'Today',
-                'option4': 'Now',
-                'correct_option': 3,
-            },
-            {
-                'text': 'How do you say "tomorrow" in French?',
-                'option1': 'Hier',
-                'option2': 'Aujourd\'hui',
-                'option3': 'Demain',
-                'option4': 'Maintenant',
-                'correct_option': 3,
-            },
-            {
-                'text': 'What is the French word for "book"?',
-                'option1': 'Crayon',
-                'option2': 'Livre',
-                'option3': 'Papier',
-                'option4': 'Stylo',
-                'correct_option': 2,
-            },
-            {
-                'text': 'How do you say "pen" in French?',
-                'option1': 'Crayon',
-                'option2': 'Gomme',
-                'option3': 'Stylo',
-                'option4': 'Livre',
-                'correct_option': 3,
-            },
-            {
-                'text': 'What does "école" mean in English?',
-                'option1': 'School',
-                'option2': 'House',
-                'option3': 'Park',
-                'option4': 'Office',
-                'correct_option': 1,
-            },
-            {
-                'text': 'How do you say "house" in French?',
-                'option1': 'Appartement',
-                'option2': 'Maison',
-                'option3': 'Bâtiment',
-                'option4': 'Château',
-                'correct_option': 2,
-            },
-            {
-                'text': 'What is the French word for "car"?',
-                'option1': 'Vélo',
-                'option2': 'Bus',
-                'option3': 'Voiture',
-                'option4': 'Train',
-                'correct_option': 3,
-            },
-            {
-                'text': 'How do you say "bicycle" in French?',
-                'option1': 'Moto',
-                'option2': 'Vélo',
-                'option3': 'Scooter',
-                'option4': 'Voiture',
-                'correct_option': 2,
-            },
-            {
-                'text': 'What does "l\'hôtel" mean in English?',
-                'option1': 'Hospital',
-                'option2': 'Restaurant',
-                'option3': 'Hotel',
-                'option4': 'Airport',
-                'correct_option': 3,
-            },
-            {
-                'text': 'How do you say "airport" in French?',
-                'option1': 'Gare',
-                'option2': 'Aéroport',
-                'option3': 'Port',
-                'option4': 'Station de métro',
-                'correct_option': 2,
-            },
-        ]
+    def check_near_duplicates(self, source, questions, threshold, skip):
+        """
+        Reports questions resembling one already in the bank, dropping them when ``skip`` is set.
 
-        for q_data in questions:
-            Question.objects.create(
-                topic='FR',
-                text=q_data['text'],
-                option1=q_data['option1'],
-                option2=q_data['option2'],
-                option3=q_data['option3'],
-                option4=q_data['option4'],
-                correct_option=q_data['correct_option']
-            )
+        Rows are compared with questions written by earlier batches, not
+        with rows of the batch being built.
+        """
+        for question in questions:
+            duplicates = find_near_duplicates(question, threshold)
+            if duplicates:
+                similar = ', '.join(f'#{other.id} ({similarity:.0%})' for other, similarity in duplicates)
+                action = 'skipped' if skip else 'imported'
+                self.stderr.write(self.style.WARNING(
+                    f'{source}: "{question.text[:60]}" resembles {similar}; {action}'
+                ))
+                if skip:
+                    continue
+            yield question
 
-        self.stdout.write(self.style.SUCCESS('Successfully loaded French language questions'))
\ No newline at end of file
+    def report_progress(self, written, started, options):
+        """Prints running throughput when verbosity is 2 or higher."""
+        if options['verbosity'] < 2:
+            return
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'{written} rows ({written / elapsed:.0f} rows/s)')
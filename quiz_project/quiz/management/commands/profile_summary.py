@@ -0,0 +1,76 @@
+import io
+import pstats
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from quiz.profiling import parse_profile_name, profile_dir, summarize_collapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarizes the profiles collected by the profiling middleware: the '
+        'top functions across all cProfile (.prof) and stack-sampler '
+        '(.collapsed) profiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Profile directory (default: QUIZ_PROFILING_DIR)')
+        parser.add_argument('--url-name', help='Only include profiles of this URL name, e.g. quiz.history')
+        parser.add_argument('--min-ms', type=int, default=0,
+                            help='Only include requests that took at least this long')
+        parser.add_argument('--limit', type=int, default=20, help='Functions to show (default: 20)')
+        parser.add_argument('--sort', choices=('cumulative', 'tottime', 'ncalls'), default='cumulative',
+                            help='Order of the cProfile summary (default: cumulative)')
+
+    def handle(self, *args, **options):
+        directory = Path(options['dir']) if options['dir'] else profile_dir()
+        if not directory.is_dir():
+            raise CommandError(f'No profile directory at {directory}')
+
+        selected = []
+        for path in sorted(directory.iterdir()):
+            url_name, duration_ms = parse_profile_name(path)
+            if url_name is None:
+                continue
+            if options['url_name'] and url_name != options['url_name']:
+                continue
+            if duration_ms < options['min_ms']:
+                continue
+            selected.append((path, url_name, duration_ms))
+        if not selected:
+            raise CommandError(f'No matching profiles in {directory}')
+
+        self.print_requests(selected)
+        prof = [str(path) for path, _, _ in selected if path.suffix == '.prof']
+        collapsed = [path for path, _, _ in selected if path.suffix == '.collapsed']
+        if prof:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\ncProfile: {len(prof)} profile(s)'))
+            output = io.StringIO()
+            stats = pstats.Stats(*prof, stream=output)
+            stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+            self.stdout.write(output.getvalue(), ending='')
+        if collapsed:
+            self.print_collapsed(collapsed, options['limit'])
+
+    def print_requests(self, selected):
+        """Prints how many profiles each URL name has and their durations."""
+        by_name = {}
+        for _, url_name, duration_ms in selected:
+            by_name.setdefault(url_name, []).append(duration_ms)
+        self.stdout.write(self.style.MIGRATE_HEADING('Profiled requests'))
+        for url_name, durations in sorted(by_name.items()):
+            self.stdout.write(
+                f'  {url_name:<30} {len(durations):>5} profiles, '
+                f'mean {sum(durations) / len(durations):.0f}ms, max {max(durations)}ms'
+            )
+
+    def print_collapsed(self, paths, limit):
+        """Prints the functions with the most samples, self and inclusive."""
+        total, self_samples, inclusive = summarize_collapsed(paths)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\nStack sampler: {len(paths)} profile(s), {total} samples'))
+        if not total:
+            return
+        self.stdout.write(f"{'self %':>8}{'total %':>9}  function")
+        for frame, count in self_samples.most_common(limit):
+            self.stdout.write(f'{count * 100 / total:>8.1f}{inclusive[frame] * 100 / total:>9.1f}  {frame}')
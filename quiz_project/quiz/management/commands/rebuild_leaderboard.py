@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from quiz.leaderboard import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the leaderboard entries and rank histograms from all quiz results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read and written per query (default: 1000)')
+
+    def handle(self, *args, **options):
+        written = rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} leaderboard entries'))
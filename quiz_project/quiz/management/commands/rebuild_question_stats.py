@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from quiz.models import QuestionStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-question answer statistics by streaming over all stored answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Answers fetched from the database at a time (default: 2000)')
+
+    def handle(self, *args, **options):
+        written = QuestionStats.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {written} questions'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from quiz.models import UserQuizStats, UserTopicStats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user and per-topic quiz statistics tables from all quiz results'
+
+    def handle(self, *args, **kwargs):
+        written = UserQuizStats.rebuild()
+        topics = UserTopicStats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt statistics for {written} users ({topics} user/topic pairs)'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.search import rebuild_index, search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text index of question texts and options (SQLite FTS5 or PostgreSQL tsvector)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Questions fetched from the database at a time (default: 2000)')
+
+    def handle(self, *args, **options):
+        if search_backend() is None:
+            raise CommandError('This database has no full-text index; only SQLite and PostgreSQL are supported')
+        indexed = rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} questions'))
@@ -0,0 +1,302 @@
+"""
+Counters and latency histograms exposed in the Prometheus text format.
+
+Every metric keeps its values in process memory behind its own lock, so
+recording is a dict update. Under a multi-process server (e.g. several
+gunicorn workers) set ``QUIZ_METRICS_DIR`` to a directory shared by the
+workers. Each process then writes its values there as a small JSON file,
+at most once every ``QUIZ_METRICS_FLUSH_INTERVAL`` seconds and at exit,
+and the endpoint sums the files of all workers. The files of stopped
+workers are kept so counters do not go backwards; empty the directory when
+deploying, as with any multi-process Prometheus setup.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    """Escapes a label value for the text exposition format."""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    """Formats ``{name="value",...}``; empty when there are no labels."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in [*zip(names, values), *extra]]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """
+    Base class of registered metrics.
+
+    Values are keyed by the tuple of label values, in ``labelnames`` order.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        self._registry = registry or REGISTRY
+        self._registry.register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        """Returns a copy of the values of this process."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def reset(self):
+        """Forgets every value (used after fork and in tests)."""
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(Metric):
+    """A monotonically increasing count."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """Adds ``amount`` to the count of the given label values."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        self._registry.maybe_flush()
+
+    @staticmethod
+    def merge(total, value):
+        return (total or 0) + value
+
+    def exposition(self, values):
+        """Yields the sample lines of merged values."""
+        for key, value in sorted(values.items()):
+            yield f'{self.name}{_labels(self.labelnames, key)} {value}'
+
+
+class Histogram(Metric):
+    """
+    Observations counted in fixed buckets, plus their sum and count.
+
+    A value is stored as ``[bucket counts..., +Inf count, sum]``; bucket
+    counts are per bucket and only made cumulative for exposition.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        """Records one observation, e.g. a duration in seconds."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+        self._registry.maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+        """Observes the duration of the ``with`` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def exposition(self, values):
+        """Yields the cumulative bucket, sum and count lines of merged values."""
+        for key, entry in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip([*self.buckets, '+Inf'], entry[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                yield f'{self.name}_bucket{_labels(self.labelnames, key, [("le", le)])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, key)} {entry[-1]}'
+            yield f'{self.name}_count{_labels(self.labelnames, key)} {cumulative}'
+
+
+class Registry:
+    """Holds the metrics of the process and aggregates them across processes."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._instance = uuid.uuid4().hex[:8]
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+
+    def directory(self):
+        """Shared snapshot directory, or None in single-process mode."""
+        directory = getattr(settings, 'QUIZ_METRICS_DIR', None)
+        return Path(directory) if directory else None
+
+    def snapshot_path(self, directory):
+        """File holding this process's values (pid plus a per-run id)."""
+        return directory / f'{os.getpid()}-{self._instance}.json'
+
+    def snapshot(self):
+        """Values of this process as a JSON-serializable dict."""
+        return {
+            name: [[list(key), value] for key, value in metric.snapshot().items()]
+            for name, metric in self._metrics.items()
+        }
+
+    def flush(self):
+        """Atomically writes this process's values to the shared directory."""
+        directory = self.directory()
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_path(directory)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(self.snapshot()), encoding='utf-8')
+        os.replace(temporary, path)
+
+    def maybe_flush(self):
+        """Flushes if the interval has passed; never blocks on another flush."""
+        interval = getattr(settings, 'QUIZ_METRICS_FLUSH_INTERVAL', 5)
+        if time.monotonic() - self._last_flush < interval or self.directory() is None:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            self.flush()
+        except OSError:
+            pass
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """
+        Sums the values of every process.
+
+        Returns:
+            dict: {metric name: {label values tuple: merged value}}
+        """
+        merged = {name: {} for name in self._metrics}
+
+        def add(name, key, value):
+            metric = self._metrics.get(name)
+            if metric is not None:
+                merged[name][key] = metric.merge(merged[name].get(key), value)
+
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            own = self.snapshot_path(directory)
+            for path in directory.glob('*.json'):
+                if path == own:
+                    continue
+                try:
+                    snapshot = json.loads(path.read_text(encoding='utf-8'))
+                except (OSError, ValueError):
+                    continue
+                for name, values in snapshot.items():
+                    for key, value in values:
+                        add(name, tuple(key), value)
+        for name, metric in self._metrics.items():
+            for key, value in metric.snapshot().items():
+                add(name, key, value)
+        return merged
+
+    def exposition(self):
+        """Renders every metric in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        collected = self.collect()
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            lines.extend(metric.exposition(collected[name]))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Forgets the values of this process."""
+        for metric in self._metrics.values():
+            metric.reset()
+        self._instance = uuid.uuid4().hex[:8]
+
+    def final_flush(self):
+        """Writes the last values of an exiting process."""
+        try:
+            self.flush()
+        except OSError:
+            pass
+
+
+REGISTRY = Registry()
+
+# A forked worker starts from zero under its own snapshot file; values
+# recorded by the parent before forking stay in the parent's file.
+os.register_at_fork(after_in_child=REGISTRY.reset)
+atexit.register(REGISTRY.final_flush)
+
+
+REQUESTS = Counter(
+    'quiz_http_requests_total',
+    'HTTP requests handled, by view, method and status code.',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = Histogram(
+    'quiz_http_request_duration_seconds',
+    'Time spent handling a request, by view and method.',
+    ['view', 'method'],
+)
+QUIZ_STARTS = Counter(
+    'quiz_starts_total',
+    'Quizzes drawn and shown to a user.',
+    ['channel'],
+)
+QUIZ_SUBMISSIONS = Counter(
+    'quiz_submissions_total',
+    'Quiz submissions by outcome: graded, invalid (unanswered or unknown questions) or replayed.',
+    ['channel', 'outcome'],
+)
+NOT_ENOUGH_QUESTIONS = Counter(
+    'quiz_not_enough_questions_total',
+    'Quiz starts refused because the topic has too few questions.',
+    ['channel'],
+)
+LOGIN_ATTEMPTS = Counter(
+    'quiz_login_attempts_total',
+    'Login form submissions by outcome: success or failure.',
+    ['outcome'],
+)
@@ -0,0 +1,126 @@
+"""
+Request instrumentation: opt-in SQL/timing details and always-on metrics.
+"""
+import itertools
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import finish_request, install, route_name, route_stats, start_request, view_name
+from .metrics import REQUEST_LATENCY, REQUESTS
+from .profiling import profile_request, should_profile
+
+
+class InstrumentationMiddleware:
+    """
+    Measures query count, database time, template render time and total
+    view time of every request.
+
+    The measurements are sent back in a ``Server-Timing`` header, which
+    browser developer tools display, and are added to the per-route
+    aggregates served by the staff-only ``quiz:request_stats`` endpoint.
+    Place it first in MIDDLEWARE so that session and authentication queries
+    are counted too. When the setting is off, Django drops the middleware
+    at startup and it costs nothing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        return self.finish(request, response, timings, started)
+
+    def finish(self, request, response, timings, started):
+        """Records the request and attaches its Server-Timing header."""
+        timings.total_seconds = time.perf_counter() - started
+        route_stats.record(route_name(request), timings)
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Counts requests by view, method and status, and observes their latency
+    in the ``quiz_http_request_duration_seconds`` histogram.
+
+    Place it right after InstrumentationMiddleware, ahead of the rest, so
+    the latency covers the whole request. Disabled with ``QUIZ_METRICS = False``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_METRICS', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.finish(request, response, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, started)
+
+    def finish(self, request, response, started):
+        """Records the request in the metrics registry."""
+        view = view_name(request)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, view=view, method=request.method)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles one request in ``QUIZ_PROFILING_SAMPLE_RATE`` and every request
+    from a staff user that sends the ``QUIZ_PROFILING_HEADER`` header.
+
+    Enabled with ``QUIZ_PROFILING = True``. It must come after
+    AuthenticationMiddleware. It is synchronous, so under ASGI it profiles
+    the sync views only; see quiz.profiling for the output format.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUIZ_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.requests = itertools.count(1)
+
+    def __call__(self, request):
+        if should_profile(request, next(self.requests)):
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
@@ -0,0 +1,114 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:32
+
+import hashlib
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def question_content_hash(text, option1, option2, option3, option4):
+    """Frozen copy of quiz.models.question_content_hash at the time of this migration."""
+    parts = [' '.join(str(value).split()) for value in (text, option1, option2, option3, option4)]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def populate_content_hash(apps, schema_editor):
+    """Hashes existing questions and drops exact duplicates left by earlier imports."""
+    Question = apps.get_model('quiz', 'Question')
+    questions = Question.objects.using(schema_editor.connection.alias)
+    seen = set()
+    duplicates = []
+    for question in questions.order_by('id').iterator():
+        content_hash = question_content_hash(
+            question.text, question.option1, question.option2,
+            question.option3, question.option4)
+        if content_hash in seen:
+            duplicates.append(question.id)
+            continue
+        seen.add(content_hash)
+        questions.filter(id=question.id).update(content_hash=content_hash)
+    if duplicates:
+        questions.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='quizresult',
+            options={'ordering': ['-date_taken'], 'verbose_name': 'Quiz Result', 'verbose_name_plural': 'Quiz Results'},
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the question text and options', max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='correct_option',
+            field=models.IntegerField(help_text='Correct option number (1-4)', validators=[django.core.validators.MinValueValidator(1, message='Value must be at least 1'), django.core.validators.MaxValueValidator(4, message='Value must be at most 4')]),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option1',
+            field=models.CharField(help_text='First answer option', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option2',
+            field=models.CharField(help_text='Second answer option', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option3',
+            field=models.CharField(help_text='Third answer option', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='option4',
+            field=models.CharField(help_text='Fourth answer option', max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='text',
+            field=models.TextField(help_text='The question text/content'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='topic',
+            field=models.CharField(choices=[('FR', 'French Language')], default='FR', help_text='Category/topic of the question', max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='date_taken',
+            field=models.DateTimeField(auto_now_add=True, help_text='Date and time when quiz was taken'),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='score',
+            field=models.IntegerField(help_text='Number of correct answers'),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='total_questions',
+            field=models.IntegerField(default=5, help_text='Total number of questions in the quiz'),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='user',
+            field=models.ForeignKey(help_text='User who took the quiz', on_delete=django.db.models.deletion.CASCADE, related_name='quiz_results', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(populate_content_hash, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(editable=False, help_text='SHA-256 of the question text and options', max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    """Computes statistics for users who already have quiz results."""
+    QuizResult = apps.get_model('quiz', 'QuizResult')
+    UserQuizStats = apps.get_model('quiz', 'UserQuizStats')
+    db_alias = schema_editor.connection.alias
+    totals = (
+        QuizResult.objects.using(db_alias).order_by()
+        .values('user_id')
+        .annotate(
+            attempts=models.Count('id'),
+            score_sum=models.Sum('score'),
+            min_score=models.Min('score'),
+            max_score=models.Max('score'),
+            last_taken=models.Max('date_taken'),
+        )
+    )
+    UserQuizStats.objects.using(db_alias).bulk_create(
+        (UserQuizStats(**row) for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('quiz', '0002_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserQuizStats',
+            fields=[
+                ('user', models.OneToOneField(help_text='User the statistics belong to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quiz_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of quizzes taken')),
+                ('score_sum', models.PositiveIntegerField(default=0, help_text='Sum of all quiz scores')),
+                ('min_score', models.IntegerField(help_text='Lowest quiz score', null=True)),
+                ('max_score', models.IntegerField(help_text='Highest quiz score', null=True)),
+                ('last_taken', models.DateTimeField(help_text='Date and time of the most recent attempt', null=True)),
+            ],
+            options={
+                'verbose_name': 'User Quiz Statistics',
+                'verbose_name_plural': 'User Quiz Statistics',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
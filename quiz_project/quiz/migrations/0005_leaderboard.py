@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def period_for(window, when):
+    """Frozen copy of leaderboard.period_for at the time of this migration."""
+    local = timezone.localtime(when)
+    if window == 'month':
+        return local.strftime('%Y-%m')
+    if window == 'week':
+        year, week, _ = local.isocalendar()
+        return f'{year}-W{week:02d}'
+    return ''
+
+
+def backfill_leaderboard(apps, schema_editor):
+    """Ranks the results stored before the leaderboard existed, as leaderboard.rebuild does."""
+    QuizResult = apps.get_model('quiz', 'QuizResult')
+    LeaderboardEntry = apps.get_model('quiz', 'LeaderboardEntry')
+    LeaderboardBucket = apps.get_model('quiz', 'LeaderboardBucket')
+    db_alias = schema_editor.connection.alias
+
+    totals = {}
+    rows = QuizResult.objects.using(db_alias).order_by().values_list(
+        'user_id', 'topic', 'date_taken', 'score', 'total_questions')
+    for user_id, topic, date_taken, score, total_questions in rows.iterator(chunk_size=2000):
+        if not total_questions:
+            continue
+        percentage = score / total_questions * 100
+        for window in ('all', 'month', 'week'):
+            entry = totals.setdefault((user_id, topic, window, period_for(window, date_taken)), [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += score
+            entry[2] += total_questions
+            entry[3] = max(entry[3], percentage)
+
+    buckets = {}
+    entries = []
+    for (user_id, topic, window, period), (attempts, score_sum, question_sum, best) in totals.items():
+        entries.append(LeaderboardEntry(
+            user_id=user_id, topic=topic, window=window, period=period,
+            attempts=attempts, score_sum=score_sum, question_sum=question_sum,
+            best_percentage=best, average_percentage=score_sum * 100 / question_sum,
+        ))
+        bucket_key = (topic, window, period, int(round(best * 10)))
+        buckets[bucket_key] = buckets.get(bucket_key, 0) + 1
+    LeaderboardEntry.objects.using(db_alias).bulk_create(entries, batch_size=1000)
+    LeaderboardBucket.objects.using(db_alias).bulk_create(
+        [
+            LeaderboardBucket(topic=topic, window=window, period=period, bucket=bucket, users=users)
+            for (topic, window, period, bucket), users in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_quizresult_user_date_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizresult',
+            name='topic',
+            field=models.CharField(choices=[('FR', 'French Language')], default='FR', help_text='Topic of the questions in the quiz', max_length=2),
+        ),
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('FR', 'French Language')], help_text='Topic of the leaderboard', max_length=2)),
+                ('window', models.CharField(choices=[('all', 'All time'), ('month', 'This month'), ('week', 'This week')], help_text='Time window of the leaderboard', max_length=5)),
+                ('period', models.CharField(blank=True, help_text='Month (YYYY-MM) or ISO week (YYYY-Www) covered; empty for all time', max_length=8)),
+                ('bucket', models.IntegerField(help_text='Best percentage in tenths of a percent')),
+                ('users', models.IntegerField(default=0, help_text='Users whose best percentage falls in the bucket')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('topic', 'window', 'period', 'bucket'), name='quiz_leaderboard_bucket_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(choices=[('FR', 'French Language')], help_text='Topic of the leaderboard', max_length=2)),
+                ('window', models.CharField(choices=[('all', 'All time'), ('month', 'This month'), ('week', 'This week')], help_text='Time window of the leaderboard', max_length=5)),
+                ('period', models.CharField(blank=True, help_text='Month (YYYY-MM) or ISO week (YYYY-Www) covered; empty for all time', max_length=8)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Quizzes taken in the period')),
+                ('score_sum', models.PositiveIntegerField(default=0, help_text='Correct answers in the period')),
+                ('question_sum', models.PositiveIntegerField(default=0, help_text='Questions answered in the period')),
+                ('best_percentage', models.FloatField(default=0, help_text='Best single-quiz percentage in the period')),
+                ('average_percentage', models.FloatField(default=0, help_text='Percentage of all answers in the period that were correct')),
+                ('user', models.ForeignKey(help_text='Ranked user', on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Leaderboard Entry',
+                'verbose_name_plural': 'Leaderboard Entries',
+                'indexes': [models.Index(fields=['topic', 'window', 'period', '-best_percentage'], name='quiz_lb_best_idx'), models.Index(fields=['topic', 'window', 'period', '-average_percentage'], name='quiz_lb_average_idx'), models.Index(fields=['topic', 'window', 'period', '-attempts'], name='quiz_lb_attempts_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic', 'window', 'period'), name='quiz_leaderboard_entry_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
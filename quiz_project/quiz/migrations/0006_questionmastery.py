@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_leaderboard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Times the user answered the question')),
+                ('correct', models.PositiveIntegerField(default=0, help_text='Times the user answered the question correctly')),
+                ('streak', models.PositiveIntegerField(default=0, help_text='Consecutive correct answers')),
+                ('last_answered', models.DateTimeField(help_text='When the user last answered the question')),
+                ('question', models.ForeignKey(help_text='Question being answered', on_delete=django.db.models.deletion.CASCADE, related_name='mastery', to='quiz.question')),
+                ('user', models.ForeignKey(help_text='User answering the question', on_delete=django.db.models.deletion.CASCADE, related_name='question_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Question Mastery',
+                'verbose_name_plural': 'Question Mastery',
+                'constraints': [models.UniqueConstraint(fields=('user', 'question'), name='quiz_question_mastery_unique')],
+            },
+        ),
+    ]
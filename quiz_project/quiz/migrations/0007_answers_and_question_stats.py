@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:57
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_questionmastery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(help_text='Question the statistics belong to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.question')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Times the question was answered')),
+                ('correct', models.PositiveIntegerField(default=0, help_text='Times the question was answered correctly')),
+                ('option1_count', models.PositiveIntegerField(default=0, help_text='Times the first option was picked')),
+                ('option2_count', models.PositiveIntegerField(default=0, help_text='Times the second option was picked')),
+                ('option3_count', models.PositiveIntegerField(default=0, help_text='Times the third option was picked')),
+                ('option4_count', models.PositiveIntegerField(default=0, help_text='Times the fourth option was picked')),
+            ],
+            options={
+                'verbose_name': 'Question Statistics',
+                'verbose_name_plural': 'Question Statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chosen_option', models.PositiveSmallIntegerField(help_text='Option number (1-4) picked by the user', validators=[django.core.validators.MinValueValidator(1, message='Value must be at least 1'), django.core.validators.MaxValueValidator(4, message='Value must be at most 4')])),
+                ('is_correct', models.BooleanField(help_text='Whether the picked option was the correct one')),
+                ('question', models.ForeignKey(help_text='Question being answered', on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.question')),
+                ('result', models.ForeignKey(help_text='Attempt the answer belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.quizresult')),
+            ],
+            options={
+                'verbose_name': 'Quiz Answer',
+                'verbose_name_plural': 'Quiz Answers',
+                'constraints': [models.UniqueConstraint(fields=('result', 'question'), name='quiz_answer_unique')],
+            },
+        ),
+    ]
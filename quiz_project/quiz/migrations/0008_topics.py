@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_topic_stats(apps, schema_editor):
+    """Computes per-topic statistics for users who already have quiz results."""
+    QuizResult = apps.get_model('quiz', 'QuizResult')
+    UserTopicStats = apps.get_model('quiz', 'UserTopicStats')
+    db_alias = schema_editor.connection.alias
+    totals = (
+        QuizResult.objects.using(db_alias).order_by()
+        .values('user_id', 'topic')
+        .annotate(
+            attempts=models.Count('id'),
+            score_sum=models.Sum('score'),
+            min_score=models.Min('score'),
+            max_score=models.Max('score'),
+            last_taken=models.Max('date_taken'),
+        )
+    )
+    UserTopicStats.objects.using(db_alias).bulk_create(
+        (UserTopicStats(**row) for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_answers_and_question_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTopicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Number of quizzes taken')),
+                ('score_sum', models.PositiveIntegerField(default=0, help_text='Sum of all quiz scores')),
+                ('min_score', models.IntegerField(help_text='Lowest quiz score', null=True)),
+                ('max_score', models.IntegerField(help_text='Highest quiz score', null=True)),
+                ('last_taken', models.DateTimeField(help_text='Date and time of the most recent attempt', null=True)),
+                ('topic', models.CharField(choices=[('AR', 'Arabic Language'), ('CS', 'Czech Language'), ('DA', 'Danish Language'), ('DE', 'German Language'), ('EL', 'Greek Language'), ('EN', 'English Language'), ('ES', 'Spanish Language'), ('FI', 'Finnish Language'), ('FR', 'French Language'), ('HE', 'Hebrew Language'), ('HI', 'Hindi Language'), ('HU', 'Hungarian Language'), ('ID', 'Indonesian Language'), ('IT', 'Italian Language'), ('JA', 'Japanese Language'), ('KO', 'Korean Language'), ('NL', 'Dutch Language'), ('NO', 'Norwegian Language'), ('PL', 'Polish Language'), ('PT', 'Portuguese Language'), ('RO', 'Romanian Language'), ('RU', 'Russian Language'), ('SV', 'Swedish Language'), ('TR', 'Turkish Language'), ('UK', 'Ukrainian Language'), ('VI', 'Vietnamese Language'), ('ZH', 'Chinese Language')], help_text='Topic of the results', max_length=2)),
+            ],
+            options={
+                'verbose_name': 'User Topic Statistics',
+                'verbose_name_plural': 'User Topic Statistics',
+            },
+        ),
+        migrations.AlterField(
+            model_name='leaderboardbucket',
+            name='topic',
+            field=models.CharField(choices=[('AR', 'Arabic Language'), ('CS', 'Czech Language'), ('DA', 'Danish Language'), ('DE', 'German Language'), ('EL', 'Greek Language'), ('EN', 'English Language'), ('ES', 'Spanish Language'), ('FI', 'Finnish Language'), ('FR', 'French Language'), ('HE', 'Hebrew Language'), ('HI', 'Hindi Language'), ('HU', 'Hungarian Language'), ('ID', 'Indonesian Language'), ('IT', 'Italian Language'), ('JA', 'Japanese Language'), ('KO', 'Korean Language'), ('NL', 'Dutch Language'), ('NO', 'Norwegian Language'), ('PL', 'Polish Language'), ('PT', 'Portuguese Language'), ('RO', 'Romanian Language'), ('RU', 'Russian Language'), ('SV', 'Swedish Language'), ('TR', 'Turkish Language'), ('UK', 'Ukrainian Language'), ('VI', 'Vietnamese Language'), ('ZH', 'Chinese Language')], help_text='Topic of the leaderboard', max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='leaderboardentry',
+            name='topic',
+            field=models.CharField(choices=[('AR', 'Arabic Language'), ('CS', 'Czech Language'), ('DA', 'Danish Language'), ('DE', 'German Language'), ('EL', 'Greek Language'), ('EN', 'English Language'), ('ES', 'Spanish Language'), ('FI', 'Finnish Language'), ('FR', 'French Language'), ('HE', 'Hebrew Language'), ('HI', 'Hindi Language'), ('HU', 'Hungarian Language'), ('ID', 'Indonesian Language'), ('IT', 'Italian Language'), ('JA', 'Japanese Language'), ('KO', 'Korean Language'), ('NL', 'Dutch Language'), ('NO', 'Norwegian Language'), ('PL', 'Polish Language'), ('PT', 'Portuguese Language'), ('RO', 'Romanian Language'), ('RU', 'Russian Language'), ('SV', 'Swedish Language'), ('TR', 'Turkish Language'), ('UK', 'Ukrainian Language'), ('VI', 'Vietnamese Language'), ('ZH', 'Chinese Language')], help_text='Topic of the leaderboard', max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='topic',
+            field=models.CharField(choices=[('AR', 'Arabic Language'), ('CS', 'Czech Language'), ('DA', 'Danish Language'), ('DE', 'German Language'), ('EL', 'Greek Language'), ('EN', 'English Language'), ('ES', 'Spanish Language'), ('FI', 'Finnish Language'), ('FR', 'French Language'), ('HE', 'Hebrew Language'), ('HI', 'Hindi Language'), ('HU', 'Hungarian Language'), ('ID', 'Indonesian Language'), ('IT', 'Italian Language'), ('JA', 'Japanese Language'), ('KO', 'Korean Language'), ('NL', 'Dutch Language'), ('NO', 'Norwegian Language'), ('PL', 'Polish Language'), ('PT', 'Portuguese Language'), ('RO', 'Romanian Language'), ('RU', 'Russian Language'), ('SV', 'Swedish Language'), ('TR', 'Turkish Language'), ('UK', 'Ukrainian Language'), ('VI', 'Vietnamese Language'), ('ZH', 'Chinese Language')], default='FR', help_text='Category/topic of the question', max_length=2),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='topic',
+            field=models.CharField(choices=[('AR', 'Arabic Language'), ('CS', 'Czech Language'), ('DA', 'Danish Language'), ('DE', 'German Language'), ('EL', 'Greek Language'), ('EN', 'English Language'), ('ES', 'Spanish Language'), ('FI', 'Finnish Language'), ('FR', 'French Language'), ('HE', 'Hebrew Language'), ('HI', 'Hindi Language'), ('HU', 'Hungarian Language'), ('ID', 'Indonesian Language'), ('IT', 'Italian Language'), ('JA', 'Japanese Language'), ('KO', 'Korean Language'), ('NL', 'Dutch Language'), ('NO', 'Norwegian Language'), ('PL', 'Polish Language'), ('PT', 'Portuguese Language'), ('RO', 'Romanian Language'), ('RU', 'Russian Language'), ('SV', 'Swedish Language'), ('TR', 'Turkish Language'), ('UK', 'Ukrainian Language'), ('VI', 'Vietnamese Language'), ('ZH', 'Chinese Language')], default='FR', help_text='Topic of the questions in the quiz', max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['topic', 'id'], name='quiz_question_topic_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['user', 'topic', '-date_taken', '-id'], name='quiz_result_user_topic_idx'),
+        ),
+        migrations.AddField(
+            model_name='usertopicstats',
+            name='user',
+            field=models.ForeignKey(help_text='User the statistics belong to', on_delete=django.db.models.deletion.CASCADE, related_name='topic_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='usertopicstats',
+            constraint=models.UniqueConstraint(fields=('user', 'topic'), name='quiz_user_topic_stats_unique'),
+        ),
+        migrations.RunPython(backfill_topic_stats, migrations.RunPython.noop),
+    ]
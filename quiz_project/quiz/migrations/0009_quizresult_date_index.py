@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_topics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizresult',
+            index=models.Index(fields=['date_taken', 'id'], name='quiz_result_date_idx'),
+        ),
+    ]
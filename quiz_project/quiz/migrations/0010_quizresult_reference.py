@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:13
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+def populate_references(apps, schema_editor):
+    """Gives every existing result its own reference, in batches."""
+    QuizResult = apps.get_model('quiz', 'QuizResult')
+    results = QuizResult.objects.using(schema_editor.connection.alias)
+    batch = []
+    for result in results.filter(reference__isnull=True).only('id').iterator(chunk_size=2000):
+        result.reference = uuid.uuid4()
+        batch.append(result)
+        if len(batch) == 2000:
+            results.bulk_update(batch, ['reference'])
+            batch = []
+    results.bulk_update(batch, ['reference'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_quizresult_date_index'),
+    ]
+
+    operations = [
+        # Added nullable first: a default would give every existing row the same value.
+        migrations.AddField(
+            model_name='quizresult',
+            name='reference',
+            field=models.UUIDField(editable=False, help_text='Public identifier, allocated before the result is stored', null=True),
+        ),
+        migrations.RunPython(populate_references, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='reference',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, help_text='Public identifier, allocated before the result is stored', unique=True),
+        ),
+        migrations.AlterField(
+            model_name='quizresult',
+            name='date_taken',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Date and time when quiz was taken'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE quiz_question_fts USING fts5("
+    "text, options, tokenize = 'unicode61 remove_diacritics 2')"
+)
+SQLITE_FILL = (
+    "INSERT INTO quiz_question_fts (rowid, text, options) "
+    "SELECT id, text, option1 || ' ' || option2 || ' ' || option3 || ' ' || option4 FROM quiz_question"
+)
+POSTGRES_CREATE = (
+    "CREATE TABLE quiz_question_search ("
+    "question_id bigint PRIMARY KEY REFERENCES quiz_question (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX quiz_question_search_document_idx ON quiz_question_search USING GIN (document)",
+)
+POSTGRES_FILL = (
+    "INSERT INTO quiz_question_search (question_id, document) "
+    "SELECT id, setweight(to_tsvector('simple', text), 'A') || "
+    "setweight(to_tsvector('simple', concat_ws(' ', option1, option2, option3, option4)), 'B') "
+    "FROM quiz_question"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """Creates and fills the full-text index of the database in use (see quiz/search.py)."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_FILL)
+    elif vendor == 'postgresql':
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        schema_editor.execute(POSTGRES_FILL)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE quiz_question_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE quiz_question_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_quizresult_reference'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:41
+
+import uuid
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    """Creates the single version row."""
+    QuestionBankVersion = apps.get_model('quiz', 'QuestionBankVersion')
+    QuestionBankVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1, defaults={'token': uuid.uuid4().hex})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_question_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionBankVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(default='', help_text='Random token replaced whenever the question bank changes', max_length=32)),
+            ],
+            options={
+                'verbose_name': 'Question Bank Version',
+                'verbose_name_plural': 'Question Bank Version',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
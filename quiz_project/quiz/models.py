@@ -1,6 +1,46 @@
-from django.db import models
+import hashlib
+import uuid
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
+
+
+def question_content_hash(text, option1, option2, option3, option4):
+    """
+    Computes the identity hash of a question from its text and options.
+
+    Whitespace is normalized so re-imports of the same question collapse
+    onto one row regardless of formatting.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest (64 characters)
+    """
+    parts = [' '.join(str(value).split()) for value in (text, option1, option2, option3, option4)]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def feedback_message_for(percentage):
+    """
+    Picks the feedback message of a score percentage.
+
+    Args:
+        percentage (float): Score percentage (0-100)
+
+    Returns:
+        str: Encouragement message based on performance tier
+    """
+    if percentage >= 80:
+        return "You are a genius!"
+    elif percentage >= 60:
+        return "Excellent work!"
+    elif percentage >= 40:
+        return "Good job!"
+    else:
+        return "Please try again!"
 
 
 class Question(models.Model):
@@ -8,23 +48,54 @@ class Question(models.Model):
     Represents a quiz question with multiple-choice options.
 
     Attributes:
-        TOPIC_CHOICES (list): Available topic choices (currently only French)
+        TOPIC_CHOICES (list): Available topics, keyed by ISO 639-1 language code
+        DEFAULT_TOPIC (str): Topic used when none is chosen
         topic (CharField): The question's topic/category
         text (TextField): The question content
         option1-4 (CharField): The four multiple-choice options
         correct_option (IntegerField): Index (1-4) of the correct answer
+        content_hash (CharField): Hash of text and options, used to de-duplicate imports
 
     Methods:
+        clean: Refuses text and options duplicating another question
+        save: Refreshes content_hash before saving
         __str__: String representation of the question
     """
     TOPIC_CHOICES = [
-        ('FR', 'French Language'),  # Can be extended with more topics
+        ('AR', 'Arabic Language'),
+        ('CS', 'Czech Language'),
+        ('DA', 'Danish Language'),
+        ('DE', 'German Language'),
+        ('EL', 'Greek Language'),
+        ('EN', 'English Language'),
+        ('ES', 'Spanish Language'),
+        ('FI', 'Finnish Language'),
+        ('FR', 'French Language'),
+        ('HE', 'Hebrew Language'),
+        ('HI', 'Hindi Language'),
+        ('HU', 'Hungarian Language'),
+        ('ID', 'Indonesian Language'),
+        ('IT', 'Italian Language'),
+        ('JA', 'Japanese Language'),
+        ('KO', 'Korean Language'),
+        ('NL', 'Dutch Language'),
+        ('NO', 'Norwegian Language'),
+        ('PL', 'Polish Language'),
+        ('PT', 'Portuguese Language'),
+        ('RO', 'Romanian Language'),
+        ('RU', 'Russian Language'),
+        ('SV', 'Swedish Language'),
+        ('TR', 'Turkish Language'),
+        ('UK', 'Ukrainian Language'),
+        ('VI', 'Vietnamese Language'),
+        ('ZH', 'Chinese Language'),
     ]
+    DEFAULT_TOPIC = 'FR'
 
     topic = models.CharField(
         max_length=2,
         choices=TOPIC_CHOICES,
-        default='FR',
+        default=DEFAULT_TOPIC,
         help_text="Category/topic of the question"
     )
 
@@ -58,10 +129,50 @@ class Question(models.Model):
         help_text="Correct option number (1-4)"
     )
 
+    content_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        editable=False,
+        help_text="SHA-256 of the question text and options"
+    )
+
+    def clean(self):
+        """
+        Validates that no other question has the same text and options.
+
+        content_hash is not editable, so model forms (e.g. the admin) would
+        otherwise only find out from the IntegrityError raised on save.
+
+        Raises:
+            ValidationError: If another question has the same content
+        """
+        super().clean()
+        content_hash = question_content_hash(self.text, self.option1, self.option2, self.option3, self.option4)
+        duplicate = Question.objects.filter(content_hash=content_hash).exclude(pk=self.pk).first()
+        if duplicate is not None:
+            raise ValidationError(
+                "Question #%(id)s already has this text and these options.",
+                code='duplicate',
+                params={'id': duplicate.pk},
+            )
+
+    def save(self, *args, **kwargs):
+        """Keeps content_hash in sync with the text and options."""
+        self.content_hash = question_content_hash(
+            self.text, self.option1, self.option2, self.option3, self.option4)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """String representation showing question text."""
         return self.text[:50] + ('...' if len(self.text) > 50 else '')
 
+    class Meta:
+        """Metadata options for the Question model."""
+        indexes = [
+            # Serves per-topic pool loads (ordered by id) and topic counts
+            models.Index(fields=['topic', 'id'], name='quiz_question_topic_idx'),
+        ]
+
 
 class QuizResult(models.Model):
     """
@@ -69,6 +180,8 @@ class QuizResult(models.Model):
 
     Attributes:
         user (ForeignKey): Reference to the User who took the quiz
+        topic (CharField): Topic of the questions in the quiz
+        reference (UUIDField): Public identifier, known before the row is stored
         date_taken (DateTimeField): When the quiz was completed
         score (IntegerField): Number of correct answers
         total_questions (IntegerField): Total questions in the quiz
@@ -85,8 +198,25 @@ class QuizResult(models.Model):
         help_text="User who took the quiz"
     )
 
+    topic = models.CharField(
+        max_length=2,
+        choices=Question.TOPIC_CHOICES,
+        default=Question.DEFAULT_TOPIC,
+        help_text="Topic of the questions in the quiz"
+    )
+
+    reference = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        editable=False,
+        help_text="Public identifier, allocated before the result is stored"
+    )
+
+    # A default rather than auto_now_add, so that results stored later by
+    # the write-behind writer keep the time they were submitted.
     date_taken = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         help_text="Date and time when quiz was taken"
     )
 
@@ -120,15 +250,7 @@ class QuizResult(models.Model):
         Returns:
             str: Encouragement message based on performance tier
         """
-        percentage = self.percentage()
-        if percentage >= 80:
-            return "You are a genius!"
-        elif percentage >= 60:
-            return "Excellent work!"
-        elif percentage >= 40:
-            return "Good job!"
-        else:
-            return "Please try again!"
+        return feedback_message_for(self.percentage())
 
     def __str__(self):
         """String representation showing user, date, and score."""
@@ -141,5 +263,791 @@ class QuizResult(models.Model):
     class Meta:
         """Metadata options for the QuizResult model."""
         ordering = ['-date_taken']  # Newest results first
+        indexes = [
+            # Serves the per-user history listing and its keyset pagination
+            models.Index(fields=['user', '-date_taken', '-id'], name='quiz_result_user_date_idx'),
+            # Same, for the topic-scoped history
+            models.Index(fields=['user', 'topic', '-date_taken', '-id'], name='quiz_result_user_topic_idx'),
+            # Serves date-range exports across all users
+            models.Index(fields=['date_taken', 'id'], name='quiz_result_date_idx'),
+        ]
         verbose_name = 'Quiz Result'
-        verbose_name_plural = 'Quiz Results'
\ No newline at end of file
+        verbose_name_plural = 'Quiz Results'
+
+
+class QuizStatsBase(models.Model):
+    """
+    Denormalized quiz statistics of one group of results, maintained as results are created.
+
+    Subclasses name the QuizResult fields identifying a group in
+    GROUP_FIELDS, e.g. the user, or the user and topic.
+
+    Attributes:
+        GROUP_FIELDS (list): QuizResult attributes a statistics row is keyed by
+        attempts (PositiveIntegerField): Number of quizzes taken
+        score_sum (PositiveIntegerField): Sum of all scores
+        min_score (IntegerField): Lowest score, or None without attempts
+        max_score (IntegerField): Highest score, or None without attempts
+        last_taken (DateTimeField): Date of the most recent attempt
+
+    Methods:
+        average: Mean score across attempts
+        record_results: Folds newly created QuizResults into the statistics
+        refresh: Recomputes an existing row from the results table
+        rebuild: Recomputes every row from the results table
+    """
+    GROUP_FIELDS = []
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of quizzes taken"
+    )
+
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Sum of all quiz scores"
+    )
+
+    min_score = models.IntegerField(
+        null=True,
+        help_text="Lowest quiz score"
+    )
+
+    max_score = models.IntegerField(
+        null=True,
+        help_text="Highest quiz score"
+    )
+
+    last_taken = models.DateTimeField(
+        null=True,
+        help_text="Date and time of the most recent attempt"
+    )
+
+    def average(self):
+        """
+        Calculates the mean score.
+
+        Returns:
+            float: Average score, or None if there are no attempts
+        """
+        if not self.attempts:
+            return None
+        return self.score_sum / self.attempts
+
+    @classmethod
+    def group_of(cls, result):
+        """Returns the lookup of the statistics row a result belongs to."""
+        return {field: getattr(result, field) for field in cls.GROUP_FIELDS}
+
+    @classmethod
+    def record_results(cls, results):
+        """
+        Atomically folds newly created results into their statistics rows.
+
+        Each row is changed with a single UPDATE using F-expressions, so
+        concurrent submissions never lose an increment. The row is created
+        on the first attempt.
+
+        Args:
+            results (iterable): Newly created QuizResult instances
+        """
+        results_by_group = {}
+        for result in results:
+            group = tuple(cls.group_of(result).items())
+            results_by_group.setdefault(group, []).append(result)
+        for group, group_results in results_by_group.items():
+            scores = [result.score for result in group_results]
+            cls._record(
+                dict(group),
+                attempts=len(scores),
+                score_sum=sum(scores),
+                min_score=min(scores),
+                max_score=max(scores),
+                last_taken=max(result.date_taken for result in group_results),
+            )
+
+    @classmethod
+    def _record(cls, group, attempts, score_sum, min_score, max_score, last_taken):
+        """Applies one group's batch of attempts to its statistics row."""
+        updated = cls.objects.filter(**group).update(
+            attempts=models.F('attempts') + attempts,
+            score_sum=models.F('score_sum') + score_sum,
+            min_score=Least(Coalesce('min_score', models.Value(min_score)), models.Value(min_score)),
+            max_score=Greatest(Coalesce('max_score', models.Value(max_score)), models.Value(max_score)),
+            last_taken=Greatest(
+                Coalesce('last_taken', models.Value(last_taken)),
+                models.Value(last_taken)
+            ),
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    **group,
+                    attempts=attempts,
+                    score_sum=score_sum,
+                    min_score=min_score,
+                    max_score=max_score,
+                    last_taken=last_taken,
+                )
+        except IntegrityError:
+            # Another submission created the row first; apply ours on top.
+            cls._record(group, attempts, score_sum, min_score, max_score, last_taken)
+
+    @staticmethod
+    def _aggregates():
+        """Aggregates computing the statistics fields from QuizResult rows."""
+        return {
+            'attempts': models.Count('id'),
+            'score_sum': models.Sum('score'),
+            'min_score': models.Min('score'),
+            'max_score': models.Max('score'),
+            'last_taken': models.Max('date_taken'),
+        }
+
+    @classmethod
+    def refresh(cls, **group):
+        """
+        Recomputes an existing statistics row from its results.
+
+        Never creates a row, so it is safe to call while the user is being
+        deleted.
+
+        Args:
+            **group: GROUP_FIELDS values of the row, e.g. ``user_id=1``
+        """
+        totals = QuizResult.objects.filter(**group).aggregate(**cls._aggregates())
+        totals['score_sum'] = totals['score_sum'] or 0
+        cls.objects.filter(**group).update(**totals)
+
+    @classmethod
+    def rebuild(cls, batch_size=1000):
+        """
+        Replaces every statistics row with totals computed from QuizResult.
+
+        Args:
+            batch_size (int): Rows per bulk insert
+
+        Returns:
+            int: Number of statistics rows written
+        """
+        totals = (
+            QuizResult.objects.order_by()
+            .values(*cls.GROUP_FIELDS)
+            .annotate(**cls._aggregates())
+        )
+        written = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            batch = []
+            for row in totals.iterator():
+                batch.append(cls(**row))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            cls.objects.bulk_create(batch)
+            written += len(batch)
+        return written
+
+    class Meta:
+        """Metadata options for the QuizStatsBase model."""
+        abstract = True
+
+
+class UserQuizStats(QuizStatsBase):
+    """
+    Denormalized per-user quiz statistics across all topics.
+
+    Keeps the history page to a single primary-key lookup instead of
+    aggregating over every QuizResult row of the user.
+
+    Attributes:
+        user (OneToOneField): The User the statistics belong to (primary key)
+
+    Methods:
+        refresh_for_user: Recomputes an existing row from the results table
+    """
+    GROUP_FIELDS = ['user_id']
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='quiz_stats',
+        help_text="User the statistics belong to"
+    )
+
+    @classmethod
+    def refresh_for_user(cls, user_id):
+        """
+        Recomputes an existing statistics row from the user's results.
+
+        Args:
+            user_id (int): Primary key of the user
+        """
+        cls.refresh(user_id=user_id)
+
+    def __str__(self):
+        """String representation showing user and attempt count."""
+        return f"{self.user_id} - {self.attempts} attempts"
+
+    class Meta:
+        """Metadata options for the UserQuizStats model."""
+        verbose_name = 'User Quiz Statistics'
+        verbose_name_plural = 'User Quiz Statistics'
+
+
+class UserTopicStats(QuizStatsBase):
+    """
+    Denormalized quiz statistics of one user in one topic.
+
+    Serves the topic-scoped history page with a single indexed lookup.
+
+    Attributes:
+        user (ForeignKey): The User the statistics belong to
+        topic (CharField): Topic of the results
+    """
+    GROUP_FIELDS = ['user_id', 'topic']
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='topic_stats',
+        help_text="User the statistics belong to"
+    )
+
+    topic = models.CharField(
+        max_length=2,
+        choices=Question.TOPIC_CHOICES,
+        help_text="Topic of the results"
+    )
+
+    def __str__(self):
+        """String representation showing user, topic and attempt count."""
+        return f"{self.user_id}/{self.topic} - {self.attempts} attempts"
+
+    class Meta:
+        """Metadata options for the UserTopicStats model."""
+        verbose_name = 'User Topic Statistics'
+        verbose_name_plural = 'User Topic Statistics'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'topic'],
+                name='quiz_user_topic_stats_unique'
+            ),
+        ]
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A user's standing on one leaderboard: a topic within a time window.
+
+    Maintained incrementally as results are created (see quiz.leaderboard),
+    so ranking queries never aggregate over the results table.
+
+    Attributes:
+        WINDOW_CHOICES (list): Supported time windows
+        user (ForeignKey): The ranked User
+        topic (CharField): Topic of the leaderboard
+        window (CharField): Time window ('all', 'month' or 'week')
+        period (CharField): Which month/week the entry covers ('' for all time)
+        attempts (PositiveIntegerField): Quizzes taken in the period
+        score_sum (PositiveIntegerField): Correct answers in the period
+        question_sum (PositiveIntegerField): Questions answered in the period
+        best_percentage (FloatField): Best single-quiz percentage
+        average_percentage (FloatField): score_sum / question_sum as a percentage
+    """
+    WINDOW_CHOICES = [
+        ('all', 'All time'),
+        ('month', 'This month'),
+        ('week', 'This week'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries',
+        help_text="Ranked user"
+    )
+
+    topic = models.CharField(
+        max_length=2,
+        choices=Question.TOPIC_CHOICES,
+        help_text="Topic of the leaderboard"
+    )
+
+    window = models.CharField(
+        max_length=5,
+        choices=WINDOW_CHOICES,
+        help_text="Time window of the leaderboard"
+    )
+
+    period = models.CharField(
+        max_length=8,
+        blank=True,
+        help_text="Month (YYYY-MM) or ISO week (YYYY-Www) covered; empty for all time"
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Quizzes taken in the period"
+    )
+
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Correct answers in the period"
+    )
+
+    question_sum = models.PositiveIntegerField(
+        default=0,
+        help_text="Questions answered in the period"
+    )
+
+    best_percentage = models.FloatField(
+        default=0,
+        help_text="Best single-quiz percentage in the period"
+    )
+
+    average_percentage = models.FloatField(
+        default=0,
+        help_text="Percentage of all answers in the period that were correct"
+    )
+
+    def __str__(self):
+        """String representation showing the board and the user's best."""
+        return f"{self.topic}/{self.window}{self.period and ' ' + self.period} - {self.user_id}: {self.best_percentage:.1f}%"
+
+    class Meta:
+        """Metadata options for the LeaderboardEntry model."""
+        verbose_name = 'Leaderboard Entry'
+        verbose_name_plural = 'Leaderboard Entries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'topic', 'window', 'period'],
+                name='quiz_leaderboard_entry_unique'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['topic', 'window', 'period', '-best_percentage'], name='quiz_lb_best_idx'),
+            models.Index(fields=['topic', 'window', 'period', '-average_percentage'], name='quiz_lb_average_idx'),
+            models.Index(fields=['topic', 'window', 'period', '-attempts'], name='quiz_lb_attempts_idx'),
+        ]
+
+
+class LeaderboardBucket(models.Model):
+    """
+    Histogram of best percentages on one leaderboard.
+
+    A user's rank is one plus the number of users in higher buckets. There
+    are at most 1001 buckets per board (tenths of a percent), so the lookup
+    cost does not grow with the number of users.
+
+    Attributes:
+        topic (CharField): Topic of the leaderboard
+        window (CharField): Time window of the leaderboard
+        period (CharField): Month/week covered; empty for all time
+        bucket (IntegerField): Best percentage in tenths of a percent (0-1000)
+        users (IntegerField): Number of users whose best falls in the bucket
+    """
+    topic = models.CharField(
+        max_length=2,
+        choices=Question.TOPIC_CHOICES,
+        help_text="Topic of the leaderboard"
+    )
+
+    window = models.CharField(
+        max_length=5,
+        choices=LeaderboardEntry.WINDOW_CHOICES,
+        help_text="Time window of the leaderboard"
+    )
+
+    period = models.CharField(
+        max_length=8,
+        blank=True,
+        help_text="Month (YYYY-MM) or ISO week (YYYY-Www) covered; empty for all time"
+    )
+
+    bucket = models.IntegerField(
+        help_text="Best percentage in tenths of a percent"
+    )
+
+    users = models.IntegerField(
+        default=0,
+        help_text="Users whose best percentage falls in the bucket"
+    )
+
+    def __str__(self):
+        """String representation showing the board, bucket and count."""
+        return f"{self.topic}/{self.window}{self.period and ' ' + self.period} - {self.bucket / 10:.1f}%: {self.users}"
+
+    class Meta:
+        """Metadata options for the LeaderboardBucket model."""
+        constraints = [
+            models.UniqueConstraint(
+                fields=['topic', 'window', 'period', 'bucket'],
+                name='quiz_leaderboard_bucket_unique'
+            ),
+        ]
+
+
+class QuestionMastery(models.Model):
+    """
+    How well a user knows one question, updated after every graded answer.
+
+    Feeds the adaptive question selection in quiz.adaptive, which favours
+    questions a user keeps missing or has not seen for a while.
+
+    Attributes:
+        user (ForeignKey): The answering User
+        question (ForeignKey): The answered Question
+        attempts (PositiveIntegerField): Times the user answered the question
+        correct (PositiveIntegerField): Times the answer was right
+        streak (PositiveIntegerField): Consecutive right answers, reset by a miss
+        last_answered (DateTimeField): When the question was last answered
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='question_mastery',
+        help_text="User answering the question"
+    )
+
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='mastery',
+        help_text="Question being answered"
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the user answered the question"
+    )
+
+    correct = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the user answered the question correctly"
+    )
+
+    streak = models.PositiveIntegerField(
+        default=0,
+        help_text="Consecutive correct answers"
+    )
+
+    last_answered = models.DateTimeField(
+        help_text="When the user last answered the question"
+    )
+
+    def __str__(self):
+        """String representation showing the user, question and accuracy."""
+        return f"{self.user_id} - Q{self.question_id}: {self.correct}/{self.attempts}"
+
+    class Meta:
+        """Metadata options for the QuestionMastery model."""
+        verbose_name = 'Question Mastery'
+        verbose_name_plural = 'Question Mastery'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'question'],
+                name='quiz_question_mastery_unique'
+            ),
+        ]
+
+
+class QuizAnswer(models.Model):
+    """
+    One answer given in a quiz attempt.
+
+    Written with a single bulk insert per graded submission (see
+    quiz.answers). Item analytics read QuestionStats instead of scanning
+    this table.
+
+    Attributes:
+        result (ForeignKey): The QuizResult (attempt) the answer belongs to
+        question (ForeignKey): The answered Question
+        chosen_option (PositiveSmallIntegerField): Option picked (1-4)
+        is_correct (BooleanField): Whether it was the correct option
+    """
+    result = models.ForeignKey(
+        QuizResult,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        help_text="Attempt the answer belongs to"
+    )
+
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='answers',
+        help_text="Question being answered"
+    )
+
+    chosen_option = models.PositiveSmallIntegerField(
+        validators=[
+            MinValueValidator(1, message="Value must be at least 1"),
+            MaxValueValidator(4, message="Value must be at most 4")
+        ],
+        help_text="Option number (1-4) picked by the user"
+    )
+
+    is_correct = models.BooleanField(
+        help_text="Whether the picked option was the correct one"
+    )
+
+    def __str__(self):
+        """String representation showing the attempt, question and choice."""
+        return f"{self.result_id} - Q{self.question_id}: {self.chosen_option}"
+
+    class Meta:
+        """Metadata options for the QuizAnswer model."""
+        verbose_name = 'Quiz Answer'
+        verbose_name_plural = 'Quiz Answers'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['result', 'question'],
+                name='quiz_answer_unique'
+            ),
+        ]
+
+
+class QuestionStats(models.Model):
+    """
+    Denormalized per-question answer statistics, maintained as answers are stored.
+
+    Tells authors which questions are too easy or too hard, and which wrong
+    options attract answers, without aggregating over QuizAnswer. Deleting
+    results does not update the statistics; the rebuild_question_stats
+    command recomputes them.
+
+    Attributes:
+        OPTION_FIELDS (list): Count field of each option, in option order
+        question (OneToOneField): The Question the statistics belong to (primary key)
+        attempts (PositiveIntegerField): Times the question was answered
+        correct (PositiveIntegerField): Times it was answered correctly
+        option1_count-option4_count (PositiveIntegerField): Times each option was picked
+
+    Methods:
+        correct_rate: Share of answers that were correct
+        option_distribution: Share of answers picking each option
+        record_answers: Folds newly stored QuizAnswers into the statistics
+        rebuild: Recomputes every row by streaming over QuizAnswer
+    """
+    OPTION_FIELDS = ['option1_count', 'option2_count', 'option3_count', 'option4_count']
+
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        help_text="Question the statistics belong to"
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the question was answered"
+    )
+
+    correct = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the question was answered correctly"
+    )
+
+    option1_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the first option was picked"
+    )
+    option2_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the second option was picked"
+    )
+    option3_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the third option was picked"
+    )
+    option4_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Times the fourth option was picked"
+    )
+
+    def correct_rate(self):
+        """
+        Calculates the share of correct answers.
+
+        Returns:
+            float: Correct answers / attempts (0-1), or None without attempts
+        """
+        if not self.attempts:
+            return None
+        return self.correct / self.attempts
+
+    def option_distribution(self):
+        """
+        Calculates how often each option was picked.
+
+        Returns:
+            list: Share (0-1) of answers picking options 1-4, or None
+            without attempts
+        """
+        if not self.attempts:
+            return None
+        return [getattr(self, field) / self.attempts for field in self.OPTION_FIELDS]
+
+    @classmethod
+    def record_answers(cls, answers):
+        """
+        Atomically folds newly stored answers into their questions' statistics.
+
+        Missing rows are inserted first; then every affected row is changed
+        by one UPDATE using F-expressions, so concurrent submissions never
+        lose an increment.
+
+        Args:
+            answers (iterable): Newly stored QuizAnswer instances
+        """
+        deltas = {}
+        for answer in answers:
+            delta = deltas.setdefault(answer.question_id, [0, 0, 0, 0, 0, 0])
+            delta[0] += 1
+            delta[1] += answer.is_correct
+            delta[1 + answer.chosen_option] += 1
+        if not deltas:
+            return
+
+        updates = {}
+        for index, field in enumerate(['attempts', 'correct', *cls.OPTION_FIELDS]):
+            whens = [
+                models.When(question_id=question_id, then=models.Value(delta[index]))
+                for question_id, delta in deltas.items()
+                if delta[index]
+            ]
+            if whens:
+                updates[field] = models.F(field) + models.Case(*whens, default=models.Value(0))
+
+        cls.objects.bulk_create(
+            [cls(question_id=question_id) for question_id in deltas],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(question_id__in=list(deltas)).update(**updates)
+
+    @classmethod
+    def rebuild(cls, chunk_size=2000, batch_size=500):
+        """
+        Replaces every statistics row with totals computed from QuizAnswer.
+
+        Answers are streamed in question order with ``iterator()``, so only
+        one question's running totals and one batch of rows are held in
+        memory, however large the answer table is.
+
+        Args:
+            chunk_size (int): Answers fetched from the database at a time
+            batch_size (int): Rows per bulk insert
+
+        Returns:
+            int: Number of statistics rows written
+        """
+        answers = (
+            QuizAnswer.objects.order_by('question_id')
+            .values_list('question_id', 'chosen_option', 'is_correct')
+            .iterator(chunk_size=chunk_size)
+        )
+        written = 0
+        with transaction.atomic():
+            cls.objects.all().delete()
+            batch = []
+            current = None
+            for question_id, chosen_option, is_correct in answers:
+                if current is None or current.question_id != question_id:
+                    current = cls(question_id=question_id)
+                    batch.append(current)
+                    if len(batch) > batch_size:
+                        cls.objects.bulk_create(batch[:-1])
+                        written += len(batch) - 1
+                        batch = batch[-1:]
+                current.attempts += 1
+                current.correct += is_correct
+                field = cls.OPTION_FIELDS[chosen_option - 1]
+                setattr(current, field, getattr(current, field) + 1)
+            cls.objects.bulk_create(batch)
+            written += len(batch)
+        return written
+
+    def __str__(self):
+        """String representation showing the question and its correct rate."""
+        return f"Q{self.question_id} - {self.correct}/{self.attempts} correct"
+
+    class Meta:
+        """Metadata options for the QuestionStats model."""
+        verbose_name = 'Question Statistics'
+        verbose_name_plural = 'Question Statistics'
+
+
+class QuestionBankVersion(models.Model):
+    """
+    Single row holding the version token of the question bank.
+
+    Caches derived from the bank (answer keys, decks, adaptive weights) are
+    scoped by this token. It lives in the database rather than a cache so
+    that every worker process sees the same value, and so that a change
+    made inside a transaction only becomes visible when it commits.
+
+    Attributes:
+        token (CharField): Random token replaced on every bank change
+
+    Methods:
+        current: Returns the token, creating the row if it is missing
+        acurrent: Async variant of current
+        bump: Replaces the token
+    """
+    token = models.CharField(
+        max_length=32,
+        default='',
+        help_text="Random token replaced whenever the question bank changes"
+    )
+
+    @classmethod
+    def current(cls):
+        """
+        Returns the current token of the bank.
+
+        Returns:
+            str: Version token
+        """
+        token = cls.objects.filter(pk=1).values_list('token', flat=True).first()
+        if token is None:
+            token = cls.objects.get_or_create(pk=1, defaults={'token': uuid.uuid4().hex})[0].token
+        return token
+
+    @classmethod
+    async def acurrent(cls):
+        """Async variant of current."""
+        token = await cls.objects.filter(pk=1).values_list('token', flat=True).afirst()
+        if token is None:
+            token = (await cls.objects.aget_or_create(pk=1, defaults={'token': uuid.uuid4().hex}))[0].token
+        return token
+
+    @classmethod
+    def bump(cls):
+        """
+        Replaces the token, inside the caller's transaction if there is one.
+
+        A random token rather than a counter: a bump that is rolled back
+        can never collide with a later one.
+
+        Returns:
+            str: The new token
+        """
+        token = uuid.uuid4().hex
+        if not cls.objects.filter(pk=1).update(token=token):
+            cls.objects.update_or_create(pk=1, defaults={'token': token})
+        return token
+
+    def __str__(self):
+        """String representation showing the token."""
+        return self.token
+
+    class Meta:
+        """Metadata options for the QuestionBankVersion model."""
+        verbose_name = 'Question Bank Version'
+        verbose_name_plural = 'Question Bank Version'
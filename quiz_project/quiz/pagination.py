@@ -0,0 +1,152 @@
+"""
+Keyset (cursor) pagination over quiz results.
+
+Pages are addressed by the ``(date_taken, id)`` of their boundary rows rather
+than an OFFSET, so every page is an index range scan of the same cost no
+matter how deep the user has paged.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
+
+PAGE_SIZE = 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(result):
+    """
+    Encodes the position of a result as an opaque, URL-safe cursor.
+
+    Args:
+        result (QuizResult): Boundary row of a page
+
+    Returns:
+        str: Cursor of the form '<epoch microseconds>_<id>'
+    """
+    delta = result.date_taken - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return f"{microseconds}_{result.id}"
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Cursor from the query string
+
+    Returns:
+        tuple: (date_taken, id), or None if the cursor is malformed
+    """
+    try:
+        microseconds, pk = cursor.split('_')
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+@dataclass
+class KeysetPage:
+    """
+    One page of results plus the cursors of its neighbours.
+
+    Attributes:
+        items (list): Results on the page, newest first
+        older_cursor (str): Cursor for the next (older) page, or None
+        newer_cursor (str): Cursor for the previous (newer) page, or None
+    """
+    items: list
+    older_cursor: str = None
+    newer_cursor: str = None
+
+
+def page_queryset(queryset, before=None, after=None, page_size=PAGE_SIZE):
+    """
+    Narrows a QuizResult queryset to the rows of one page.
+
+    One extra row is fetched so build_page can tell whether another page
+    exists in the direction of travel.
+
+    Args:
+        queryset (QuerySet): Results to paginate
+        before (str): Cursor; return the page older than this position
+        after (str): Cursor; return the page newer than this position
+        page_size (int): Rows per page
+
+    Returns:
+        tuple: (sliced queryset, direction) where direction is 'older' or 'newer'
+    """
+    # The redundant date_taken bound lets the index seek straight to the
+    # cursor instead of walking from the newest row and filtering.
+    position = decode_cursor(after) if after else None
+    if position is not None:
+        date_taken, pk = position
+        queryset = queryset.filter(
+            Q(date_taken__gt=date_taken) | Q(date_taken=date_taken, id__gt=pk),
+            date_taken__gte=date_taken,
+        ).order_by('date_taken', 'id')
+        return queryset[:page_size + 1], 'newer'
+
+    position = decode_cursor(before) if before else None
+    if position is not None:
+        date_taken, pk = position
+        queryset = queryset.filter(
+            Q(date_taken__lt=date_taken) | Q(date_taken=date_taken, id__lt=pk),
+            date_taken__lte=date_taken,
+        )
+    return queryset.order_by('-date_taken', '-id')[:page_size + 1], 'older'
+
+
+def build_page(rows, direction, before=None, page_size=PAGE_SIZE):
+    """
+    Turns the rows fetched by page_queryset into a KeysetPage.
+
+    Args:
+        rows (list): Evaluated rows of the page queryset
+        direction (str): 'older' or 'newer', as returned by page_queryset
+        before (str): The 'before' cursor the page was requested with
+        page_size (int): Rows per page
+
+    Returns:
+        KeysetPage: The page, newest result first
+    """
+    has_more = len(rows) > page_size
+    items = list(rows[:page_size])
+    if direction == 'newer':
+        items.reverse()
+        has_older, has_newer = True, has_more
+    else:
+        # Paging towards older results from a valid cursor leaves newer ones behind.
+        has_older, has_newer = has_more, decode_cursor(before or '') is not None
+
+    return KeysetPage(
+        items=items,
+        older_cursor=encode_cursor(items[-1]) if items and has_older else None,
+        newer_cursor=encode_cursor(items[0]) if items and has_newer else None,
+    )
+
+
+def paginate(queryset, before=None, after=None, page_size=PAGE_SIZE):
+    """
+    Fetches one keyset page of a QuizResult queryset.
+
+    Args:
+        queryset (QuerySet): Results to paginate
+        before (str): Cursor of the page to move past towards older results
+        after (str): Cursor of the page to move past towards newer results
+        page_size (int): Rows per page
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    page_qs, direction = page_queryset(queryset, before, after, page_size)
+    return build_page(list(page_qs), direction, before, page_size)
+
+
+async def apaginate(queryset, before=None, after=None, page_size=PAGE_SIZE):
+    """Async variant of paginate."""
+    page_qs, direction = page_queryset(queryset, before, after, page_size)
+    rows = [row async for row in page_qs]
+    return build_page(rows, direction, before, page_size)
@@ -0,0 +1,254 @@
+"""
+On-demand profiling of live requests, used by quiz.middleware.ProfilingMiddleware.
+
+Two profilers are available (``QUIZ_PROFILING_MODE``):
+
+- ``'cprofile'`` records every function call with cProfile and writes a
+  pstats ``.prof`` file (readable with ``pstats``, snakeviz, etc.).
+- ``'sampler'`` captures the stack of the request thread every
+  ``QUIZ_PROFILING_INTERVAL`` seconds from a background thread. It writes
+  collapsed stacks (``.collapsed``, one ``frame;frame;frame count`` line
+  per stack), which flamegraph.pl and speedscope read directly. Its
+  overhead does not depend on how many calls the request makes. While any
+  sampler runs, the interpreter's (process-wide) thread switch interval is
+  lowered to the shortest sampling interval in use; the last sampler to
+  finish restores the original value.
+
+Profiles are named ``<time>-<url name>-<duration>ms-<pid>-<n>.<ext>``. Only
+the newest ``QUIZ_PROFILING_MAX_FILES`` profiles are kept.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+from .instrumentation import view_name
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIXES = ('.prof', '.collapsed')
+
+_sequence = itertools.count(1)
+
+_switch_lock = threading.Lock()
+_switch_users = Counter()  # sampling interval -> running samplers
+_switch_original = None
+
+
+def profile_dir():
+    """Directory profiles are written to."""
+    return Path(getattr(settings, 'QUIZ_PROFILING_DIR', Path(settings.BASE_DIR) / 'profiles'))
+
+
+def should_profile(request, number):
+    """
+    Decides whether a request is profiled.
+
+    Args:
+        request (HttpRequest): The incoming request
+        number (int): Sequence number of the request in this process
+
+    Returns:
+        bool: True for every ``QUIZ_PROFILING_SAMPLE_RATE``-th request, and
+        for requests carrying the ``QUIZ_PROFILING_HEADER`` from a staff user
+    """
+    header = getattr(settings, 'QUIZ_PROFILING_HEADER', 'X-Quiz-Profile')
+    if header and request.headers.get(header) and request.user.is_staff:
+        return True
+    rate = getattr(settings, 'QUIZ_PROFILING_SAMPLE_RATE', 0)
+    return bool(rate) and number % rate == 0
+
+
+def _lower_switch_interval(interval):
+    """Registers a running sampler and lowers the switch interval to suit it."""
+    global _switch_original
+    with _switch_lock:
+        if not _switch_users:
+            _switch_original = sys.getswitchinterval()
+        _switch_users[interval] += 1
+        sys.setswitchinterval(min([_switch_original, *_switch_users]))
+
+
+def _restore_switch_interval(interval):
+    """Unregisters a sampler; the last one restores the original switch interval."""
+    with _switch_lock:
+        _switch_users[interval] -= 1
+        if not _switch_users[interval]:
+            del _switch_users[interval]
+        sys.setswitchinterval(min([_switch_original, *_switch_users]))
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval.
+
+    Attributes:
+        stacks (Counter): Collapsed stack (root first, ';'-separated) -> samples
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='quiz-stack-sampler', daemon=True)
+
+    def __enter__(self):
+        # The sampler can only run when the request thread releases the GIL,
+        # which by default happens every 5ms; switch at the sampling rate.
+        _lower_switch_interval(self.interval)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        _restore_switch_interval(self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            # Once stopped, the thread is only waiting for the sampler.
+            if frame is not None and not self._stop.is_set():
+                self.stacks[self.fold(frame)] += 1
+
+    @staticmethod
+    def fold(frame):
+        """Collapses a frame and its callers into ``root;...;leaf``."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def collapsed(self):
+        """Returns the samples in collapsed-stack format."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def profile_request(request, get_response):
+    """
+    Handles a request under the configured profiler and saves the profile.
+
+    Args:
+        request (HttpRequest): The request to profile
+        get_response (callable): The rest of the middleware chain
+
+    Returns:
+        HttpResponse: The response, with an ``X-Quiz-Profile`` header naming
+        the saved file
+    """
+    mode = getattr(settings, 'QUIZ_PROFILING_MODE', 'cprofile')
+    started = time.perf_counter()
+    if mode == 'sampler':
+        interval = getattr(settings, 'QUIZ_PROFILING_INTERVAL', 0.001)
+        with StackSampler(threading.get_ident(), interval) as sampler:
+            response = get_response(request)
+    else:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process; another
+            # request is already being profiled.
+            return get_response(request)
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    try:
+        path = save_profile(
+            view_name(request), duration_ms,
+            sampler.collapsed() if mode == 'sampler' else profiler,
+        )
+    except OSError:
+        logger.warning("Could not save the profile of %s", request.path, exc_info=True)
+    else:
+        response['X-Quiz-Profile'] = path.name
+    return response
+
+
+def save_profile(url_name, duration_ms, profile):
+    """
+    Writes a profile to the profile directory and rotates old ones.
+
+    Args:
+        url_name (str): Name of the profiled route
+        duration_ms (float): How long the request took
+        profile: A cProfile.Profile, or collapsed stacks as a string
+
+    Returns:
+        Path: The written file
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tag = re.sub(r'[^A-Za-z0-9_-]+', '.', url_name)
+    stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{tag}-{duration_ms:.0f}ms-{os.getpid()}-{next(_sequence)}"
+    if isinstance(profile, str):
+        path = directory / f'{stem}.collapsed'
+        path.write_text(profile, encoding='utf-8')
+    else:
+        path = directory / f'{stem}.prof'
+        profile.dump_stats(path)
+    rotate(directory, getattr(settings, 'QUIZ_PROFILING_MAX_FILES', 200))
+    return path
+
+
+def rotate(directory, keep):
+    """Deletes all but the ``keep`` newest profiles in ``directory``."""
+    profiles = sorted(
+        (path for path in directory.iterdir() if path.suffix in PROFILE_SUFFIXES),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in profiles[keep:]:
+        path.unlink(missing_ok=True)
+
+
+def parse_profile_name(path):
+    """
+    Reads the URL name and duration encoded in a profile's file name.
+
+    Returns:
+        tuple: (url_name, duration_ms), or (None, None) for foreign files
+    """
+    match = re.match(r'^\d{8}T\d{6}-(?P<name>.+)-(?P<ms>\d+)ms-\d+-\d+$', path.stem)
+    if not match:
+        return None, None
+    return match['name'], int(match['ms'])
+
+
+def summarize_collapsed(paths):
+    """
+    Aggregates collapsed-stack profiles by function.
+
+    Returns:
+        tuple: (total samples, {frame: self samples}, {frame: inclusive samples})
+    """
+    total = 0
+    self_samples = Counter()
+    inclusive = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8') as stream:
+            for line in stream:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                if not stack or not count.isdigit():
+                    continue
+                count = int(count)
+                frames = stack.split(';')
+                total += count
+                self_samples[frames[-1]] += count
+                for frame in set(frames):
+                    inclusive[frame] += count
+    return total, self_samples, inclusive
@@ -0,0 +1,225 @@
+"""
+Per-topic pool of question IDs kept in the Django cache.
+
+Starting a quiz only needs to know which questions exist for a topic, so the
+pool stores just their primary keys. Sampling runs against the IDs and only
+the chosen rows are fetched from the database. The pool is rebuilt lazily
+after it is invalidated by the ``Question`` signals in ``quiz.signals``.
+
+The number of questions in every topic is cached as one dict next to the
+pools. It answers "can this topic start a quiz?" and fills the topic picker
+without counting rows or loading a pool.
+
+Both keys carry the bank generation (answer_key.bank_generation), so a
+change saved by any worker retires them everywhere, even with per-process
+caches. Deleting the keys on a change only spares the saving worker the
+wait for its next generation check.
+
+When a question snapshot is loaded (quiz.snapshot), pools, counts and the
+drawn questions are read from it instead, without touching the cache or
+the database.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .answer_key import abank_generation, bank_generation
+from .models import Question
+from .snapshot import get_snapshot
+
+POOL_CACHE_KEY = 'quiz:question_pool:{generation}:{topic}'
+COUNTS_CACHE_KEY = 'quiz:question_pool:{generation}:counts'
+
+
+def _pool_timeout():
+    """Seconds a pool may live in the cache before it is rebuilt."""
+    return getattr(settings, 'QUIZ_QUESTION_POOL_TIMEOUT', 300)
+
+
+def get_question_ids(topic):
+    """
+    Returns the IDs of every question in a topic.
+
+    Args:
+        topic (str): Topic code, e.g. 'FR'
+
+    Returns:
+        list: Question primary keys for the topic
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.topic_ids(topic).tolist()
+    key = POOL_CACHE_KEY.format(generation=bank_generation(), topic=topic)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Question.objects.filter(topic=topic)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        cache.set(key, ids, _pool_timeout())
+    return ids
+
+
+async def aget_question_ids(topic):
+    """Async variant of get_question_ids."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.topic_ids(topic).tolist()
+    key = POOL_CACHE_KEY.format(generation=await abank_generation(), topic=topic)
+    ids = await cache.aget(key)
+    if ids is None:
+        ids = [
+            question_id async for question_id in
+            Question.objects.filter(topic=topic).order_by('id').values_list('id', flat=True)
+        ]
+        await cache.aset(key, ids, _pool_timeout())
+    return ids
+
+
+def get_topic_counts():
+    """
+    Returns how many questions every topic holds.
+
+    Returns:
+        dict: {topic code: question count}, omitting empty topics
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.topic_counts()
+    key = COUNTS_CACHE_KEY.format(generation=bank_generation())
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict(
+            Question.objects.order_by().values('topic').annotate(count=Count('id'))
+            .values_list('topic', 'count')
+        )
+        cache.set(key, counts, _pool_timeout())
+    return counts
+
+
+async def aget_topic_counts():
+    """Async variant of get_topic_counts."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.topic_counts()
+    key = COUNTS_CACHE_KEY.format(generation=await abank_generation())
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = {
+            topic: count async for topic, count in
+            Question.objects.order_by().values('topic').annotate(count=Count('id'))
+            .values_list('topic', 'count')
+        }
+        await cache.aset(key, counts, _pool_timeout())
+    return counts
+
+
+def _cache_keys(generation, topics):
+    """Keys of the counts and of the pools of ``topics`` in a generation."""
+    return [
+        COUNTS_CACHE_KEY.format(generation=generation),
+        *(POOL_CACHE_KEY.format(generation=generation, topic=code) for code in topics),
+    ]
+
+
+def invalidate_question_pool(topic=None):
+    """
+    Drops this worker's cached pools and topic counts.
+
+    Other workers stop using theirs once they see the new bank generation;
+    this is the fast path for the worker that made the change, and for a
+    pool found to list a question that no longer exists. Inside a
+    transaction the keys are dropped again when it commits, since a quiz
+    start in between may cache the bank as it was before the change.
+
+    Args:
+        topic (str): Topic code whose pool is stale. When omitted, the pools
+            of every topic are dropped (e.g. a question moved between topics).
+    """
+    if topic is None:
+        topics = [code for code, _ in Question.TOPIC_CHOICES]
+    else:
+        topics = [topic]
+    cache.delete_many(_cache_keys(bank_generation(), topics))
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(_cache_keys(bank_generation(), topics)))
+
+
+def fetch_questions(question_ids):
+    """
+    Loads questions by ID, from the snapshot when one is loaded.
+
+    Returns:
+        dict: {question_id: question} for the questions that exist
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.questions(question_ids)
+    return Question.objects.in_bulk(question_ids)
+
+
+def _sample_snapshot(snapshot, topic, count):
+    """Draws questions from a snapshot, decoding only the drawn ones."""
+    ids = snapshot.topic_ids(topic)
+    if len(ids) < count:
+        return None
+    selected_ids = [ids[position] for position in random.sample(range(len(ids)), count)]
+    questions = snapshot.questions(selected_ids)
+    return [questions[question_id] for question_id in selected_ids]
+
+
+def sample_questions(topic, count):
+    """
+    Picks random questions from a topic without loading the whole bank.
+
+    Topics known to be too small are refused from the cached counts, without
+    loading their pool. Only the sampled rows are fetched. If the pool
+    references questions that were deleted by another process, the pool is
+    rebuilt once and sampling is retried.
+
+    Args:
+        topic (str): Topic code to sample from
+        count (int): Number of questions wanted
+
+    Returns:
+        list: Question instances (or SnapshotQuestions) in sampled order,
+        or None if the topic does not hold enough questions
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _sample_snapshot(snapshot, topic, count)
+    if get_topic_counts().get(topic, 0) < count:
+        return None
+    for _ in range(2):
+        ids = get_question_ids(topic)
+        if len(ids) < count:
+            return None
+        selected_ids = random.sample(ids, count)
+        questions = Question.objects.in_bulk(selected_ids)
+        if len(questions) == count:
+            return [questions[question_id] for question_id in selected_ids]
+        invalidate_question_pool(topic)
+    return None
+
+
+async def asample_questions(topic, count):
+    """Async variant of sample_questions."""
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _sample_snapshot(snapshot, topic, count)
+    if (await aget_topic_counts()).get(topic, 0) < count:
+        return None
+    for _ in range(2):
+        ids = await aget_question_ids(topic)
+        if len(ids) < count:
+            return None
+        selected_ids = random.sample(ids, count)
+        questions = await Question.objects.ain_bulk(selected_ids)
+        if len(questions) == count:
+            return [questions[question_id] for question_id in selected_ids]
+        await cache.adelete_many(_cache_keys(await abank_generation(), [topic]))
+    return None
@@ -0,0 +1,246 @@
+"""
+Full-text search over question texts and options.
+
+The index lives next to the question table and is kept in sync by the
+``Question`` signals, by the importer after each batch, and by
+``manage.py rebuild_search_index``:
+
+- SQLite: the FTS5 table ``quiz_question_fts`` (rowid = question ID,
+  columns ``text`` and ``options``), ranked with bm25. The unicode61
+  tokenizer folds case and diacritics, so "élève" matches "eleve".
+- PostgreSQL: ``quiz_question_search``, a GIN-indexed tsvector per
+  question with the text weighted above the options, ranked with ts_rank.
+  It uses the 'simple' configuration, because the bank mixes many
+  languages and no single stemmer fits them all.
+- Other databases have no index. Search falls back to ``icontains`` scans,
+  and near-duplicate detection is unavailable.
+
+Near duplicates are found by searching for any term of a question, then
+scoring the best candidates by the overlap of their terms (Jaccard).
+"""
+import re
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Question
+
+FTS_TABLE = 'quiz_question_fts'
+PG_TABLE = 'quiz_question_search'
+PG_DOCUMENT = "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')"
+
+NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_CANDIDATES = 10
+MAX_QUERY_TERMS = 32
+
+TERM = re.compile(r'\w+')
+QUESTION_FIELDS = ('id', 'text', 'option1', 'option2', 'option3', 'option4')
+
+
+def search_backend():
+    """Returns 'sqlite' or 'postgresql' when the database has an index, else None."""
+    return connection.vendor if connection.vendor in ('sqlite', 'postgresql') else None
+
+
+def terms(text):
+    """Splits text into lowercase words, as the indexes do."""
+    return TERM.findall(text.lower())
+
+
+def _document(row):
+    """Splits a (id, text, option1-4) row into its indexed columns."""
+    question_id, text, *options = row
+    return question_id, text, ' '.join(options)
+
+
+def _rows(questions):
+    return [tuple(getattr(question, field) for field in QUESTION_FIELDS) for question in questions]
+
+
+def index_questions(questions):
+    """
+    Adds or refreshes the index entries of saved questions.
+
+    Args:
+        questions (iterable): Question instances with primary keys
+    """
+    documents = [_document(row) for row in _rows(questions) if row[0] is not None]
+    backend = search_backend()
+    if not documents or backend is None:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(doc[0],) for doc in documents])
+            cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, text, options) VALUES (%s, %s, %s)', documents)
+        else:
+            cursor.executemany(
+                f'INSERT INTO {PG_TABLE} (question_id, document) VALUES (%s, {PG_DOCUMENT}) '
+                f'ON CONFLICT (question_id) DO UPDATE SET document = EXCLUDED.document',
+                documents,
+            )
+
+
+def unindex_questions(question_ids):
+    """Removes questions from the index."""
+    backend = search_backend()
+    if backend is None or not question_ids:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in question_ids])
+        else:
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE question_id = ANY(%s)', [list(question_ids)])
+
+
+def rebuild_index(chunk_size=2000):
+    """
+    Re-indexes the whole bank, streaming questions in chunks. Runs in one
+    transaction, so searches keep seeing the old index until it is done.
+
+    Returns:
+        int: Number of questions indexed
+    """
+    backend = search_backend()
+    if backend is None:
+        return 0
+    table = FTS_TABLE if backend == 'sqlite' else PG_TABLE
+    indexed = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {table}')
+        rows = Question.objects.order_by('id').values_list(*QUESTION_FIELDS).iterator(chunk_size=chunk_size)
+        while documents := [_document(row) for row in islice(rows, chunk_size)]:
+            with connection.cursor() as cursor:
+                if backend == 'sqlite':
+                    cursor.executemany(f'INSERT INTO {table} (rowid, text, options) VALUES (%s, %s, %s)', documents)
+                else:
+                    cursor.executemany(
+                        f'INSERT INTO {table} (question_id, document) VALUES (%s, {PG_DOCUMENT})', documents)
+            indexed += len(documents)
+    return indexed
+
+
+def _ranked_ids(words, topic, limit, match_any):
+    """
+    Runs an index query.
+
+    Args:
+        words (list): Terms to look for
+        topic (str): Only questions of this topic, or None
+        limit (int): Maximum number of hits
+        match_any (bool): Match questions holding any term instead of all
+
+    Returns:
+        list: (question_id, score) pairs, best first
+    """
+    words = list(dict.fromkeys(words))[:MAX_QUERY_TERMS]
+    topic_filter = 'AND q.topic = %s' if topic else ''
+    if search_backend() == 'sqlite':
+        # Quoted terms are plain strings to FTS5, never query operators.
+        match = (' OR ' if match_any else ' ').join(f'"{word}"' for word in words)
+        sql = (
+            f'SELECT q.id, -bm25({FTS_TABLE}, 2.0, 1.0) AS score FROM {FTS_TABLE} '
+            f'JOIN quiz_question q ON q.id = {FTS_TABLE}.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s {topic_filter} ORDER BY score DESC LIMIT %s'
+        )
+    else:
+        # \w+ terms contain no tsquery operators.
+        match = (' | ' if match_any else ' & ').join(words)
+        sql = (
+            f"SELECT q.id, ts_rank(s.document, query) AS score "
+            f"FROM {PG_TABLE} s JOIN quiz_question q ON q.id = s.question_id, to_tsquery('simple', %s) query "
+            f"WHERE s.document @@ query {topic_filter} ORDER BY score DESC LIMIT %s"
+        )
+    params = [match, topic, limit] if topic else [match, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _scan(words, topic):
+    """Questions holding every word, found by ``icontains`` scans (no index)."""
+    questions = Question.objects.all()
+    for word in words:
+        questions = questions.filter(
+            Q(text__icontains=word) | Q(option1__icontains=word) | Q(option2__icontains=word)
+            | Q(option3__icontains=word) | Q(option4__icontains=word)
+        )
+    if topic:
+        questions = questions.filter(topic=topic)
+    return questions.order_by('id')
+
+
+def search_question_ids(query, topic=None, limit=50):
+    """
+    Finds the IDs of the questions search_questions would return, without
+    loading the questions.
+
+    Returns:
+        list: Question IDs, best match first
+    """
+    words = terms(query)
+    if not words:
+        return []
+    if search_backend() is None:
+        return list(_scan(words, topic).values_list('id', flat=True)[:limit])
+    return [question_id for question_id, _ in _ranked_ids(words, topic, limit, match_any=False)]
+
+
+def search_questions(query, topic=None, limit=50):
+    """
+    Finds the questions whose text or options hold every word of a query.
+
+    Args:
+        query (str): Words to look for
+        topic (str): Only questions of this topic, or None
+        limit (int): Maximum number of results
+
+    Returns:
+        list: (Question, score) pairs, best match first; the score is None
+        without an index
+    """
+    words = terms(query)
+    if not words:
+        return []
+    if search_backend() is None:
+        return [(question, None) for question in _scan(words, topic)[:limit]]
+    hits = _ranked_ids(words, topic, limit, match_any=False)
+    questions = Question.objects.in_bulk([question_id for question_id, _ in hits])
+    return [(questions[question_id], score) for question_id, score in hits if question_id in questions]
+
+
+def question_terms(question):
+    """Distinct terms of a question's text and options."""
+    return set(terms(' '.join(str(getattr(question, field)) for field in QUESTION_FIELDS[1:])))
+
+
+def find_near_duplicates(question, threshold=NEAR_DUPLICATE_THRESHOLD, candidates=NEAR_DUPLICATE_CANDIDATES):
+    """
+    Finds questions of the same topic worded almost like ``question``.
+
+    Exact duplicates (same content hash) and the question itself are not
+    reported; the importer already merges those.
+
+    Args:
+        question (Question): Saved or unsaved question
+        threshold (float): Minimum share of common terms (0-1)
+        candidates (int): Best search hits compared with the question
+
+    Returns:
+        list: (Question, similarity) pairs, most similar first; empty
+        without an index
+    """
+    own_terms = question_terms(question)
+    if not own_terms or search_backend() is None:
+        return []
+    hits = _ranked_ids(terms(question.text) or sorted(own_terms), question.topic, candidates, match_any=True)
+    duplicates = []
+    for other in Question.objects.filter(id__in=[question_id for question_id, _ in hits]):
+        if other.pk == question.pk or (question.content_hash and other.content_hash == question.content_hash):
+            continue
+        other_terms = question_terms(other)
+        similarity = len(own_terms & other_terms) / len(own_terms | other_terms)
+        if similarity >= threshold:
+            duplicates.append((other, similarity))
+    return sorted(duplicates, key=lambda pair: pair[1], reverse=True)
@@ -0,0 +1,109 @@
+import threading
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .answer_key import invalidate_answer_keys
+from .db import configure_sqlite_connection
+from .leaderboard import forget_user, record_results as record_leaderboard_results, refresh_users
+from .models import Question, QuizResult, UserQuizStats, UserTopicStats
+from .question_pool import invalidate_question_pool
+from .search import index_questions, unindex_questions
+from .snapshot import rebuild_snapshot_on_commit
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Invalidates cached question data whenever the bank changes."""
+    # The question may have moved from another topic, so drop every pool.
+    invalidate_question_pool()
+    invalidate_answer_keys()
+    rebuild_snapshot_on_commit()
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, **kwargs):
+    """Refreshes the question's full-text index entry."""
+    index_questions([instance])
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    """Removes the question from the full-text index."""
+    unindex_questions([instance.pk])
+
+
+def results_created(results):
+    """
+    Updates the tables derived from QuizResult for newly created rows.
+
+    ``bulk_create`` does not send ``post_save``, so code that bulk-inserts
+    results calls this directly.
+
+    Args:
+        results (list): Newly created QuizResult instances
+    """
+    UserQuizStats.record_results(results)
+    UserTopicStats.record_results(results)
+    record_leaderboard_results(results)
+
+
+@receiver(post_save, sender=QuizResult)
+def quiz_result_saved(sender, instance, created, **kwargs):
+    """Folds newly created results into the user's statistics."""
+    if created:
+        results_created([instance])
+
+
+# (user_id, topic) pairs whose results were deleted in this thread and
+# whose statistics have not been recomputed yet.
+_deleted_results = threading.local()
+
+
+def refresh_deleted_results():
+    """Recomputes the statistics and leaderboard entries of every user and topic that lost results."""
+    groups = getattr(_deleted_results, 'groups', None)
+    if not groups:
+        return
+    _deleted_results.groups = set()
+    user_ids = {user_id for user_id, _ in groups}
+    for user_id in user_ids:
+        UserQuizStats.refresh_for_user(user_id)
+    for user_id, topic in groups:
+        UserTopicStats.refresh(user_id=user_id, topic=topic)
+    refresh_users(user_ids)
+
+
+@receiver(post_delete, sender=QuizResult)
+def quiz_result_deleted(sender, instance, using, **kwargs):
+    """
+    Recomputes the user's statistics and leaderboard entries, since
+    min/max and best percentages cannot be decremented.
+
+    Deleting a user or a queryset removes many results in one transaction,
+    so the affected pairs are collected and each is recomputed once, when
+    the transaction commits. The callbacks queued for the other rows find
+    nothing left to do.
+    """
+    groups = getattr(_deleted_results, 'groups', None)
+    if groups is None:
+        groups = _deleted_results.groups = set()
+    groups.add((instance.user_id, instance.topic))
+    transaction.on_commit(refresh_deleted_results, using=using)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    """Takes the user's leaderboard entries out of the rank histograms."""
+    forget_user(instance.pk)
+
+
+@receiver(connection_created)
+def database_connected(sender, connection, **kwargs):
+    """Tunes every new SQLite connection for concurrent writers."""
+    if connection.vendor == 'sqlite':
+        configure_sqlite_connection(connection)
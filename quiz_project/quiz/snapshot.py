@@ -0,0 +1,423 @@
+"""
+Read-only binary snapshot of the question bank (``QUIZ_SNAPSHOT_PATH``).
+
+``manage.py build_question_snapshot`` compiles every question into one
+file. The file holds the topic directory, question IDs, answer key and
+texts. Workers memory-map it, so quiz rendering and grading read questions
+straight from the mapping, without ORM queries or cache lookups. N
+workers share one copy in the page cache instead of N copies on their
+heaps. IDs and answers are read in place; only the texts of the drawn
+questions are decoded.
+
+Layout (version 1, native byte order, every section 8-byte aligned)::
+
+    header        HEADER struct: magic, version, byte order, counts,
+                  build time and section offsets
+    topics        topic_count TOPIC structs: code, first record, count
+    ids           int64 per record, ordered by (topic, id)
+    sorted ids    int64 per record, ordered by id
+    order         uint32 per record: record index of each sorted id
+    answers       uint8 per record: correct option
+    text offsets  uint64 per record: file offset of the record's strings
+    strings       per record: text, option1-4, each a uint32 byte length
+                  followed by UTF-8 bytes
+
+Snapshots are written to a temporary file and renamed over the old one,
+so a reader always maps a complete file. Workers notice a new file within
+``QUIZ_SNAPSHOT_CHECK_INTERVAL`` seconds. Mappings of a replaced file stay
+valid until they are dropped.
+
+When a question change commits, a ``.stale`` marker file is created next
+to the snapshot, and every worker stops reading the snapshot within the
+check interval, falling back to the database. A background thread
+rebuilds the snapshot QUIZ_SNAPSHOT_REBUILD_DELAY seconds later, once for
+all the changes made in the meantime; the rebuild removes the marker
+before reading the bank. If a rebuild fails, the marker stays and workers
+keep reading the database (see rebuild_snapshot_on_commit).
+"""
+import bisect
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .models import Question
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'QUIZSNAP'
+FORMAT_VERSION = 1
+
+# magic, version, little endian, topics, questions, built at (unix ns), then
+# the offsets of the ids, sorted ids, order, answers, text offsets and strings.
+HEADER = struct.Struct('<8sHBxIIq6Q')
+TOPIC = struct.Struct('<4sII')
+LENGTH = struct.Struct('<I')
+STRINGS_PER_QUESTION = 5
+
+_lock = threading.Lock()
+_loaded = {'path': None, 'identity': None, 'checked': float('-inf'), 'snapshot': None, 'stale': False}
+_rebuild_scheduled = False
+
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable question snapshot."""
+
+
+def snapshot_path():
+    """Path of the snapshot file, or None when snapshots are disabled."""
+    path = getattr(settings, 'QUIZ_SNAPSHOT_PATH', None)
+    return Path(path) if path else None
+
+
+def stale_marker(path):
+    """Path of the file marking the snapshot at ``path`` as out of date."""
+    return path.with_name(path.name + '.stale')
+
+
+class SnapshotQuestion:
+    """
+    A question read from a snapshot.
+
+    Carries the attributes quiz rendering uses, so it stands in for a
+    ``Question`` instance in QuizForm and the API.
+    """
+    __slots__ = ('id', 'topic', 'text', 'option1', 'option2', 'option3', 'option4', 'correct_option')
+
+    def __init__(self, id, topic, text, option1, option2, option3, option4, correct_option):
+        self.id = id
+        self.topic = topic
+        self.text = text
+        self.option1 = option1
+        self.option2 = option2
+        self.option3 = option3
+        self.option4 = option4
+        self.correct_option = correct_option
+
+    def __str__(self):
+        return self.text[:50]
+
+    def __repr__(self):
+        return f'<SnapshotQuestion {self.id}>'
+
+
+class QuestionSnapshot:
+    """
+    A memory-mapped snapshot file.
+
+    Attributes:
+        version (int): Format version of the file
+        built_at (int): Build time, in nanoseconds since the epoch
+        identity (tuple): (inode, mtime, size) of the mapped file
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as stream:
+            stat = os.fstat(stream.fileno())
+            if stat.st_size < HEADER.size:
+                raise SnapshotError(f"{path} is too small to be a question snapshot")
+            self._map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        (magic, self.version, little_endian, topic_count, count,
+         self.built_at, *offsets) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a question snapshot")
+        if self.version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} has format version {self.version}, expected {FORMAT_VERSION}")
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise SnapshotError(f"{path} was built on a machine with another byte order")
+
+        view = memoryview(self._map)
+        ids, sorted_ids, order, answers, text_offsets, strings = offsets
+        if strings > len(view):
+            raise SnapshotError(f"{path} is truncated")
+        self._ids = view[ids:ids + 8 * count].cast('q')
+        self._sorted_ids = view[sorted_ids:sorted_ids + 8 * count].cast('q')
+        self._order = view[order:order + 4 * count].cast('I')
+        self._answers = view[answers:answers + count]
+        self._text_offsets = view[text_offsets:text_offsets + 8 * count].cast('Q')
+        self._topics = {}
+        for position in range(topic_count):
+            code, first, size = TOPIC.unpack_from(self._map, HEADER.size + position * TOPIC.size)
+            self._topics[code.rstrip(b'\0').decode('ascii')] = (first, size)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def topic_counts(self):
+        """Returns {topic code: question count}, omitting empty topics."""
+        return {topic: size for topic, (first, size) in self._topics.items()}
+
+    def topic_ids(self, topic):
+        """
+        Returns the IDs of a topic's questions, in ID order.
+
+        Returns:
+            memoryview: int64 IDs, read in place from the mapping
+        """
+        first, size = self._topics.get(topic, (0, 0))
+        return self._ids[first:first + size]
+
+    def _record(self, question_id):
+        """Index of a question's record, or None if it is not in the snapshot."""
+        position = bisect.bisect_left(self._sorted_ids, question_id)
+        if position < len(self._sorted_ids) and self._sorted_ids[position] == question_id:
+            return self._order[position]
+        return None
+
+    def _topic_of(self, record):
+        for topic, (first, size) in self._topics.items():
+            if first <= record < first + size:
+                return topic
+        return None
+
+    def answer_key(self, question_ids):
+        """
+        Maps question IDs to their correct option.
+
+        Returns:
+            dict: {question_id: correct_option} for the IDs in the snapshot
+        """
+        answer_key = {}
+        for question_id in question_ids:
+            record = self._record(question_id)
+            if record is not None:
+                answer_key[question_id] = self._answers[record]
+        return answer_key
+
+    def questions(self, question_ids):
+        """
+        Reads questions by ID.
+
+        Returns:
+            dict: {question_id: SnapshotQuestion} for the IDs in the snapshot
+        """
+        questions = {}
+        for question_id in question_ids:
+            record = self._record(question_id)
+            if record is None:
+                continue
+            offset = self._text_offsets[record]
+            strings = []
+            for _ in range(STRINGS_PER_QUESTION):
+                (length,) = LENGTH.unpack_from(self._map, offset)
+                offset += LENGTH.size
+                strings.append(str(self._map[offset:offset + length], 'utf-8'))
+                offset += length
+            questions[question_id] = SnapshotQuestion(
+                question_id, self._topic_of(record), *strings, self._answers[record])
+        return questions
+
+
+def _align(stream):
+    """Pads the stream to the next multiple of 8 bytes and returns its position."""
+    position = stream.tell()
+    padding = -position % 8
+    stream.write(b'\0' * padding)
+    return position + padding
+
+
+def write_snapshot(stream, rows):
+    """
+    Writes a snapshot of question rows to a binary stream.
+
+    Args:
+        stream: Seekable binary file
+        rows (iterable): (id, topic, text, option1, option2, option3,
+            option4, correct_option) tuples ordered by topic, then id
+
+    Returns:
+        int: Number of questions written
+    """
+    ids = array('q')
+    answers = bytearray()
+    topics = {}
+    strings = bytearray()
+    string_offsets = array('Q')
+    for question_id, topic, *texts, correct_option in rows:
+        first, size = topics.get(topic, (len(ids), 0))
+        topics[topic] = (first, size + 1)
+        ids.append(question_id)
+        answers.append(correct_option)
+        string_offsets.append(len(strings))
+        for text in texts:
+            encoded = text.encode('utf-8')
+            strings += LENGTH.pack(len(encoded)) + encoded
+
+    count = len(ids)
+    order = sorted(range(count), key=ids.__getitem__)
+    stream.write(b'\0' * (HEADER.size + TOPIC.size * len(topics)))
+    offsets = []
+    for section in (
+        ids,
+        array('q', (ids[record] for record in order)),
+        array('I', order),
+        answers,
+    ):
+        offsets.append(_align(stream))
+        stream.write(section)
+    text_offsets = _align(stream)
+    strings_start = text_offsets + 8 * count
+    stream.write(array('Q', (strings_start + offset for offset in string_offsets)))
+    offsets += [text_offsets, stream.tell()]
+    stream.write(strings)
+
+    stream.seek(0)
+    stream.write(HEADER.pack(
+        MAGIC, FORMAT_VERSION, sys.byteorder == 'little', len(topics), count, time.time_ns(), *offsets))
+    for topic, (first, size) in topics.items():
+        stream.write(TOPIC.pack(topic.encode('ascii'), first, size))
+    return count
+
+
+def build_snapshot(path=None):
+    """
+    Compiles the question bank into a snapshot file and swaps it in.
+
+    The file is written next to its final path and renamed over it, so
+    readers never see a partial file. Concurrent builds are serialized with
+    a lock file where ``fcntl`` is available.
+
+    Args:
+        path (str or Path): Destination, defaulting to QUIZ_SNAPSHOT_PATH
+
+    Returns:
+        int: Number of questions in the snapshot
+    """
+    path = Path(path) if path else snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = Question.objects.order_by('topic', 'id').values_list(
+        'id', 'topic', 'text', 'option1', 'option2', 'option3', 'option4', 'correct_option',
+    )
+    with open(path.with_name(path.name + '.lock'), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        # Changes committed from here on may be missing from the rows; they mark it again.
+        stale_marker(path).unlink(missing_ok=True)
+        try:
+            descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.')
+            try:
+                with os.fdopen(descriptor, 'w+b') as stream:
+                    count = write_snapshot(stream, rows.iterator(chunk_size=2000))
+                    stream.flush()
+                    os.fsync(stream.fileno())
+                os.chmod(temporary, 0o644)
+                os.replace(temporary, path)
+            except BaseException:
+                Path(temporary).unlink(missing_ok=True)
+                raise
+        except BaseException:
+            # The old file stays in place but no longer matches the bank.
+            stale_marker(path).touch()
+            raise
+    if path == snapshot_path():
+        # Make this process pick up its own build right away.
+        with _lock:
+            _loaded['checked'] = float('-inf')
+    return count
+
+
+def get_snapshot():
+    """
+    Returns the current snapshot, or None when there is none to read.
+
+    The file is stat'ed at most every QUIZ_SNAPSHOT_CHECK_INTERVAL seconds
+    and remapped when it was replaced. Unreadable files are logged and
+    ignored, and stale ones are skipped until they are rebuilt, leaving
+    callers to fall back to the database.
+    """
+    path = snapshot_path()
+    if path is None:
+        return None
+    now = time.monotonic()
+    with _lock:
+        if path == _loaded['path'] and now - _loaded['checked'] < getattr(
+                settings, 'QUIZ_SNAPSHOT_CHECK_INTERVAL', 1):
+            return None if _loaded['stale'] else _loaded['snapshot']
+        _loaded['path'] = path
+        _loaded['checked'] = now
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _loaded['identity'] = _loaded['snapshot'] = None
+            return None
+        _loaded['stale'] = stale_marker(path).exists()
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) != _loaded['identity']:
+            try:
+                snapshot = QuestionSnapshot(path)
+            except (OSError, SnapshotError, struct.error):
+                logger.warning("Ignoring question snapshot %s", path, exc_info=True)
+                snapshot = None
+            _loaded['snapshot'] = snapshot
+            _loaded['identity'] = snapshot.identity if snapshot else (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return None if _loaded['stale'] else _loaded['snapshot']
+
+
+def _rebuild_after_delay():
+    """Waits for further changes, then rebuilds the snapshot from the database."""
+    global _rebuild_scheduled
+    time.sleep(getattr(settings, 'QUIZ_SNAPSHOT_REBUILD_DELAY', 1))
+    with _lock:
+        # Changes committed from now on schedule another rebuild.
+        _rebuild_scheduled = False
+    try:
+        build_snapshot()
+    except Exception:
+        logger.exception("Could not rebuild the question snapshot; reading questions from the database")
+
+
+def _start_rebuild():
+    """Runs _rebuild_after_delay in a daemon thread."""
+    def run():
+        try:
+            _rebuild_after_delay()
+        finally:
+            # The thread ends here: close its connections whatever their age.
+            connections.close_all()
+
+    threading.Thread(target=run, name='quiz-snapshot-rebuild', daemon=True).start()
+
+
+def _bank_changed():
+    """Marks the snapshot stale and schedules a rebuild unless one is pending."""
+    global _rebuild_scheduled
+    path = snapshot_path()
+    try:
+        stale_marker(path).touch()
+    except OSError:
+        logger.exception("Could not mark the question snapshot stale")
+    with _lock:
+        _loaded['checked'] = float('-inf')
+        if _rebuild_scheduled:
+            return
+        _rebuild_scheduled = True
+    _start_rebuild()
+
+
+def rebuild_snapshot_on_commit():
+    """
+    Marks the snapshot stale and rebuilds it once the current transaction commits.
+
+    Called wherever the bank changes. The rebuild runs in the background
+    after QUIZ_SNAPSHOT_REBUILD_DELAY seconds, so a burst of changes
+    costs one rebuild and requests never wait for it. Does nothing when
+    snapshots are disabled or no snapshot was built yet.
+    """
+    path = snapshot_path()
+    if path is not None and (path.exists() or stale_marker(path).exists()):
+        transaction.on_commit(_bank_changed)
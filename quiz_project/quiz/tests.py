@@ -1,3 +1,1430 @@
-from django.test import TestCase
+import csv
+import importlib
+import json
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+from unittest import TestCase, mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F, Sum
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase as DjangoTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils import timezone
+
+from . import adaptive, answer_key, api, async_views, leaderboard, snapshot, urls as quiz_urls
+from .adaptive import FenwickTree, record_answers, select_questions
+from .answer_key import abank_generation, bank_generation, get_answer_key
+from .answers import store_result
+from .attempts import (
+    TOKEN_SALT, Attempt, InvalidAttemptToken, attempt_in_flight, claim_attempt, issue_attempt_token,
+    read_attempt_token, release_attempt,
+)
+from .benchmarks import compare
+from .decks import apop_deck, pop_deck, queued_decks
+from .hashers import PROFILES
+from .importers import build_question
+from .instrumentation import finish_request, percentile, route_stats, start_request
+from .metrics import Counter, Histogram, Registry
+from .models import (
+    LeaderboardBucket, LeaderboardEntry, Question, QuestionBankVersion, QuestionMastery, QuestionStats, QuizAnswer,
+    QuizResult, UserQuizStats, UserTopicStats,
+)
+from .pagination import KeysetPage, apaginate, decode_cursor, encode_cursor, paginate
+from .profiling import StackSampler, summarize_collapsed
+from .question_pool import COUNTS_CACHE_KEY, POOL_CACHE_KEY, asample_questions, get_topic_counts, sample_questions
+from .search import find_near_duplicates, rebuild_index, search_questions
+from .signals import refresh_deleted_results
+from .snapshot import build_snapshot, get_snapshot
+from . import writebehind
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite profile only')
+class SQLiteConcurrencyTests(TestCase):
+    """
+    Exercises the SQLite profile against a real database file, since the
+    in-memory test database uses neither WAL nor file locking. A plain
+    unittest TestCase is used because the extra connection is not one of
+    the test runner's databases.
+    """
+    alias = 'quiz_concurrency'
+    workers = 8
+    submissions_per_worker = 10
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        database = dict(connection.settings_dict)
+        database['NAME'] = str(Path(cls.directory) / 'concurrency.sqlite3')
+        connections.settings[cls.alias] = database
+        super().setUpClass()
+        call_command('migrate', database=cls.alias, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.alias].close()
+        del connections.settings[cls.alias]
+        shutil.rmtree(cls.directory)
+
+    def test_connection_pragmas(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+
+    def test_concurrent_submissions_are_not_locked_out(self):
+        # bulk_create skips the signals, which would index into the test database.
+        questions = Question.objects.using(self.alias).bulk_create([
+            build_question({'text': f'FR question {number}', 'option1': 'a', 'option2': 'b', 'option3': 'c',
+                            'option4': 'd', 'correct_option': number % 4 + 1})
+            for number in range(5)
+        ])
+        answer_key = {question.id: question.correct_option for question in questions}
+        users = [User.objects.db_manager(self.alias).create_user(f'worker{number}') for number in range(self.workers)]
+        errors = []
+        start = threading.Barrier(self.workers)
+
+        def submit(user):
+            # Within this thread, the default database is the file, so the
+            # whole submission path (result, answers, statistics and
+            # leaderboard in one transaction) runs against it.
+            connections['default'] = connections.create_connection(self.alias)
+            try:
+                start.wait()
+                for score in range(self.submissions_per_worker):
+                    answers = {question_id: 1 for question_id in answer_key}
+                    store_result(user, 'FR', score % 6, answer_key, answers)
+            except OperationalError as exc:
+                errors.append(exc)
+            finally:
+                connections['default'].close()
+
+        threads = [threading.Thread(target=submit, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        submissions = self.workers * self.submissions_per_worker
+        self.assertEqual(QuizResult.objects.using(self.alias).count(), submissions)
+        self.assertEqual(QuizAnswer.objects.using(self.alias).count(), submissions * len(questions))
+        totals = UserQuizStats.objects.using(self.alias).aggregate(attempts=Sum('attempts'))
+        self.assertEqual(totals['attempts'], submissions)
+
+
+class BenchmarkComparisonTests(SimpleTestCase):
+    baseline = {
+        'sequential': {'history': {'p95_ms': 10.0, 'queries_mean': 4.0}},
+        'concurrent': {},
+    }
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+
+    def test_slower_or_chattier_routes_are_flagged(self):
+        report = {'sequential': {'history': {'p95_ms': 13.0, 'queries_mean': 5.0}}, 'concurrent': {}}
+        self.assertEqual(len(compare(self.baseline, report, tolerance=0.25)), 2)
+
+    def test_changes_within_tolerance_pass(self):
+        report = {
+            'sequential': {
+                'history': {'p95_ms': 12.0, 'queries_mean': 4.0},
+                'leaderboard': {'p95_ms': 99.0, 'queries_mean': 9.0},
+            },
+            'concurrent': {},
+        }
+        self.assertEqual(compare(self.baseline, report, tolerance=0.25), [])
+
+
+@override_settings(QUIZ_INSTRUMENTATION=True)
+class InstrumentationMiddlewareTests(DjangoTestCase):
+    def setUp(self):
+        route_stats.clear()
+        get_topic_counts()  # the history page reads the cached counts
+        self.user = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(self.user)
+
+    def test_server_timing_reports_queries(self):
+        response = self.client.get(reverse('quiz:history'))
+        timing = response['Server-Timing']
+        self.assertIn('desc="4 queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('view;dur=', timing)
+
+    def test_template_backend_times_rendering(self):
+        self.client.get(reverse('quiz:history'))
+        self.assertGreater(route_stats.snapshot()['GET quiz:history']['template_ms_mean'], 0)
+        timings, token = start_request()
+        try:
+            render_to_string('quiz/leaderboard_table.html', {'entries': [], 'metric': 'best'})
+        finally:
+            finish_request(token)
+        self.assertGreater(timings.template_seconds, 0)
+        self.assertEqual(timings._template_depth, 0)
+
+    def test_staff_endpoint_aggregates_routes(self):
+        self.client.get(reverse('quiz:history'))
+        self.client.get(reverse('quiz:history'))
+        routes = self.client.get(reverse('quiz:request_stats')).json()['routes']
+        self.assertEqual(routes['GET quiz:history']['requests'], 2)
+        self.assertEqual(routes['GET quiz:history']['queries_max'], 4)
+
+    def test_endpoint_is_staff_only(self):
+        self.client.force_login(User.objects.create_user('player'))
+        response = self.client.get(reverse('quiz:request_stats'))
+        self.assertEqual(response.status_code, 302)
+
+
+class LoginTests(DjangoTestCase):
+    def setUp(self):
+        # Cheap work factors; the hashes are counted, not timed.
+        profiles = mock.patch.dict(PROFILES, {'django': 1000, 'owasp': 2000})
+        profiles.start()
+        self.addCleanup(profiles.stop)
+        self.user = User.objects.create_user('learner', password='s3cret-pass')
+
+    def login(self):
+        with mock.patch.object(hashers, 'pbkdf2', wraps=hashers.pbkdf2) as pbkdf2:
+            response = self.client.post(reverse('quiz:login'), {'username': 'learner', 'password': 's3cret-pass'})
+        return response, pbkdf2.call_count
+
+    def test_login_hashes_the_password_once(self):
+        response, hashes = self.login()
+        self.assertRedirects(response, reverse('quiz:quiz'), fetch_redirect_response=False)
+        self.assertEqual(hashes, 1)
+
+    @override_settings(QUIZ_PASSWORD_PROFILE='owasp')
+    def test_login_rehashes_to_the_configured_profile(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        response, hashes = self.login()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(hashes, 2)  # The check, then the upgraded hash.
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertEqual(self.login()[1], 1)
+
+
+class MetricsTests(DjangoTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = Histogram('latency_seconds', 'Latency.', ['view'], buckets=(0.1, 1), registry=registry)
+        Counter('events_total', 'Events.', registry=registry).inc(2)
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, view='quiz')
+        exposition = registry.exposition()
+        self.assertIn('latency_seconds_bucket{view="quiz",le="0.1"} 1', exposition)
+        self.assertIn('latency_seconds_bucket{view="quiz",le="1.0"} 2', exposition)
+        self.assertIn('latency_seconds_bucket{view="quiz",le="+Inf"} 3', exposition)
+        self.assertIn('latency_seconds_count{view="quiz"} 3', exposition)
+        self.assertIn('events_total 2', exposition)
+
+    def test_snapshots_of_other_processes_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        registry = Registry()
+        events = Counter('events_total', 'Events.', ['kind'], registry=registry)
+        events.inc(kind='a')
+        Path(directory, '1-other.json').write_text('{"events_total": [[["a"], 4], [["b"], 1]]}')
+        with self.settings(QUIZ_METRICS_DIR=directory):
+            exposition = registry.exposition()
+        self.assertIn('events_total{kind="a"} 5', exposition)
+        self.assertIn('events_total{kind="b"} 1', exposition)
+
+    def test_endpoint_counts_events_and_is_local_only(self):
+        self.client.post(reverse('quiz:login'), {'username': 'nobody', 'password': 'wrong'})
+        response = self.client.get(reverse('quiz:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('quiz_login_attempts_total{outcome="failure"}', response.content.decode())
+        response = self.client.get(reverse('quiz:metrics'), REMOTE_ADDR='203.0.113.7')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(QUIZ_METRICS_TOKEN='scrape-secret')
+    def test_endpoint_requires_the_token_when_one_is_set(self):
+        # Behind a local reverse proxy every request comes from 127.0.0.1.
+        self.assertEqual(self.client.get(reverse('quiz:metrics')).status_code, 403)
+        response = self.client.get(reverse('quiz:metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('quiz:metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class ProfilingMiddlewareTests(DjangoTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.user = User.objects.create_user('profiled')
+        self.client.force_login(self.user)
+
+    def test_sampled_requests_are_profiled_and_rotated(self):
+        with self.settings(QUIZ_PROFILING=True, QUIZ_PROFILING_SAMPLE_RATE=1,
+                           QUIZ_PROFILING_DIR=self.directory, QUIZ_PROFILING_MAX_FILES=2):
+            for _ in range(3):
+                response = self.client.get(reverse('quiz:history'))
+        self.assertRegex(response['X-Quiz-Profile'], r'-quiz\.history-\d+ms-\d+-\d+\.prof$')
+        self.assertEqual(len(list(Path(self.directory).glob('*.prof'))), 2)
+
+    def test_header_requires_staff(self):
+        with self.settings(QUIZ_PROFILING=True, QUIZ_PROFILING_DIR=self.directory):
+            response = self.client.get(reverse('quiz:history'), headers={'X-Quiz-Profile': '1'})
+            self.assertNotIn('X-Quiz-Profile', response)
+            self.user.is_staff = True
+            self.user.save()
+            response = self.client.get(reverse('quiz:history'), headers={'X-Quiz-Profile': '1'})
+            self.assertIn('X-Quiz-Profile', response)
+
+    def test_collapsed_stacks_are_summarized_by_function(self):
+        path = Path(self.directory, 'sample.collapsed')
+        path.write_text('main;view;query 3\nmain;view;render 1\n')
+        total, self_samples, inclusive = summarize_collapsed([path])
+        self.assertEqual(total, 4)
+        self.assertEqual(self_samples['query'], 3)
+        self.assertEqual(inclusive['view'], 4)
+
+    def test_overlapping_samplers_restore_the_switch_interval(self):
+        original = sys.getswitchinterval()
+        first = StackSampler(threading.get_ident(), 0.002).__enter__()
+        second = StackSampler(threading.get_ident(), 0.001).__enter__()
+        self.assertEqual(sys.getswitchinterval(), 0.001)
+        first.__exit__(None, None, None)  # Finishes before the sampler started after it.
+        self.assertEqual(sys.getswitchinterval(), 0.001)
+        second.__exit__(None, None, None)
+        self.assertEqual(sys.getswitchinterval(), original)
+
+
+class FenwickTreeTests(SimpleTestCase):
+    def test_find_matches_a_linear_scan_after_updates(self):
+        rng = random.Random(0)
+        weights = [rng.random() for _ in range(37)]
+        tree = FenwickTree(weights)
+        for _ in range(500):
+            position = rng.randrange(len(weights))
+            weights[position] = rng.choice([0.0, rng.random() * 3])
+            tree.set(position, weights[position])
+            target = rng.random() * sum(weights)
+            cumulative = 0.0
+            for expected, weight in enumerate(weights):
+                cumulative += weight
+                if cumulative > target:
+                    break
+            self.assertEqual(tree.find(target), expected)
+
+    def test_sample_draws_distinct_positions_and_restores_weights(self):
+        tree = FenwickTree([1.0, 0.0, 2.0, 3.0])
+        drawn = tree.sample(4, random.Random(1))
+        self.assertEqual(sorted(drawn), [0, 2, 3])
+        self.assertEqual(list(tree.weights), [1.0, 0.0, 2.0, 3.0])
+        self.assertAlmostEqual(tree.total, 6.0)
+
+    def test_appended_positions_match_a_tree_built_at_once(self):
+        rng = random.Random(2)
+        weights = [rng.random() for _ in range(45)]
+        grown = FenwickTree([])
+        for weight in weights:
+            grown.append(weight)
+        built = FenwickTree(weights)
+        self.assertAlmostEqual(grown.total, built.total)
+        for _ in range(200):
+            target = rng.random() * built.total
+            self.assertEqual(grown.find(target), built.find(target))
+
+
+@override_settings(QUIZ_ADAPTIVE_SELECTION=True, QUIZ_BANK_VERSION_CHECK_INTERVAL=60)
+class AdaptiveSelectionTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_questions(8)
+        self.user = User.objects.create_user('learner')
+        self.questions = list(Question.objects.order_by('id'))
+
+    def answer(self, questions, option):
+        record_answers(self.user.pk, {question.id: question.correct_option for question in questions},
+                       {question.id: option for question in questions})
+
+    def test_mastery_counters_are_incremented_in_the_database(self):
+        question = self.questions[0]  # correct option 1
+        self.answer([question], 1)
+        # Another worker records an answer meanwhile.
+        QuestionMastery.objects.filter(question=question).update(attempts=F('attempts') + 1)
+        self.answer([question], 1)
+        mastery = QuestionMastery.objects.get(question=question)
+        self.assertEqual((mastery.attempts, mastery.correct, mastery.streak), (3, 2, 2))
+        self.answer([question], 2)
+        mastery.refresh_from_db()
+        self.assertEqual((mastery.attempts, mastery.correct, mastery.streak), (4, 2, 0))
+
+    def test_cached_weights_only_hold_answered_questions(self):
+        self.assertEqual(len(select_questions(self.user, 'FR', 5)), 5)
+        entry = adaptive._weights[(self.user.pk, 'FR')]
+        self.assertEqual(entry.seen, [])
+        self.answer(self.questions[:3], 4)
+        self.assertIs(adaptive._weights[(self.user.pk, 'FR')], entry)
+        self.assertEqual(sorted(entry.seen), [question.id for question in self.questions[:3]])
+        with self.assertNumQueries(1):  # the drawn questions; the weights are current
+            select_questions(self.user, 'FR', 5)
+
+    def test_sample_draws_every_question_once_when_most_are_seen(self):
+        self.answer(self.questions[:7], 1)
+        drawn = [question.id for question in select_questions(self.user, 'FR', 8)]
+        self.assertEqual(sorted(drawn), [question.id for question in self.questions])
+
+
+def create_questions(count, topic='FR'):
+    """Adds ``count`` questions to a topic."""
+    for number in range(count):
+        Question.objects.create(
+            topic=topic, text=f'{topic} question {number}', option1='a', option2='b', option3='c',
+            option4='d', correct_option=number % 4 + 1,
+        )
+
+
+def take_quiz(client, option, topic=None):
+    """Starts a quiz and answers every question with ``option``."""
+    url = reverse('quiz:quiz') + (f'?topic={topic}' if topic else '')
+    page = client.get(url).content.decode()
+    data = {f'question_{question_id}': option for question_id in re.findall(r'name="question_(\d+)"', page)}
+    token = re.search(r'name="attempt_token" value="([^"]+)"', page)
+    if token:
+        data['attempt_token'] = token.group(1)
+    return client.post(url, data)
+
+
+class ResubmissionTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_questions(5)
+        self.client.force_login(User.objects.create_user('impatient'))
+
+    def start(self):
+        """Starts a quiz and returns the form data answering every question."""
+        page = self.client.get(reverse('quiz:quiz')).content.decode()
+        data = {f'question_{question_id}': 1 for question_id in re.findall(r'name="question_(\d+)"', page)}
+        token = re.search(r'name="attempt_token" value="([^"]+)"', page)
+        if token:
+            data['attempt_token'] = token.group(1)
+        return data
+
+    def assert_submitted_once(self, data):
+        self.assertEqual(self.client.post(reverse('quiz:quiz'), data).status_code, 302)
+        result = QuizResult.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('quiz:quiz'), data)
+        self.assertEqual(response.url, reverse('quiz:result_reference', args=[result.reference]))
+        self.assertFalse([query['sql'] for query in queries if query['sql'].startswith('INSERT')])
+        self.assertEqual(self.client.get(response.url).context['result'], result)
+
+        # Once the claim is gone, the unique reference refuses the copy.
+        cache.clear()
+        response = self.client.post(reverse('quiz:quiz'), data)
+        self.assertEqual(response.url, reverse('quiz:result_reference', args=[result.reference]))
+        self.assertEqual(QuizResult.objects.count(), 1)
+        self.assertEqual(QuizAnswer.objects.count(), 5)
+
+    def test_session_attempt_is_stored_once(self):
+        self.assert_submitted_once(self.start())
+
+    @override_settings(QUIZ_ATTEMPT_TOKENS=True)
+    def test_token_attempt_is_stored_once(self):
+        self.assert_submitted_once(self.start())
+
+    def test_failed_store_releases_the_claim(self):
+        data = self.start()
+        with mock.patch('quiz.views.store_result', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.client.post(reverse('quiz:quiz'), data)
+        response = self.client.post(reverse('quiz:quiz'), data)
+        self.assertEqual(response.url, reverse('quiz:results', args=[QuizResult.objects.get().id]))
+
+    def test_resubmission_racing_the_first_store_waits_for_it(self):
+        self.start()
+        reference = self.client.session['quiz_reference']
+        claim_attempt(Attempt(question_ids=[], reference=reference, user_id=User.objects.get().pk))
+        response = self.client.get(reverse('quiz:result_reference', args=[reference]))
+        self.assertEqual(response.status_code, 202)
+        self.assertContains(response, 'http-equiv="refresh"', status_code=202)
+        self.client.force_login(User.objects.create_user('bystander'))
+        self.assertEqual(self.client.get(reverse('quiz:result_reference', args=[reference])).status_code, 404)
+        self.client.force_login(User.objects.get(username='impatient'))
+        cache.clear()
+        self.assertEqual(self.client.get(reverse('quiz:result_reference', args=[reference])).status_code, 404)
+
+    def test_journal_keeps_one_entry_per_reference(self):
+        entry = writebehind.PendingResult(
+            reference='00000000-0000-4000-8000-000000000002', user_id=User.objects.get().pk, topic='FR',
+            score=0, date_taken=datetime.now(dt_timezone.utc), answer_key={}, answers={},
+        )
+        self.assertEqual(len(writebehind.store_pending([entry, entry])), 1)
+        self.assertEqual(writebehind.store_pending([entry]), [])
+
+
+class AsyncViewTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        # quiz.urls picks the view module when it is imported.
+        async_views_setting = self.settings(QUIZ_ASYNC_VIEWS=True)
+        async_views_setting.enable()
+        self.addCleanup(self.reload_urls)
+        self.addCleanup(async_views_setting.disable)
+        self.reload_urls()
+        create_questions(5)
+        self.user = User.objects.create_user('asynchronous')
+
+    @staticmethod
+    def reload_urls():
+        importlib.reload(quiz_urls)
+        importlib.reload(sys.modules[settings.ROOT_URLCONF])
+        clear_url_caches()
+
+    def test_async_views_are_routed(self):
+        for name, view in [('quiz', async_views.quiz), ('history', async_views.results_history)]:
+            self.assertIs(resolve(reverse(f'quiz:{name}')).func, view)
+
+    async def test_anonymous_users_are_sent_to_login(self):
+        response = await self.async_client.get(reverse('quiz:quiz'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(settings.LOGIN_URL))
+
+    async def test_quiz_is_graded_once_and_listed_in_history(self):
+        await self.async_client.aforce_login(self.user)
+        page = (await self.async_client.get(reverse('quiz:quiz'))).content.decode()
+        data = {f'question_{question_id}': 1 for question_id in re.findall(r'name="question_(\d+)"', page)}
+        response = await self.async_client.post(reverse('quiz:quiz'), data)
+        result = await QuizResult.objects.aget()
+        self.assertEqual(response.url, reverse('quiz:results', args=[result.id]))
+        self.assertEqual(result.score, 2)
+        self.assertContains(await self.async_client.get(response.url), '2/5')
+
+        response = await self.async_client.post(reverse('quiz:quiz'), data)
+        self.assertEqual(response.url, reverse('quiz:result_reference', args=[result.reference]))
+        self.assertEqual(await QuizResult.objects.acount(), 1)
+        self.assertEqual(await QuizAnswer.objects.acount(), 5)
+        self.assertEqual((await UserQuizStats.objects.aget(pk=self.user.pk)).attempts, 1)
+        self.assertContains(await self.async_client.get(reverse('quiz:history')), 'Total attempts: 1')
+
+    async def test_results_of_other_users_are_hidden(self):
+        result = await QuizResult.objects.acreate(user=self.user, score=3)
+        await self.async_client.aforce_login(await User.objects.acreate_user('bystander'))
+        self.assertEqual((await self.async_client.get(reverse('quiz:results', args=[result.id]))).status_code, 404)
+        response = await self.async_client.get(reverse('quiz:result_reference', args=[result.reference]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_reference_of_an_attempt_in_flight_is_pending(self):
+        reference = str(uuid.uuid4())
+        await self.async_client.aforce_login(self.user)
+        claim_attempt(Attempt(question_ids=[], reference=reference, user_id=self.user.pk))
+        response = await self.async_client.get(reverse('quiz:result_reference', args=[reference]))
+        self.assertEqual(response.status_code, 202)
+
+    async def test_small_topic_shows_the_not_enough_questions_page(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('quiz:quiz') + '?topic=ES')
+        self.assertTemplateUsed(response, 'quiz/not_enough_questions.html')
+
+
+class AttemptTokenTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user('holder')
+
+    def test_token_round_trip(self):
+        attempt = read_attempt_token(issue_attempt_token(self.user, [3, 1, 2], 'ES'), self.user)
+        self.assertEqual((attempt.question_ids, attempt.topic, attempt.user_id), ([3, 1, 2], 'ES', self.user.pk))
+        self.assertEqual(str(uuid.UUID(attempt.reference)), attempt.reference)
+
+    def test_tampered_expired_and_foreign_tokens_are_refused(self):
+        token = issue_attempt_token(self.user, [1, 2])
+        with self.assertRaises(InvalidAttemptToken):
+            read_attempt_token(token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'), self.user)
+        with self.assertRaisesMessage(InvalidAttemptToken, 'another user'):
+            read_attempt_token(token, User.objects.create_user('thief'))
+        with self.settings(QUIZ_ATTEMPT_TOKEN_MAX_AGE=60), \
+                mock.patch('django.core.signing.time.time', return_value=time.time() + 61):
+            with self.assertRaises(InvalidAttemptToken):
+                read_attempt_token(token, self.user)
+
+    def test_token_without_topic_and_reference_is_claimed_by_nonce(self):
+        token = signing.dumps([self.user.pk, 'nonce', [1, 2]], salt=TOKEN_SALT, compress=True)
+        attempt = read_attempt_token(token, self.user)
+        self.assertEqual((attempt.topic, attempt.reference), (Question.DEFAULT_TOPIC, None))
+        self.assertEqual(attempt.claim_key(), 'quiz:attempt_claim:nonce')
+
+    def test_attempt_is_claimed_once_until_released(self):
+        attempt = read_attempt_token(issue_attempt_token(self.user, [1, 2]), self.user)
+        self.assertTrue(claim_attempt(attempt))
+        self.assertFalse(claim_attempt(attempt))
+        self.assertTrue(attempt_in_flight(attempt.reference, self.user.pk))
+        self.assertFalse(attempt_in_flight(attempt.reference, self.user.pk + 1))
+        release_attempt(attempt)
+        self.assertTrue(claim_attempt(attempt))
+
+    @override_settings(QUIZ_ATTEMPT_TOKENS=True)
+    def test_quiz_form_ignores_a_token_of_another_user(self):
+        create_questions(5)
+        self.client.force_login(self.user)
+        page = self.client.get(reverse('quiz:quiz')).content.decode()
+        data = {f'question_{question_id}': 1 for question_id in re.findall(r'name="question_(\d+)"', page)}
+        data['attempt_token'] = re.search(r'name="attempt_token" value="([^"]+)"', page).group(1)
+        self.client.force_login(User.objects.create_user('thief'))
+        self.client.post(reverse('quiz:quiz'), data)
+        self.assertFalse(QuizResult.objects.exists())
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post(reverse('quiz:quiz'), data).status_code, 302)
+        self.assertEqual(QuizResult.objects.get().user, self.user)
+
+
+class ApiTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_questions(5)
+        self.user = User.objects.create_user('client')
+        self.client.force_login(self.user)
+
+    def post(self, name, payload=None):
+        return self.client.post(reverse(name), json.dumps(payload or {}), content_type='application/json')
+
+    def start(self, option=1):
+        """Starts a quiz through the API and returns an attempt answering every question."""
+        response = self.post('quiz:api_start', {'topic': 'FR'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        return {
+            'attempt_token': body['attempt_token'],
+            'answers': {str(question['id']): option for question in body['questions']},
+        }
+
+    def test_submitted_attempt_is_graded_once(self):
+        attempt = self.start()
+        response = self.post('quiz:api_submit', attempt)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['result']['score'], 2)
+        self.assertEqual(response.json()['result']['reference'], str(QuizResult.objects.get().reference))
+
+        replay = self.post('quiz:api_submit', attempt)
+        self.assertEqual(replay.status_code, 409)
+        cache.clear()  # The claim expired: the unique reference still refuses the copy.
+        self.assertEqual(self.post('quiz:api_submit', attempt).status_code, 409)
+        self.assertEqual(QuizResult.objects.count(), 1)
+
+    def test_batch_reports_each_attempt_on_its_own(self):
+        first, second = self.start(1), self.start(2)
+        unanswered = self.start()
+        unanswered['answers'].popitem()
+        response = self.post('quiz:api_batch_submit', {'attempts': [
+            first, {'attempt_token': 'forged', 'answers': {}}, unanswered, second, first,
+        ]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result.get('result', {}).get('score') for result in results], [2, None, None, 1, None])
+        self.assertEqual(
+            [result.get('error') for result in results],
+            [None, 'Invalid or expired attempt token.', 'Please answer all questions.', None,
+             'This attempt has already been submitted.'],
+        )
+        # bulk_create sends no post_save; the derived tables are updated all the same.
+        self.assertEqual(self.user.quiz_stats.attempts, 2)
+        self.assertEqual(UserTopicStats.objects.get(user=self.user, topic='FR').attempts, 2)
+        self.assertEqual(QuizAnswer.objects.count(), 10)
+
+    @override_settings(QUIZ_API_MAX_BATCH_SIZE=2)
+    def test_oversized_batch_is_refused(self):
+        response = self.post('quiz:api_batch_submit', {'attempts': [self.start() for _ in range(3)]})
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(QuizResult.objects.exists())
+
+    def test_batch_attempt_stored_by_a_racing_request_is_reported(self):
+        first, second = self.start(1), self.start(2)
+        store_attempts = api.store_attempts
+
+        def racing_store(graded):
+            if len(graded) > 1:
+                # Another request stores the first attempt after the batch checked for it.
+                QuizResult.objects.create(
+                    user=self.user, topic='FR', score=0, total_questions=5, reference=graded[0][0].reference)
+            return store_attempts(graded)
+
+        with mock.patch('quiz.api.store_attempts', side_effect=racing_store):
+            response = self.post('quiz:api_batch_submit', {'attempts': [first, second]})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(results[0], {'error': 'This attempt has already been submitted.'})
+        self.assertEqual(results[1]['result']['score'], 1)
+        self.assertEqual(QuizResult.objects.count(), 2)
+
+    def test_history_lists_the_stored_results(self):
+        for _ in range(3):
+            self.assertEqual(self.post('quiz:api_submit', self.start()).status_code, 201)
+        page = self.client.get(reverse('quiz:api_history')).json()
+        self.assertEqual(page['stats']['total_attempts'], 3)
+        self.assertEqual([result['id'] for result in page['results']], list(
+            QuizResult.objects.order_by('-date_taken', '-id').values_list('id', flat=True)))
+        self.assertIsNone(page['older_cursor'])
+        self.assertEqual(self.client.get(reverse('quiz:api_history'), {'topic': 'ES'}).json()['results'], [])
+        self.assertEqual(self.client.get(reverse('quiz:api_history'), {'topic': 'XX'}).status_code, 400)
+
+
+class UserQuizStatsTests(DjangoTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('steady')
+
+    def take(self, score, day, topic='FR'):
+        return QuizResult.objects.create(
+            user=self.user, topic=topic, score=score, total_questions=5,
+            date_taken=datetime(2026, 3, day, 8, 30, tzinfo=dt_timezone.utc),
+        )
+
+    def test_results_are_folded_into_the_statistics(self):
+        self.take(3, 2)
+        self.take(1, 9, 'ES')
+        self.take(4, 5)
+        stats = UserQuizStats.objects.get(user=self.user)
+        self.assertEqual((stats.attempts, stats.score_sum, stats.min_score, stats.max_score), (3, 8, 1, 4))
+        self.assertEqual(stats.last_taken, datetime(2026, 3, 9, 8, 30, tzinfo=dt_timezone.utc))
+        self.assertEqual(UserTopicStats.objects.get(user=self.user, topic='FR').average(), 3.5)
+
+    def test_updates_add_to_concurrent_changes(self):
+        self.take(3, 2)
+        # Another worker stores a result meanwhile; its increment must survive ours.
+        UserQuizStats.objects.filter(user=self.user).update(attempts=F('attempts') + 1, score_sum=F('score_sum') + 5)
+        with self.assertNumQueries(1):
+            UserQuizStats.record_results([QuizResult(user=self.user, score=2, date_taken=timezone.now())])
+        stats = UserQuizStats.objects.get(user=self.user)
+        self.assertEqual((stats.attempts, stats.score_sum, stats.min_score), (3, 10, 2))
+
+    def test_batch_is_grouped_per_row(self):
+        other = User.objects.create_user('other')
+        now = timezone.now()
+        UserQuizStats.record_results([
+            QuizResult(user=user, score=score, date_taken=now)
+            for user, score in [(self.user, 1), (other, 2), (self.user, 5)]
+        ])
+        self.assertEqual(
+            sorted(UserQuizStats.objects.values_list('user__username', 'attempts', 'score_sum', 'max_score')),
+            [('other', 1, 2, 2), ('steady', 2, 6, 5)],
+        )
+
+    def test_deleting_a_result_recomputes_min_and_max(self):
+        self.take(3, 2)
+        lowest = self.take(1, 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            lowest.delete()
+        stats = UserQuizStats.objects.get(user=self.user)
+        self.assertEqual((stats.attempts, stats.score_sum, stats.min_score, stats.max_score), (1, 3, 3, 3))
+        self.assertEqual(UserQuizStats.rebuild(), 1)
+        self.assertEqual(UserQuizStats.objects.get(user=self.user).min_score, 3)
+
+    def test_deleted_results_are_recomputed_once_per_user_and_topic(self):
+        for day in range(1, 7):
+            self.take(day % 5, day, 'ES' if day % 2 else 'FR')
+        refresh_deleted_results()  # Pairs left by earlier tests, whose transactions were rolled back.
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                QuizResult.objects.filter(score__lt=3).delete()
+        refreshes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "quiz_user')]
+        self.assertEqual(len(refreshes), 3)  # the user, then FR and ES
+        stats = UserQuizStats.objects.get(user=self.user)
+        self.assertEqual((stats.attempts, stats.min_score, stats.max_score), (2, 3, 4))
+        self.assertEqual(UserTopicStats.objects.get(user=self.user, topic='ES').attempts, 1)
+
+
+class KeysetPaginationTests(DjangoTestCase):
+    def setUp(self):
+        user = User.objects.create_user('pager')
+        # Two pairs share a timestamp, so the id has to break the tie.
+        for day in (1, 2, 2, 3, 3):
+            QuizResult.objects.create(
+                user=user, score=day, total_questions=5,
+                date_taken=datetime(2026, 3, day, 8, 30, 0, 250, tzinfo=dt_timezone.utc),
+            )
+        self.expected = list(QuizResult.objects.order_by('-date_taken', '-id'))
+
+    def test_cursor_round_trip(self):
+        result = self.expected[0]
+        self.assertEqual(decode_cursor(encode_cursor(result)), (result.date_taken, result.id))
+        for malformed in ('', 'abc', '1_2_3', 'x_1', f'{10 ** 30}_1', None):
+            self.assertIsNone(decode_cursor(malformed))
+
+    def test_pages_cover_every_result_once_in_both_directions(self):
+        pages = [paginate(QuizResult.objects.all(), page_size=2)]
+        self.assertIsNone(pages[0].newer_cursor)
+        while pages[-1].older_cursor:
+            pages.append(paginate(QuizResult.objects.all(), before=pages[-1].older_cursor, page_size=2))
+        self.assertEqual([result for page in pages for result in page.items], self.expected)
+        self.assertEqual([len(page.items) for page in pages], [2, 2, 1])
+        self.assertIsNotNone(pages[-1].newer_cursor)
+
+        back = paginate(QuizResult.objects.all(), after=pages[-1].newer_cursor, page_size=2)
+        self.assertEqual(back.items, pages[1].items)
+        first = paginate(QuizResult.objects.all(), after=back.newer_cursor, page_size=2)
+        self.assertEqual(first.items, pages[0].items)
+        self.assertIsNone(first.newer_cursor)
+
+    def test_edge_pages(self):
+        self.assertEqual(paginate(QuizResult.objects.none()), KeysetPage(items=[]))
+        # A bad cursor falls back to the first page.
+        page = paginate(QuizResult.objects.all(), before='garbage', page_size=2)
+        self.assertEqual((page.items, page.newer_cursor), (self.expected[:2], None))
+        # Past the oldest result: empty, with no cursors to follow.
+        oldest = encode_cursor(self.expected[-1])
+        self.assertEqual(paginate(QuizResult.objects.all(), before=oldest), KeysetPage(items=[]))
+        exact = paginate(QuizResult.objects.all(), page_size=5)
+        self.assertEqual((len(exact.items), exact.older_cursor), (5, None))
+
+    def test_async_page_matches_the_sync_one(self):
+        page = async_to_sync(apaginate)(QuizResult.objects.all(), page_size=2)
+        self.assertEqual(page, paginate(QuizResult.objects.all(), page_size=2))
+
+
+class QuestionStatsTests(DjangoTestCase):
+    def setUp(self):
+        create_questions(5)
+        self.client.force_login(User.objects.create_user('answering'))
+
+    def take_quiz(self, option):
+        self.assertEqual(take_quiz(self.client, option).status_code, 302)
+
+    def stats(self):
+        return {
+            stats.question_id: (stats.attempts, stats.correct, [getattr(stats, f) for f in QuestionStats.OPTION_FIELDS])
+            for stats in QuestionStats.objects.all()
+        }
+
+    def test_submissions_store_answers_and_update_stats(self):
+        self.take_quiz(1)
+        self.take_quiz(2)
+        self.assertEqual(QuizAnswer.objects.count(), 10)
+        stats = QuestionStats.objects.get(question__text='FR question 0')
+        self.assertEqual(stats.correct, stats.option1_count)
+        self.assertEqual(stats.attempts, sum(getattr(stats, f) for f in QuestionStats.OPTION_FIELDS))
+        self.assertEqual(sum(s.attempts for s in QuestionStats.objects.all()), 10)
+
+    def test_rebuild_matches_incremental_updates(self):
+        for option in (1, 2, 3, 4, 1):
+            self.take_quiz(option)
+        incremental = self.stats()
+        self.assertEqual(QuestionStats.rebuild(chunk_size=3, batch_size=2), len(incremental))
+        self.assertEqual(self.stats(), incremental)
+
+
+# Long enough that no generation check lands inside a query count.
+@override_settings(QUIZ_BANK_VERSION_CHECK_INTERVAL=60)
+class QuestionPoolTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        create_questions(6, 'FR')
+        create_questions(2, 'ES')
+
+    def test_sample_draws_distinct_questions_of_the_topic(self):
+        questions = sample_questions('FR', 5)
+        self.assertEqual(len({question.id for question in questions}), 5)
+        self.assertEqual({question.topic for question in questions}, {'FR'})
+        with self.assertNumQueries(1):  # only the drawn rows; pool and counts are cached
+            sample_questions('FR', 5)
+        self.assertIsNone(sample_questions('ES', 5))
+
+    def test_pool_listing_a_deleted_question_is_rebuilt(self):
+        ids = list(Question.objects.filter(topic='FR').values_list('id', flat=True))
+        # Another process deleted a question before this one noticed.
+        key = POOL_CACHE_KEY.format(generation=bank_generation(), topic='FR')
+        cache.set(key, ids[1:] + [0])
+        questions = sample_questions('FR', 6)
+        self.assertEqual(sorted(question.id for question in questions), ids)
+        self.assertEqual(sorted(cache.get(key)), ids)
+
+    def test_change_made_by_another_worker_retires_the_pools(self):
+        with self.settings(QUIZ_BANK_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(get_topic_counts(), {'FR': 6, 'ES': 2})
+            sample_questions('FR', 6)
+            # Another process moves every question: no signal runs here.
+            Question.objects.filter(topic='FR').update(topic='ES')
+            QuestionBankVersion.bump()
+            self.assertEqual(get_topic_counts(), {'ES': 8})
+            self.assertIsNone(sample_questions('FR', 1))
+            self.assertEqual(len(sample_questions('ES', 8)), 8)
+
+    def test_async_sample_matches_the_sync_one(self):
+        questions = async_to_sync(asample_questions)('FR', 6)
+        self.assertEqual(sorted(question.id for question in questions),
+                         list(Question.objects.filter(topic='FR').order_by('id').values_list('id', flat=True)))
+        self.assertIsNone(async_to_sync(asample_questions)('ES', 3))
+
+
+@override_settings(QUIZ_BANK_VERSION_CHECK_INTERVAL=60)
+class TopicTests(DjangoTestCase):
+    def setUp(self):
+        create_questions(5, 'FR')
+        create_questions(5, 'ES')
+        create_questions(2, 'DE')
+        self.client.force_login(User.objects.create_user('polyglot'))
+
+    def test_topic_counts_are_cached_until_the_bank_changes(self):
+        self.assertEqual(get_topic_counts(), {'FR': 5, 'ES': 5, 'DE': 2})
+        with self.assertNumQueries(0):
+            get_topic_counts()
+        create_questions(1, 'IT')
+        self.assertEqual(get_topic_counts()['IT'], 1)
+
+    def test_picker_lists_topics_with_questions(self):
+        topics = {topic['code']: topic for topic in self.client.get(reverse('quiz:topics')).context['topics']}
+        self.assertEqual(set(topics), {'FR', 'ES', 'DE'})
+        self.assertTrue(topics['ES']['playable'])
+        self.assertFalse(topics['DE']['playable'])
+
+    def test_quiz_and_history_are_scoped_by_topic(self):
+        response = take_quiz(self.client, 1, 'ES')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(QuizResult.objects.get().topic, 'ES')
+        self.assertEqual(UserTopicStats.objects.get().topic, 'ES')
+        self.assertEqual(self.client.get(reverse('quiz:history') + '?topic=ES').context['stats']['total_attempts'], 1)
+        self.assertEqual(self.client.get(reverse('quiz:history') + '?topic=FR').context['stats']['total_attempts'], 0)
+        self.assertEqual(self.client.get(reverse('quiz:history')).context['stats']['total_attempts'], 1)
+
+    def test_small_topic_is_refused_without_loading_its_pool(self):
+        get_topic_counts()
+        with self.assertNumQueries(2):  # session and user
+            response = self.client.get(reverse('quiz:quiz') + '?topic=DE')
+        self.assertTemplateUsed(response, 'quiz/not_enough_questions.html')
+
+
+class AnswerKeyTests(DjangoTestCase):
+    def setUp(self):
+        create_questions(2)
+        self.question = Question.objects.first()
+
+    def test_change_made_by_another_worker_is_seen_after_the_check_interval(self):
+        with self.settings(QUIZ_BANK_VERSION_CHECK_INTERVAL=60):
+            self.assertEqual(get_answer_key([self.question.id]), {self.question.id: 1})
+            # Another process edits the bank: its signal handlers never run here.
+            Question.objects.filter(pk=self.question.pk).update(correct_option=2)
+            QuestionBankVersion.objects.update(token='other-worker')
+            with self.assertNumQueries(0):
+                self.assertEqual(get_answer_key([self.question.id]), {self.question.id: 1})
+        with self.settings(QUIZ_BANK_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(get_answer_key([self.question.id]), {self.question.id: 2})
+            self.assertEqual(bank_generation(), 'other-worker')
+
+    def test_bank_change_is_published_when_the_transaction_commits(self):
+        before = bank_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.correct_option = 3
+            self.question.save()
+            self.assertNotEqual(QuestionBankVersion.current(), before)
+            # Another thread caches the bank as it was before the commit.
+            answer_key._store_checked(before)
+            cache.set(COUNTS_CACHE_KEY.format(generation=before), {'FR': 0})
+        self.assertEqual(bank_generation(), QuestionBankVersion.current())
+        self.assertIsNone(cache.get(COUNTS_CACHE_KEY.format(generation=bank_generation())))
+        self.assertEqual(get_topic_counts(), {'FR': 2})
+        self.assertEqual(get_answer_key([self.question.id]), {self.question.id: 3})
+
+    def test_rolled_back_change_keeps_the_version(self):
+        before = QuestionBankVersion.current()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.question.save()
+            raise RuntimeError
+        self.assertEqual(QuestionBankVersion.current(), before)
+
+    def test_async_lookup_reads_the_same_version(self):
+        self.assertEqual(async_to_sync(abank_generation)(), QuestionBankVersion.current())
+
+
+class LeaderboardTests(DjangoTestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(name) for name in ('ada', 'bob', 'cy')]
+
+    def take(self, user, score, total=5):
+        return QuizResult.objects.create(user=user, topic='FR', score=score, total_questions=total)
+
+    def boards(self):
+        entries = sorted(LeaderboardEntry.objects.values_list(
+            'user_id', 'topic', 'window', 'period', 'attempts', 'score_sum', 'question_sum',
+            'best_percentage', 'average_percentage'))
+        buckets = sorted(LeaderboardBucket.objects.filter(users__gt=0).values_list(
+            'topic', 'window', 'period', 'bucket', 'users'))
+        return entries, buckets
+
+    def test_incremental_boards_match_a_rebuild(self):
+        for user, scores in zip(self.users, [(4, 2), (3,), (1, 5, 2)]):
+            for score in scores:
+                self.take(user, score)
+        incremental = self.boards()
+        self.assertEqual(len(incremental[0]), 9)
+        leaderboard.rebuild()
+        self.assertEqual(self.boards(), incremental)
+
+    def test_rank_follows_the_best_percentage(self):
+        ada, bob, cy = self.users
+        self.take(ada, 4)
+        self.take(bob, 3)
+        self.take(cy, 3)
+        self.assertEqual([leaderboard.user_standing(user, 'FR', 'week')[1] for user in self.users], [1, 2, 2])
+        self.take(cy, 5)
+        self.take(cy, 1)
+        entry, rank = leaderboard.user_standing(cy, 'FR', 'month')
+        self.assertEqual((rank, entry.attempts, entry.best_percentage), (1, 3, 100.0))
+        self.assertEqual(leaderboard.user_standing(ada, 'FR', 'all')[1], 2)
+        self.assertEqual(leaderboard.user_standing(ada, 'ES', 'all'), (None, None))
+
+        bob.delete()
+        self.assertEqual(
+            LeaderboardBucket.objects.filter(window='all').aggregate(users=Sum('users'))['users'], 2)
+
+    def test_deleted_results_leave_the_boards(self):
+        ada, bob, cy = self.users
+        best = self.take(ada, 5)
+        self.take(ada, 2)
+        self.take(bob, 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            best.delete()
+        entry, rank = leaderboard.user_standing(ada, 'FR', 'all')
+        self.assertEqual((rank, entry.attempts, entry.best_percentage), (2, 1, 40.0))
+        incremental = self.boards()
+        leaderboard.rebuild()
+        self.assertEqual(self.boards(), incremental)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            QuizResult.objects.filter(user=bob).delete()
+        self.assertEqual(leaderboard.user_standing(bob, 'FR', 'all'), (None, None))
+        self.assertEqual(leaderboard.user_standing(ada, 'FR', 'all')[1], 1)
+
+    def test_queries_do_not_grow_with_the_boards_touched(self):
+        def new_results(count):
+            return [QuizResult(user=self.users[number % 3], topic=('FR', 'ES')[number % 2], score=number % 6,
+                               total_questions=5, date_taken=timezone.now()) for number in range(count)]
+
+        with CaptureQueriesContext(connection) as one:
+            leaderboard.record_results(new_results(1))
+        with CaptureQueriesContext(connection) as many:
+            leaderboard.record_results(new_results(12))
+        self.assertEqual(len(many), len(one))
+        self.assertLessEqual(len(one), 7)
+
+
+class ImportTests(DjangoTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def load(self, name, content, *args):
+        path = self.directory / name
+        path.write_text(content)
+        call_command('load_questions', str(path), *args, stdout=StringIO())
+
+    def test_reimport_updates_rows_instead_of_duplicating_them(self):
+        header = 'text,option1,option2,option3,option4,correct_option,topic\n'
+        self.load('bank.csv', header + 'Chat?,cat,dog,cow,hen,1,FR\nChien?,cat,dog,cow,hen,2,FR\n'
+                  'Chat? ,cat,dog, cow,hen,1,FR\n')
+        self.assertEqual(Question.objects.count(), 2)
+        self.load('bank.csv', header + 'Chat?,cat,dog,cow,hen,3,IT\n', '--batch-size', '1')
+        question = Question.objects.get(text='Chat?')
+        self.assertEqual((question.correct_option, question.topic), (3, 'IT'))
+        self.assertEqual(get_topic_counts(), {'FR': 1, 'IT': 1})
+
+    def test_jsonl_rows_are_validated(self):
+        row = {'text': 'Pain?', 'option1': 'bread', 'option2': 'wine', 'option3': 'milk', 'option4': 'egg'}
+        self.load('good.jsonl', json.dumps({**row, 'correct_option': 1}) + '\n\n', '--topic', 'ES')
+        self.assertEqual(Question.objects.get().topic, 'ES')
+        with self.assertRaisesMessage(CommandError, 'line 2: correct_option must be between 1 and 4'):
+            self.load('bad.jsonl', json.dumps({**row, 'correct_option': 1}) + '\n'
+                      + json.dumps({**row, 'correct_option': 5}) + '\n')
+
+
+class SnapshotTests(DjangoTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = self.settings(QUIZ_SNAPSHOT_PATH=str(Path(directory, 'questions.snapshot')),
+                                 QUIZ_SNAPSHOT_CHECK_INTERVAL=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        create_questions(5, 'FR')
+        create_questions(3, 'ES')
+        self.question = Question.objects.create(
+            topic='DE', text='Wie heißt „Käse“?', option1='cheese', option2='bread', option3='wine',
+            option4='milk', correct_option=1,
+        )
+        self.assertEqual(build_snapshot(), 9)
+        self.client.force_login(User.objects.create_user('mapped'))
+
+    def test_snapshot_reads_back_the_bank(self):
+        snapshot = get_snapshot()
+        self.assertEqual(snapshot.topic_counts(), {'DE': 1, 'ES': 3, 'FR': 5})
+        self.assertEqual(snapshot.topic_ids('ES').tolist(), list(
+            Question.objects.filter(topic='ES').order_by('id').values_list('id', flat=True)))
+        question = snapshot.questions([self.question.id, 0])[self.question.id]
+        self.assertEqual((question.text, question.option1, question.topic), ('Wie heißt „Käse“?', 'cheese', 'DE'))
+        self.assertEqual(snapshot.answer_key([self.question.id, 0]), {self.question.id: 1})
+
+    def test_quiz_is_drawn_and_graded_without_reading_questions(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = take_quiz(self.client, 1)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse([query['sql'] for query in queries if '"quiz_question"' in query['sql']])
+        self.assertEqual(QuizResult.objects.get().total_questions, 5)
+
+    def test_question_changes_rebuild_the_snapshot_once_in_the_background(self):
+        with mock.patch('quiz.snapshot._start_rebuild') as start_rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                create_questions(3, 'IT')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.question.delete()
+        start_rebuild.assert_called_once_with()
+        # Stale until rebuilt: quizzes are drawn from the database meanwhile.
+        self.assertIsNone(get_snapshot())
+        self.assertEqual(get_topic_counts()['IT'], 3)
+
+        with self.settings(QUIZ_SNAPSHOT_REBUILD_DELAY=0):
+            snapshot._rebuild_after_delay()
+        self.assertEqual(get_snapshot().topic_counts(), {'ES': 3, 'FR': 5, 'IT': 3})
+
+    def test_failed_rebuild_falls_back_to_the_database(self):
+        self.question.correct_option = 2
+        with mock.patch('quiz.snapshot._start_rebuild'), self.captureOnCommitCallbacks(execute=True):
+            self.question.save()
+        with self.settings(QUIZ_SNAPSHOT_REBUILD_DELAY=0), \
+                mock.patch('quiz.snapshot.write_snapshot', side_effect=OSError('disk full')), \
+                self.assertLogs('quiz.snapshot', 'ERROR'):
+            snapshot._rebuild_after_delay()
+        self.assertIsNone(get_snapshot())
+        self.assertEqual(get_answer_key([self.question.id]), {self.question.id: 2})
+
+
+class WriteBehindTests(DjangoTestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        settings = self.settings(QUIZ_WRITE_BEHIND=True, QUIZ_WRITE_BEHIND_DIR=str(self.directory))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Flushed by the test instead of a background thread.
+        self.writer = writebehind.ResultWriter(self.directory, batch_size=10, fsync=False)
+        writer = mock.patch.object(writebehind, '_writer', self.writer)
+        writer.start()
+        self.addCleanup(writer.stop)
+        create_questions(5)
+        self.user = User.objects.create_user('spiky')
+        self.client.force_login(self.user)
+
+    def test_result_is_readable_before_and_after_the_flush(self):
+        response = take_quiz(self.client, 1)
+        self.assertFalse(QuizResult.objects.exists())
+        self.assertEqual(len(list(self.directory.glob('results-*.jsonl'))), 1)
+        page = self.client.get(response.url)
+        self.assertEqual(page.context['result'].score, 2)
+
+        self.assertEqual(self.writer.flush(), 1)
+        result = QuizResult.objects.get()
+        self.assertEqual(response.url, reverse('quiz:result_reference', args=[result.reference]))
+        self.assertEqual((result.score, result.answers.count()), (2, 5))
+        self.assertEqual(self.user.quiz_stats.attempts, 1)
+        self.assertFalse(list(self.directory.glob('results-*.jsonl')))
+        self.assertEqual(self.client.get(response.url).context['result'].pk, result.pk)
+
+        other = User.objects.create_user('other')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(response.url).status_code, 404)
+
+    def test_orphaned_journal_is_replayed_once(self):
+        entry = writebehind.PendingResult(
+            reference='00000000-0000-4000-8000-000000000001', user_id=self.user.pk, topic='FR', score=1,
+            date_taken=datetime(2026, 3, 1, 8, 30, tzinfo=dt_timezone.utc),
+            answer_key={question.id: question.correct_option for question in Question.objects.all()},
+            answers={Question.objects.first().id: 1},
+        )
+        (self.directory / 'results-1-dead.jsonl').write_text(entry.to_line() + '{"reference": "torn')
+        with self.assertLogs('quiz.writebehind', 'WARNING'):
+            self.assertEqual(self.writer.replay_orphans(), 1)
+        result = QuizResult.objects.get()
+        self.assertEqual((result.date_taken, result.total_questions, result.answers.count()), (entry.date_taken, 5, 1))
+
+        (self.directory / 'results-1-dead.jsonl').write_text(entry.to_line())
+        self.assertEqual(self.writer.replay_orphans(), 1)
+        self.assertEqual(QuizResult.objects.count(), 1)
+        self.assertFalse(list(self.directory.glob('results-*.jsonl')))
+
+    def entry(self, number, option=1):
+        return writebehind.PendingResult(
+            reference=f'00000000-0000-4000-8000-{number:012d}', user_id=self.user.pk, topic='FR', score=number,
+            date_taken=datetime(2026, 3, 1, 8, 30, tzinfo=dt_timezone.utc),
+            answer_key={question.id: question.correct_option for question in Question.objects.all()},
+            answers={Question.objects.first().id: option},
+        )
+
+    def test_entry_that_cannot_be_stored_is_quarantined(self):
+        for number, option in [(1, 1), (2, -1), (3, 2)]:  # A negative option violates a CHECK constraint.
+            self.writer.submit(self.entry(number, option))
+        with self.assertLogs('quiz.writebehind', 'ERROR'):
+            self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(sorted(QuizResult.objects.values_list('score', flat=True)), [1, 3])
+        self.assertIsNone(self.writer.find(self.entry(2).reference))
+        with open(self.directory / writebehind.QUARANTINE_FILE) as stream:
+            self.assertEqual([entry.reference for entry in writebehind.read_journal(stream)], [self.entry(2).reference])
+        self.assertFalse(list(self.directory.glob('results-*.jsonl')))
+
+    def test_unavailable_database_keeps_the_entries_queued(self):
+        self.writer.submit(self.entry(1))
+        with mock.patch.object(writebehind, 'store_pending', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.writer.flush()
+        self.assertIsNotNone(self.writer.find(self.entry(1).reference))
+        self.assertFalse((self.directory / writebehind.QUARANTINE_FILE).exists())
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(QuizResult.objects.count(), 1)
+
+    def test_orphaned_journal_with_a_bad_entry_is_replayed(self):
+        (self.directory / 'results-1-dead.jsonl').write_text(self.entry(1, -1).to_line() + self.entry(2).to_line())
+        with self.assertLogs('quiz.writebehind', 'ERROR'):
+            self.assertEqual(self.writer.replay_orphans(), 2)
+        self.assertEqual(str(QuizResult.objects.get().reference), self.entry(2).reference)
+        self.assertFalse(list(self.directory.glob('results-*.jsonl')))
+
+
+class DeckPoolTests(DjangoTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        settings = self.settings(QUIZ_DECK_POOL=True, QUIZ_DECK_POOL_LOW_WATER=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        create_questions(6, 'FR')
+        self.client.force_login(User.objects.create_user('dealt'))
+
+    def test_quiz_start_pops_a_prerendered_deck(self):
+        call_command('fill_deck_pool', topic=['FR'], size=2, stdout=StringIO())
+        self.assertEqual(queued_decks('FR', 5), 2)
+        with CaptureQueriesContext(connection) as queries:
+            page = self.client.get(reverse('quiz:quiz')).content.decode()
+        self.assertFalse([query['sql'] for query in queries if '"quiz_question"' in query['sql']])
+        self.assertEqual(len(set(re.findall(r'name="question_(\d+)"', page))), 5)
+        self.assertEqual(queued_decks('FR', 5), 1)
+
+        self.assertEqual(take_quiz(self.client, 1).status_code, 302)
+        self.assertEqual(QuizResult.objects.get().total_questions, 5)
+        self.assertEqual(queued_decks('FR', 5), 0)
+        # An empty pool falls back to drawing the quiz inline.
+        self.assertEqual(take_quiz(self.client, 1).status_code, 302)
+
+    def test_bank_changes_retire_decks_and_low_pools_refill_once(self):
+        call_command('fill_deck_pool', topic=['FR'], size=3, stdout=StringIO())
+        Question.objects.first().save()
+        self.assertEqual(queued_decks('FR', 5), 0)
+        self.assertIsNone(pop_deck('FR', 5))
+
+        with self.settings(QUIZ_DECK_POOL_LOW_WATER=5), mock.patch('quiz.decks.threading.Thread') as thread:
+            pop_deck('FR', 5)
+            pop_deck('FR', 5)
+            pop_deck('ES', 5)
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+    def test_async_pop_with_a_cold_cache_starts_a_refill(self):
+        cache.clear()
+        with self.settings(QUIZ_DECK_POOL_LOW_WATER=5), mock.patch('quiz.decks._start_refill') as start_refill:
+            self.assertIsNone(async_to_sync(apop_deck)('FR', 5))
+        start_refill.assert_called_once()
+
+
+@skipUnless(connection.vendor in ('sqlite', 'postgresql'), 'Full-text index only')
+class SearchTests(DjangoTestCase):
+    def setUp(self):
+        self.library = Question.objects.create(
+            topic='FR', text='Comment dit-on « bibliothèque » en anglais ?',
+            option1='library', option2='bookshop', option3='bakery', option4='museum', correct_option=1)
+        self.bookshop = Question.objects.create(
+            topic='FR', text='Que veut dire « librairie » ?',
+            option1='library', option2='bookshop', option3='bakery', option4='bank', correct_option=2)
+        self.spanish = Question.objects.create(
+            topic='ES', text='¿Cómo se dice library en español?',
+            option1='biblioteca', option2='librería', option3='panadería', option4='museo', correct_option=1)
+
+    def ids(self, query, topic=None):
+        return [question.id for question, score in search_questions(query, topic)]
+
+    def test_search_ranks_text_matches_first_and_folds_accents(self):
+        self.assertEqual(self.ids('bibliotheque'), [self.library.id])
+        self.assertEqual(self.ids('library')[0], self.spanish.id)
+        self.assertEqual(sorted(self.ids('library', 'FR')), [self.library.id, self.bookshop.id])
+        self.assertEqual(self.ids('library bank'), [self.bookshop.id])
+        self.assertEqual(self.ids('"OR* ('), [])
+
+    def test_index_follows_saves_deletes_and_rebuilds(self):
+        self.bookshop.text = 'Que veut dire « papeterie » ?'
+        self.bookshop.save()
+        self.assertEqual(self.ids('papeterie'), [self.bookshop.id])
+        self.assertEqual(self.ids('librairie'), [])
+        self.library.delete()
+        self.assertEqual(self.ids('bibliotheque'), [])
+        self.assertEqual(rebuild_index(), 2)
+        self.assertEqual(self.ids('papeterie'), [self.bookshop.id])
+
+    def test_near_duplicates_are_reported_and_skipped_on_import(self):
+        reworded = Question(topic='FR', text='Comment dit-on « bibliothèque » en anglais ?!',
+                            option1='library', option2='bookshop', option3='bakery', option4='zoo')
+        self.assertEqual([question.id for question, _ in find_near_duplicates(reworded)], [self.library.id])
+
+        source = Path(tempfile.mkdtemp(), 'new.jsonl')
+        self.addCleanup(shutil.rmtree, source.parent)
+        source.write_text(
+            json.dumps({'text': reworded.text, 'option1': 'library', 'option2': 'bookshop',
+                        'option3': 'bakery', 'option4': 'zoo', 'correct_option': 1}) + '\n'
+            + json.dumps({'text': 'Que veut dire « boulangerie » ?', 'option1': 'bakery', 'option2': 'bank',
+                          'option3': 'bench', 'option4': 'boat', 'correct_option': 1}) + '\n'
+        )
+        stderr = StringIO()
+        call_command('load_questions', str(source), near_duplicates='skip', stdout=StringIO(), stderr=stderr)
+        self.assertIn(f'#{self.library.id}', stderr.getvalue())
+        self.assertEqual(Question.objects.count(), 4)
+        self.assertEqual(len(self.ids('boulangerie')), 1)
+
+    def test_search_page_is_staff_only(self):
+        self.client.force_login(User.objects.create_user('author', is_staff=True))
+        response = self.client.get(reverse('quiz:question_search'), {'q': 'library', 'topic': 'ES'})
+        self.assertEqual(len(response.context['hits']), 1)
+        response = self.client.get(reverse('quiz:question_search'), {'similar': self.library.id})
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(User.objects.create_user('student'))
+        self.assertEqual(self.client.get(reverse('quiz:question_search')).status_code, 302)
+
+
+class ExportTests(DjangoTestCase):
+    def setUp(self):
+        alice = User.objects.create_user('alice')
+        bob = User.objects.create_user('bob')
+        for user, topic, score, day in [(alice, 'FR', 5, 1), (alice, 'ES', 2, 2), (bob, 'FR', 3, 3)]:
+            result = QuizResult.objects.create(user=user, topic=topic, score=score, total_questions=5)
+            QuizResult.objects.filter(pk=result.pk).update(
+                date_taken=datetime(2026, 3, day, 12, tzinfo=dt_timezone.utc))
+        self.client.force_login(User.objects.create_user('reporter', is_staff=True))
+
+    def test_view_streams_filtered_csv(self):
+        response = self.client.get(reverse('quiz:export_results'), {'topic': 'FR', 'from': '2026-03-02'})
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([(row['username'], row['score'], row['percentage']) for row in rows], [('bob', '3', '60.0')])
+        self.assertEqual(rows[0]['feedback'], 'Excellent work!')
+
+    def test_view_rejects_bad_filters_and_non_staff(self):
+        self.assertEqual(self.client.get(reverse('quiz:export_results'), {'from': 'March'}).status_code, 400)
+        response = self.client.get(reverse('quiz:export_results'), {'topic': '<script>alert(1)</script>'})
+        self.assertEqual((response.status_code, response['Content-Type']), (400, 'text/plain'))
+        self.assertNotIn(b'<script>', response.content)
+        self.client.force_login(User.objects.get(username='alice'))
+        self.assertEqual(self.client.get(reverse('quiz:export_results')).status_code, 302)
+
+    def test_command_writes_jsonl(self):
+        out = StringIO()
+        call_command('export_results', format='jsonl', username='alice', to='2026-03-01', chunk_size=1, stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(r['username'], r['topic'], r['score']) for r in records], [('alice', 'FR', 5)])
+
+
+class AdminTests(DjangoTestCase):
+    def setUp(self):
+        create_questions(5)
+        self.client.force_login(User.objects.create_superuser('admin'))
+
+    def test_results_changelist_queries_do_not_grow_with_rows(self):
+        users = [User.objects.create_user(f'player{number}') for number in range(3)]
+        QuizResult.objects.create(user=users[0], score=1)
+        url = reverse('admin:quiz_quizresult_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for user in users:
+            for _ in range(5):
+                QuizResult.objects.create(user=user, score=2)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    def test_move_to_topic_updates_and_refreshes_counts(self):
+        ids = list(Question.objects.values_list('id', flat=True)[:2])
+        self.assertEqual(get_topic_counts(), {'FR': 5})
+        self.client.post(reverse('admin:quiz_question_changelist'), {
+            'action': 'move_to_topic', 'topic': 'IT', '_selected_action': ids,
+        })
+        self.assertEqual(get_topic_counts(), {'FR': 3, 'IT': 2})
+
+    def test_question_search_uses_the_full_text_index(self):
+        Question.objects.create(text="L'élève lit", option1='a', option2='b', option3='c', option4='d',
+                                correct_option=1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:quiz_question_changelist'), {'q': 'eleve'})
+        self.assertEqual([question.text for question in response.context['cl'].result_list], ["L'élève lit"])
+        self.assertFalse([query['sql'] for query in queries if 'LIKE' in query['sql']])
+
+    def test_duplicate_question_is_refused_by_the_form(self):
+        original = Question.objects.first()
+        data = {
+            'topic': 'FR', 'text': f'  {original.text} ', 'option1': 'a', 'option2': 'b', 'option3': 'c',
+            'option4': 'd', 'correct_option': 2,
+        }
+        response = self.client.post(reverse('admin:quiz_question_add'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'Question #{original.pk} already has this text and these options.')
+        self.assertEqual(Question.objects.count(), 5)
+        # Saving the question itself is not a duplicate.
+        response = self.client.post(reverse('admin:quiz_question_change', args=[original.pk]), data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_rescore_uses_the_current_answer_key(self):
+        take_quiz(self.client, 1)
+        result = QuizResult.objects.get()
+        self.assertEqual(result.score, 2)  # questions 0 and 4 expect option 1
+        Question.objects.update(correct_option=1)
+        self.client.post(reverse('admin:quiz_quizresult_changelist'), {
+            'action': 'rescore', '_selected_action': [result.pk],
+        })
+        result.refresh_from_db()
+        self.assertEqual(result.score, 5)
+        self.assertEqual(QuizAnswer.objects.filter(is_correct=True).count(), 5)
+
+    def test_rescore_refreshes_statistics_and_leaderboard(self):
+        take_quiz(self.client, 1)
+        take_quiz(self.client, 2)
+        result = QuizResult.objects.get(score=2)
+        Question.objects.update(correct_option=1)
+        self.client.post(reverse('admin:quiz_quizresult_changelist'), {
+            'action': 'rescore', '_selected_action': [result.pk],
+        })
+        stats = UserQuizStats.objects.get(user=result.user)
+        self.assertEqual((stats.attempts, stats.score_sum, stats.max_score), (2, 6, 5))
+        self.assertEqual(UserTopicStats.objects.get(user=result.user, topic='FR').max_score, 5)
+        entries = LeaderboardEntry.objects.filter(user=result.user)
+        self.assertEqual(len(entries), 3)
+        for entry in entries:
+            self.assertEqual((entry.attempts, entry.score_sum, entry.best_percentage), (2, 6, 100.0))
+        snapshot = sorted(LeaderboardBucket.objects.filter(users__gt=0).values_list(
+            'topic', 'window', 'period', 'bucket', 'users'))
+        leaderboard.rebuild()
+        self.assertEqual(snapshot, sorted(LeaderboardBucket.objects.filter(users__gt=0).values_list(
+            'topic', 'window', 'period', 'bucket', 'users')))
@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, views
+
+if getattr(settings, 'QUIZ_ASYNC_VIEWS', False):
+    from . import async_views as quiz_views
+else:
+    quiz_views = views
 
 app_name = 'quiz'
 
@@ -8,7 +14,20 @@ urlpatterns = [
     path('signup/', views.signup, name='signup'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
-    path('quiz/', views.quiz, name='quiz'),
-    path('quiz/results/<int:result_id>/', views.results, name='results'),
-    path('history/', views.results_history, name='history'),
-]
\ No newline at end of file
+    path('topics/', views.topics, name='topics'),
+    path('quiz/', quiz_views.quiz, name='quiz'),
+    path('quiz/results/<int:result_id>/', quiz_views.results, name='results'),
+    path('quiz/results/<uuid:reference>/', quiz_views.result_by_reference, name='result_reference'),
+    path('history/', quiz_views.results_history, name='history'),
+    path('leaderboard/', views.leaderboard, name='leaderboard'),
+    path('questions/search/', views.question_search, name='question_search'),
+    path('exports/results/', views.export_results, name='export_results'),
+    path('instrumentation/', views.request_stats, name='request_stats'),
+    path('metrics/', views.metrics, name='metrics'),
+
+    # JSON API
+    path('api/quiz/start/', api.start_quiz, name='api_start'),
+    path('api/quiz/submit/', api.submit_quiz, name='api_submit'),
+    path('api/quiz/batch-submit/', api.batch_submit, name='api_batch_submit'),
+    path('api/history/', api.history, name='api_history'),
+]
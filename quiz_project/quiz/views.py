@@ -1,10 +1,33 @@
+import hmac
+
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Max, Min
-import random
-from .models import Question, QuizResult
-from .forms import SignUpForm, LoginForm, QuizForm
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
+from .models import LeaderboardEntry, Question, QuizResult, UserQuizStats, UserTopicStats
+from .forms import SignUpForm, LoginForm, QuizForm, QuizAnswerForm
+from .adaptive import choose_questions, record_answers
+from .answer_key import get_answer_key, grade_answers
+from .answers import store_result
+from .attempts import attempt_in_flight, claim_attempt, load_attempt, release_attempt, start_attempt
+from .decks import deck_pool_enabled, pop_deck
+from .exports import CONTENT_TYPES, FORMATS, InvalidExportFilter, export_queryset, iter_export
+from .instrumentation import route_stats
+from .leaderboard import METRICS, WINDOWS, render_top_entries, user_standing
+from .metrics import LOGIN_ATTEMPTS, NOT_ENOUGH_QUESTIONS, QUIZ_STARTS, QUIZ_SUBMISSIONS, REGISTRY
+from .pagination import paginate
+from .question_pool import get_topic_counts
+from .search import find_near_duplicates, search_backend, search_questions
+from .writebehind import find_pending_result, submit_result, write_behind_enabled
+
+QUESTIONS_PER_QUIZ = 5
+
+TOPICS = dict(Question.TOPIC_CHOICES)
 
 
 def home(request):
@@ -62,18 +85,71 @@ def user_login(request):
     """
     if request.method == 'POST':
         form = LoginForm(request, data=request.POST)
+        # AuthenticationForm.clean() already authenticated the user; calling
+        # authenticate() again would hash the password a second time.
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                return redirect('quiz:quiz')
+            LOGIN_ATTEMPTS.inc(outcome='success')
+            login(request, form.get_user())
+            return redirect('quiz:quiz')
+        LOGIN_ATTEMPTS.inc(outcome='failure')
     else:
         form = LoginForm()
     return render(request, 'quiz/login.html', {'form': form})
 
 
+def parse_topic(code, default=Question.DEFAULT_TOPIC):
+    """
+    Validates a topic code taken from the request.
+
+    Args:
+        code (str): Submitted topic code, possibly None
+        default: Returned when ``code`` is not a known topic
+
+    Returns:
+        str: The topic code, or ``default``
+    """
+    return code if code in TOPICS else default
+
+
+def history_querysets(user, topic=None):
+    """
+    Selects the results and statistics row shown in a user's history.
+
+    Args:
+        user (User): The user whose history is shown
+        topic (str): Topic to limit the history to, or None for all topics
+
+    Returns:
+        tuple: (QuizResult queryset, UserQuizStats or UserTopicStats queryset)
+    """
+    if topic is None:
+        return QuizResult.objects.filter(user=user), UserQuizStats.objects.filter(pk=user.pk)
+    return (
+        QuizResult.objects.filter(user=user, topic=topic),
+        UserTopicStats.objects.filter(user=user, topic=topic),
+    )
+
+
+def history_stats(user_stats):
+    """
+    Builds the statistics shown on the history page.
+
+    Args:
+        user_stats (UserQuizStats): The user's statistics row (overall or
+            for one topic), or None
+
+    Returns:
+        dict: average, highest, lowest and total_attempts
+    """
+    user_stats = user_stats or UserQuizStats()
+    return {
+        'average': user_stats.average(),
+        'highest': user_stats.max_score,
+        'lowest': user_stats.min_score,
+        'total_attempts': user_stats.attempts,
+    }
+
+
 @login_required
 def user_logout(request):
     """
@@ -97,9 +173,18 @@ def quiz(request):
     Handles quiz taking process.
 
     Behavior:
-        - GET: Generates new quiz with 5 random questions
-        - POST: Processes submitted answers and calculates score
-        - Stores question IDs in session for validation
+        - GET: Generates new quiz with 5 random (or adaptively weighted)
+          questions from the topic named by the 'topic' query parameter,
+          or pops a pre-rendered deck when QUIZ_DECK_POOL is on
+        - POST: Processes submitted answers, calculates score and stores
+          one QuizAnswer per question
+        - Stores question IDs in session for validation, or in a signed
+          attempt token embedded in the form when QUIZ_ATTEMPT_TOKENS is on
+        - Stores each attempt's result under the reference allocated when
+          the quiz started; resubmissions redirect to that result without
+          storing another
+        - With QUIZ_WRITE_BEHIND on, journals the graded result for the
+          background writer and redirects to it by reference
 
     Args:
         request (HttpRequest): The incoming request object
@@ -108,36 +193,106 @@ def quiz(request):
         HttpResponse: Quiz form, results redirect, or error page
     """
     if request.method == 'POST':
-        # Retrieve questions from session to prevent tampering
-        questions = Question.objects.filter(id__in=request.session.get('quiz_questions', []))
-        form = QuizForm(questions, request.POST)
+        # Retrieve question IDs from the session or signed token to prevent
+        # tampering; grading only needs the cached answer key.
+        attempt = load_attempt(request)
+        answer_key = get_answer_key(attempt.question_ids)
+        form = QuizAnswerForm(answer_key, request.POST)
+        valid = bool(answer_key) and form.is_valid()
+
+        if valid and claim_attempt(attempt):
+            answers = form.answers()
+            score = grade_answers(answer_key, answers)
+
+            try:
+                if write_behind_enabled():
+                    # Journal the result; it is stored with the next batch
+                    reference = submit_result(
+                        request.user, attempt.topic, score, answer_key, answers, reference=attempt.reference)
+                    QUIZ_SUBMISSIONS.inc(channel='web', outcome='graded')
+                    return redirect('quiz:result_reference', reference=reference)
+
+                # Store the result together with its per-question answers,
+                # under the reference allocated when the quiz started
+                result = store_result(
+                    request.user, attempt.topic, score, answer_key, answers, reference=attempt.reference)
+            except IntegrityError:
+                if attempt.reference is None or not QuizResult.objects.filter(
+                        reference=attempt.reference, user=request.user).exists():
+                    release_attempt(attempt)
+                    raise
+                # Stored by an earlier submission whose claim has expired
+                QUIZ_SUBMISSIONS.inc(channel='web', outcome='replayed')
+                return redirect('quiz:result_reference', reference=attempt.reference)
+            except Exception:
+                # Nothing was stored; let the user submit the attempt again
+                release_attempt(attempt)
+                raise
+            record_answers(request.user.pk, answer_key, answers)
+
+            QUIZ_SUBMISSIONS.inc(channel='web', outcome='graded')
+            return redirect('quiz:results', result_id=result.id)
+        QUIZ_SUBMISSIONS.inc(channel='web', outcome='replayed' if valid else 'invalid')
+        if valid and attempt.reference is not None:
+            # A resubmission (double click, browser or proxy retry) shows the
+            # result of the first one instead of storing another
+            return redirect('quiz:result_reference', reference=attempt.reference)
+
+    # GET request - take a pre-rendered deck from the pool when enabled, else
+    # initialize new quiz from the cached question-ID pool, weighted towards
+    # the user's weak questions when adaptive selection is on
+    topic = parse_topic(request.GET.get('topic'))
+    deck = pop_deck(topic, QUESTIONS_PER_QUIZ) if deck_pool_enabled() else None
+    if deck is not None:
+        question_ids, questions_html = deck
+        form = None
+    else:
+        selected_questions = choose_questions(request.user, topic, QUESTIONS_PER_QUIZ)
+        if selected_questions is None:
+            NOT_ENOUGH_QUESTIONS.inc(channel='web')
+            return render(request, 'quiz/not_enough_questions.html', {'topic_name': TOPICS[topic]})
+        question_ids, questions_html = [q.id for q in selected_questions], None
+        form = QuizForm(selected_questions)
+    QUIZ_STARTS.inc(channel='web')
+
+    # Remember the selected question IDs and topic for grading
+    attempt_token = start_attempt(request, question_ids, topic)
+    return render(request, 'quiz/quiz.html', {
+        'form': form,
+        'questions_html': questions_html,
+        'attempt_token': attempt_token,
+        'topic': topic,
+        'topic_name': TOPICS[topic],
+    })
 
-        if form.is_valid():
-            score = 0
-            # Calculate score by comparing answers
-            for question in questions:
-                user_answer = form.cleaned_data.get(f'question_{question.id}')
-                if user_answer and int(user_answer) == question.correct_option:
-                    score += 1
-
-            # Store results
-            result = QuizResult.objects.create(
-                user=request.user,
-                score=score,
-                total_questions=len(questions))
 
-            return redirect('quiz:results', result_id=result.id)
+@login_required
+def topics(request):
+    """
+    Lists the topics that hold questions, for the user to pick a quiz from.
 
-    # GET request - initialize new quiz
-    questions = list(Question.objects.filter(topic='FR'))
-    if len(questions) < 5:
-        return render(request, 'quiz/not_enough_questions.html')
+    Question counts come from the cached per-topic counts, so the page
+    never counts rows.
 
-    # Select 5 random questions and store IDs in session
-    selected_questions = random.sample(questions, 5)
-    request.session['quiz_questions'] = [q.id for q in selected_questions]
-    form = QuizForm(selected_questions)
-    return render(request, 'quiz/quiz.html', {'form': form})
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: Rendered topic picker
+    """
+    counts = get_topic_counts()
+    return render(request, 'quiz/topics.html', {
+        'topics': [
+            {
+                'code': code,
+                'name': name,
+                'questions': counts[code],
+                'playable': counts[code] >= QUESTIONS_PER_QUIZ,
+            }
+            for code, name in Question.TOPIC_CHOICES
+            if counts.get(code)
+        ],
+    })
 
 
 @login_required
@@ -159,35 +314,242 @@ def results(request, result_id):
     return render(request, 'quiz/results.html', {'result': result})
 
 
+@login_required
+def result_by_reference(request, reference):
+    """
+    Displays quiz results by reference, including results still waiting in
+    the write-behind journal. A resubmission that arrives while the first
+    submission is still being stored gets a page that reloads itself until
+    the result is there.
+
+    Args:
+        request (HttpRequest): The incoming request object
+        reference (UUID): Reference of the QuizResult to display
+
+    Returns:
+        HttpResponse: Rendered results page, or the pending page (202)
+
+    Raises:
+        Http404: If result doesn't exist or doesn't belong to user
+    """
+    result = find_pending_result(reference, request.user.pk)
+    if result is None:
+        result = QuizResult.objects.filter(reference=reference, user=request.user).first()
+    if result is None:
+        if attempt_in_flight(reference, request.user.pk):
+            return render(request, 'quiz/result_pending.html', status=202)
+        raise Http404("No QuizResult matches the given query.")
+    return render(request, 'quiz/results.html', {'result': result})
+
+
 @login_required
 def results_history(request):
     """
     Displays user's quiz history and statistics.
 
-    Calculates:
+    Statistics come from the user's UserQuizStats row (one primary-key
+    lookup), or their UserTopicStats row when the 'topic' query parameter
+    limits the history to one topic, rather than aggregating over every
+    result:
         - Average score across all attempts
         - Highest and lowest scores
         - Total number of attempts
 
+    Attempts are listed one keyset page at a time; the 'before' and 'after'
+    query parameters carry the cursors of the older and newer pages.
+
     Args:
         request (HttpRequest): The incoming request object
 
     Returns:
         HttpResponse: Rendered history page with stats
     """
-    results = QuizResult.objects.filter(user=request.user)
-
-    stats = {
-        'average': results.aggregate(Avg('score'))['score__avg'],
-        'highest': results.aggregate(Max('score'))['score__max'],
-        'lowest': results.aggregate(Min('score'))['score__min'],
-        'total_attempts': results.count(),
-    }
+    topic = parse_topic(request.GET.get('topic'), None)
+    results, user_stats = history_querysets(request.user, topic)
+    page = paginate(
+        results,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+    )
+    stats = history_stats(user_stats.first())
 
     return render(request, 'quiz/history.html', {
-        'results': results,
+        'results': page.items,
+        'page': page,
         'stats': stats,
+        'topic': topic,
+        'topics': [(code, TOPICS[code]) for code in sorted(get_topic_counts())],
+    })
+
+
+@login_required
+def leaderboard(request):
+    """
+    Displays the top users of one leaderboard and the current user's rank.
+
+    The 'topic', 'window' (all, month, week) and 'metric' (best, average,
+    attempts) query parameters select the board. The top-N table is served
+    from a short-lived cache of its rendered HTML; the user's rank comes
+    from the precomputed bucket histogram.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: Rendered leaderboard page
+    """
+    topic = parse_topic(request.GET.get('topic'))
+    window = request.GET.get('window')
+    if window not in WINDOWS:
+        window = 'all'
+    metric = request.GET.get('metric')
+    if metric not in METRICS:
+        metric = 'best'
+
+    entry, rank = user_standing(request.user, topic, window)
+    return render(request, 'quiz/leaderboard.html', {
+        'table': render_top_entries(topic, window, metric),
+        'entry': entry,
+        'rank': rank,
+        'topic': topic,
+        'topics': [(code, TOPICS[code]) for code in sorted(get_topic_counts())],
+        'window': window,
+        'windows': LeaderboardEntry.WINDOW_CHOICES,
+        'metric': metric,
+        'metrics': [('best', 'Best'), ('average', 'Average'), ('attempts', 'Attempts')],
+    })
+
+
+@staff_member_required
+def question_search(request):
+    """
+    Searches the question bank, for question authors looking for existing
+    questions and duplicates.
+
+    Query parameters:
+        q: Words that must all appear in the text or options
+        topic: Topic code
+        similar: ID of a question whose near duplicates are listed instead
+
+    Results are ranked by the full-text index (see quiz.search).
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: Rendered search form and results
+
+    Raises:
+        Http404: If the ``similar`` question does not exist
+    """
+    query = request.GET.get('q', '').strip()
+    topic = parse_topic(request.GET.get('topic'), None)
+    similar_to = None
+    if request.GET.get('similar', '').isdigit():
+        similar_to = get_object_or_404(Question, pk=request.GET['similar'])
+        hits = find_near_duplicates(similar_to)
+    else:
+        hits = search_questions(query, topic) if query else []
+    return render(request, 'quiz/question_search.html', {
+        'query': query,
+        'topic': topic,
+        'topics': Question.TOPIC_CHOICES,
+        'similar_to': similar_to,
+        'hits': hits,
+        'indexed': search_backend() is not None,
+    })
+
+
+@staff_member_required
+def export_results(request):
+    """
+    Streams quiz results as CSV or JSONL for reporting.
+
+    Query parameters:
+        format: 'csv' (default) or 'jsonl'
+        from, to: First and last day included (YYYY-MM-DD)
+        topic: Topic code
+        user: Username
+
+    Rows are read in chunks and encoded as they are sent, so memory use
+    does not grow with the number of results.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        StreamingHttpResponse: The export as an attachment, or 400 for
+        invalid filters
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest(f"format must be one of {', '.join(FORMATS)}", content_type='text/plain')
+    try:
+        results = export_queryset(
+            date_from=request.GET.get('from'),
+            date_to=request.GET.get('to'),
+            topic=request.GET.get('topic'),
+            username=request.GET.get('user'),
+        )
+    except InvalidExportFilter as exc:
+        # Plain text, and the messages never echo the submitted values
+        return HttpResponseBadRequest(str(exc), content_type='text/plain')
+    chunk_size = getattr(settings, 'QUIZ_EXPORT_CHUNK_SIZE', 2000)
+    return StreamingHttpResponse(
+        iter_export(fmt, results, chunk_size),
+        content_type=CONTENT_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="quiz-results.{fmt}"'},
+    )
+
+
+@staff_member_required
+def request_stats(request):
+    """
+    Returns the rolling per-route request aggregates of this worker process.
+
+    Only available when QUIZ_INSTRUMENTATION is on.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        JsonResponse: Window size and per-route latency and query statistics
+
+    Raises:
+        Http404: If instrumentation is disabled
+    """
+    if not getattr(settings, 'QUIZ_INSTRUMENTATION', False):
+        raise Http404("Request instrumentation is disabled")
+    return JsonResponse({
+        'window': getattr(settings, 'QUIZ_INSTRUMENTATION_WINDOW', 1000),
+        'routes': route_stats.snapshot(),
     })
+
+
+def metrics(request):
+    """
+    Serves every metric in the Prometheus text format.
+
+    Only answers clients whose address is listed in QUIZ_METRICS_ALLOWED_IPS
+    (localhost by default), so the endpoint is meant for a scraper running
+    next to the application. Behind a reverse proxy on the same host every
+    request comes from localhost; QUIZ_METRICS_TOKEN then makes clients
+    present ``Authorization: Bearer <token>`` as well.
+
+    Args:
+        request (HttpRequest): The incoming request object
+
+    Returns:
+        HttpResponse: text/plain exposition, or 403 for other clients
+    """
+    allowed = getattr(settings, 'QUIZ_METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        return HttpResponseForbidden()
+    token = getattr(settings, 'QUIZ_METRICS_TOKEN', None)
+    if token and not hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
 #
 # @login_required
 # def quiz(request):
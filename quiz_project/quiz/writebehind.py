@@ -0,0 +1,481 @@
+"""
+Write-behind storage of graded quiz results (``QUIZ_WRITE_BEHIND = True``).
+
+A quiz submission normally stores its result in its own transaction, so
+during submission spikes every request waits for the database write
+lock. In write-behind mode, a graded result is instead appended to a
+local journal and queued in memory. The request then redirects to the
+result's pre-allocated reference. A background thread in each process
+stores the queue with ``bulk_create`` once QUIZ_WRITE_BEHIND_BATCH_SIZE
+results are waiting or every QUIZ_WRITE_BEHIND_INTERVAL_MS milliseconds,
+whichever comes first. One transaction then serves a whole batch.
+
+Durability: the journal is an append-only JSONL file in
+QUIZ_WRITE_BEHIND_DIR. With QUIZ_WRITE_BEHIND_FSYNC (the default), each
+line is fsync'ed before the request is answered, so an acknowledged
+result survives power loss; without it, only a crash of the process. A
+process writes to its own segment files and holds a ``flock`` on them
+until their results are committed, then deletes them. Segments that are
+not locked belong to a process that died. Each writer replays them when
+it starts, and so does ``manage.py flush_result_journal``. Replays skip
+references that are already stored, so a segment that was committed but
+not yet deleted is harmless.
+
+A batch that violates a constraint (e.g. its user was deleted meanwhile)
+is retried one entry at a time, and the entries that still fail are
+moved to QUARANTINE_FILE in the journal directory and logged, so one bad
+entry never holds back the others. Other errors, such as the database
+being unreachable, leave the entries queued for the next flush.
+
+Until its batch is stored, the results page reads a result from the
+queue, or from the journal when another process took the submission.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .adaptive import record_answers
+from .answers import store_answers
+from .models import QuizResult
+from .signals import results_created
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_GLOB = 'results-*.jsonl'
+QUARANTINE_FILE = 'quarantine.jsonl'
+
+# Errors that retrying the same entry cannot fix.
+PERMANENT_ERRORS = (IntegrityError, DataError)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def journal_dir():
+    """Directory of the journal segments."""
+    return Path(getattr(settings, 'QUIZ_WRITE_BEHIND_DIR', Path(settings.BASE_DIR) / 'journal'))
+
+
+def write_behind_enabled():
+    """Whether graded results are stored by the write-behind writer."""
+    return getattr(settings, 'QUIZ_WRITE_BEHIND', False)
+
+
+@dataclass
+class PendingResult:
+    """
+    A graded attempt waiting to be stored.
+
+    Attributes:
+        reference (str): Pre-allocated QuizResult.reference, as a UUID string
+        user_id (int): User who took the quiz
+        topic (str): Topic of the quiz
+        score (int): Number of correct answers
+        date_taken (datetime): Submission time
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+    """
+    reference: str
+    user_id: int
+    topic: str
+    score: int
+    date_taken: datetime
+    answer_key: dict
+    answers: dict
+
+    def to_line(self):
+        """Encodes the attempt as one journal line."""
+        return json.dumps({
+            'reference': self.reference,
+            'user_id': self.user_id,
+            'topic': self.topic,
+            'score': self.score,
+            'date_taken': self.date_taken.isoformat(),
+            # JSON object keys are strings; pairs keep the question IDs ints.
+            'answer_key': list(self.answer_key.items()),
+            'answers': list(self.answers.items()),
+        }) + '\n'
+
+    @classmethod
+    def from_line(cls, line):
+        """
+        Decodes a journal line.
+
+        Raises:
+            ValueError: If the line is not a complete journal entry
+        """
+        try:
+            data = json.loads(line)
+            return cls(
+                reference=data['reference'],
+                user_id=data['user_id'],
+                topic=data['topic'],
+                score=data['score'],
+                date_taken=datetime.fromisoformat(data['date_taken']),
+                answer_key=dict(data['answer_key']),
+                answers=dict(data['answers']),
+            )
+        except (KeyError, TypeError) as exc:
+            raise ValueError(f"Incomplete journal entry: {exc}") from exc
+
+    def result(self):
+        """Returns the (unsaved) QuizResult of the attempt."""
+        return QuizResult(
+            reference=uuid.UUID(self.reference),
+            user_id=self.user_id,
+            topic=self.topic,
+            score=self.score,
+            total_questions=len(self.answer_key),
+            date_taken=self.date_taken,
+        )
+
+
+def read_journal(stream):
+    """
+    Reads the entries of a journal segment.
+
+    A torn last line (the process died while writing it, before the
+    submission was acknowledged) is skipped.
+
+    Returns:
+        list: PendingResult entries in journal order
+    """
+    entries = []
+    for line in stream:
+        try:
+            entries.append(PendingResult.from_line(line))
+        except ValueError:
+            logger.warning("Skipping unreadable journal line in %s", getattr(stream, 'name', stream))
+    return entries
+
+
+def store_pending(entries):
+    """
+    Stores journaled results that are not stored yet.
+
+    Results, their answers and the derived statistics are written in one
+    transaction; mastery rows for adaptive selection follow it.
+
+    Args:
+        entries (list): PendingResult entries
+
+    Returns:
+        list: The QuizResult instances created
+    """
+    with transaction.atomic():
+        stored = set(QuizResult.objects.filter(
+            reference__in=[entry.reference for entry in entries],
+        ).values_list('reference', flat=True))
+        # A resubmitted attempt may be journaled twice; keep its first entry.
+        unique = {}
+        for entry in entries:
+            unique.setdefault(entry.reference, entry)
+        entries = [entry for reference, entry in unique.items() if uuid.UUID(reference) not in stored]
+        results = QuizResult.objects.bulk_create([entry.result() for entry in entries])
+        store_answers((result, entry.answer_key, entry.answers) for result, entry in zip(results, entries))
+        # bulk_create sends no post_save.
+        results_created(results)
+    for entry in entries:
+        record_answers(entry.user_id, entry.answer_key, entry.answers)
+    return results
+
+
+def _lock_segment(stream):
+    """Takes the segment's lock without waiting; False if another process holds it."""
+    try:
+        fcntl.flock(stream, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class ResultWriter:
+    """
+    Journal and queue of one process.
+
+    Args:
+        directory (Path): Directory of the journal segments
+        batch_size (int): Results that trigger a flush
+        interval (float): Seconds between flushes of a partial batch
+        fsync (bool): fsync every journal line before acknowledging it
+    """
+
+    def __init__(self, directory, batch_size=200, interval=0.05, fsync=True):
+        self.directory = Path(directory)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._flushing = []
+        self._segment = None
+        self._closed_segments = []
+        self._thread = None
+        self._stopping = False
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'results-{os.getpid()}-{uuid.uuid4().hex}.jsonl'
+        stream = open(path, 'a', encoding='utf-8')
+        _lock_segment(stream)
+        return stream
+
+    def submit(self, entry):
+        """Journals an entry and queues it for the next flush."""
+        line = entry.to_line()
+        with self._lock:
+            if self._segment is None:
+                self._segment = self._open_segment()
+            self._segment.write(line)
+            self._segment.flush()
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.notify()
+
+    def find(self, reference):
+        """Returns the queued entry with this reference, or None."""
+        with self._lock:
+            for entry in (*self._flushing, *self._pending):
+                if entry.reference == reference:
+                    return entry
+        return None
+
+    def quarantine(self, entry):
+        """Sets aside an entry that cannot be stored, keeping it for inspection."""
+        logger.error("Quarantining quiz result %s, which cannot be stored", entry.reference, exc_info=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / QUARANTINE_FILE, 'a', encoding='utf-8') as stream:
+            stream.write(entry.to_line())
+            stream.flush()
+            if self.fsync:
+                os.fsync(stream.fileno())
+
+    def _store(self, entries):
+        """
+        Stores entries in batches, removing them from the list as they are handled.
+
+        A batch failing with one of PERMANENT_ERRORS is retried entry by
+        entry, and entries that fail on their own are quarantined. Other
+        errors propagate and leave the unhandled entries in ``entries``.
+
+        Args:
+            entries (list): PendingResult entries, consumed from the front
+        """
+        while entries:
+            chunk = entries[:self.batch_size]
+            try:
+                store_pending(chunk)
+            except PERMANENT_ERRORS:
+                for entry in chunk:
+                    try:
+                        store_pending([entry])
+                    except PERMANENT_ERRORS:
+                        self.quarantine(entry)
+                    del entries[0]
+            else:
+                del entries[:len(chunk)]
+
+    def flush(self):
+        """
+        Stores every queued entry, then deletes their journal segments.
+
+        Entries that can never be stored are quarantined. On any other
+        failure the unstored entries stay queued and the segments stay on
+        disk, so the next flush retries them.
+
+        Returns:
+            int: Number of entries flushed
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                segments, self._closed_segments = self._closed_segments, []
+                if self._segment is not None:
+                    segments.append(self._segment)
+                    self._segment = None
+                self._flushing = batch
+            remaining = list(batch)
+            try:
+                self._store(remaining)
+            except BaseException:
+                with self._lock:
+                    self._pending[:0] = remaining
+                    self._closed_segments[:0] = segments
+                    self._flushing = []
+                raise
+            with self._lock:
+                self._flushing = []
+            for segment in segments:
+                Path(segment.name).unlink(missing_ok=True)
+                segment.close()
+            return len(batch)
+
+    def replay_orphans(self):
+        """
+        Stores the entries of segments left behind by dead processes.
+
+        Returns:
+            int: Number of entries read from orphaned segments
+        """
+        replayed = 0
+        for path in sorted(self.directory.glob(SEGMENT_GLOB)):
+            try:
+                stream = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # Replayed by another process meanwhile.
+            with stream:
+                if not _lock_segment(stream):
+                    continue  # A live writer's segment.
+                entries = read_journal(stream)
+                self._store(list(entries))
+                path.unlink(missing_ok=True)
+            replayed += len(entries)
+        if replayed:
+            logger.info("Replayed %d journaled quiz results", replayed)
+        return replayed
+
+    def start(self):
+        """Starts the background flusher, which first replays orphaned segments."""
+        self._thread = threading.Thread(target=self._run, name='quiz-result-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stops the flusher after a last flush."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        self._guarded(self.replay_orphans)
+        while True:
+            with self._lock:
+                self._wakeup.wait_for(
+                    lambda: len(self._pending) >= self.batch_size or self._stopping, timeout=self.interval)
+                stopping = self._stopping
+            flushed = self._guarded(self.flush)
+            if stopping:
+                return  # Whatever the last flush left is replayed from the journal.
+            if not flushed:
+                time.sleep(self.interval)  # Back off before retrying.
+
+    def _guarded(self, work):
+        """Runs flusher work with fresh connections; False if it failed."""
+        close_old_connections()
+        try:
+            work()
+        except Exception:
+            logger.exception("Write-behind flush failed; the entries stay journaled")
+            return False
+        finally:
+            close_old_connections()
+        return True
+
+
+def get_writer():
+    """Returns this process's writer, starting it on first use."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                if fcntl is None:
+                    raise ImproperlyConfigured("QUIZ_WRITE_BEHIND needs fcntl to lock its journal")
+                writer = ResultWriter(
+                    journal_dir(),
+                    batch_size=getattr(settings, 'QUIZ_WRITE_BEHIND_BATCH_SIZE', 200),
+                    interval=getattr(settings, 'QUIZ_WRITE_BEHIND_INTERVAL_MS', 50) / 1000,
+                    fsync=getattr(settings, 'QUIZ_WRITE_BEHIND_FSYNC', True),
+                )
+                writer.start()
+                _writer = writer
+    return _writer
+
+
+def submit_result(user, topic, score, answer_key, answers, reference=None):
+    """
+    Journals a graded attempt for the write-behind writer.
+
+    Args:
+        user (User): User who took the quiz
+        topic (str): Topic of the quiz
+        score (int): Number of correct answers
+        answer_key (dict): {question_id: correct_option}
+        answers (dict): {question_id: chosen_option}
+        reference (str): Reference allocated when the attempt started;
+            a new one when omitted
+
+    Returns:
+        str: Reference of the result, valid before it is stored
+    """
+    entry = PendingResult(
+        reference=str(reference or uuid.uuid4()),
+        user_id=user.pk,
+        topic=topic,
+        score=score,
+        date_taken=timezone.now(),
+        answer_key=answer_key,
+        answers=answers,
+    )
+    get_writer().submit(entry)
+    return entry.reference
+
+
+def find_pending_result(reference, user_id):
+    """
+    Looks up a result that was submitted but may not be stored yet.
+
+    Checks this process's queue, then the journal segments of every
+    process. Call it before querying the table: an entry flushed after the
+    table was queried would otherwise be found in neither.
+
+    Args:
+        reference (UUID): Reference of the result
+        user_id (int): Only a result of this user is returned
+
+    Returns:
+        QuizResult: Unsaved result, or None if it is not pending (or
+        write-behind is off)
+    """
+    if not write_behind_enabled():
+        return None
+    reference = str(reference)
+    entry = _writer.find(reference) if _writer is not None else None
+    if entry is None:
+        for path in journal_dir().glob(SEGMENT_GLOB):
+            try:
+                with open(path, encoding='utf-8') as stream:
+                    line = next((line for line in stream if reference in line), None)
+            except FileNotFoundError:
+                continue
+            if line is not None:
+                try:
+                    entry = PendingResult.from_line(line)
+                except ValueError:
+                    continue
+                break
+    if entry is None or entry.user_id != user_id:
+        return None
+    return entry.result()
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quiz.middleware.InstrumentationMiddleware',
+    'quiz.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,13 +54,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quiz.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'quiz_project.urls'
 
+# The Django template engine, with render times reported to the request
+# instrumentation (see QUIZ_INSTRUMENTATION below).
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'quiz.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,  # This should be True
         'OPTIONS': {
@@ -75,12 +84,60 @@ WSGI_APPLICATION = 'quiz_project.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# The profile is picked with QUIZ_DB_PROFILE:
+#   sqlite   - (default) file database tuned for concurrent writers: WAL
+#              journal, synchronous=NORMAL, a busy timeout, memory-mapped
+#              reads and BEGIN IMMEDIATE write transactions. The PRAGMAs are
+#              applied by a connection_created hook (quiz/db.py).
+#   postgres - PostgreSQL with persistent, health-checked connections, or a
+#              psycopg connection pool when QUIZ_DB_POOL_MAX_SIZE is set.
+
+QUIZ_DB_PROFILE = os.environ.get('QUIZ_DB_PROFILE', 'sqlite')
+
+if QUIZ_DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('QUIZ_DB_NAME', 'quiz'),
+            'USER': os.environ.get('QUIZ_DB_USER', ''),
+            'PASSWORD': os.environ.get('QUIZ_DB_PASSWORD', ''),
+            'HOST': os.environ.get('QUIZ_DB_HOST', ''),
+            'PORT': os.environ.get('QUIZ_DB_PORT', ''),
+            'CONN_MAX_AGE': int(os.environ.get('QUIZ_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('QUIZ_DB_POOL_MAX_SIZE'):
+        # Pooled connections replace persistent ones (requires psycopg[pool]).
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('QUIZ_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['QUIZ_DB_POOL_MAX_SIZE']),
+        }
+elif QUIZ_DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('QUIZ_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('QUIZ_DB_CONN_MAX_AGE', 600)),
+            'OPTIONS': {
+                # Seconds to wait for the write lock before "database is locked"
+                'timeout': int(os.environ.get('QUIZ_SQLITE_BUSY_TIMEOUT', 20)),
+                # Take the write lock up front, so a transaction never has to
+                # upgrade from reading to writing (which fails immediately).
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    QUIZ_SQLITE_PRAGMAS = {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'busy_timeout': DATABASES['default']['OPTIONS']['timeout'] * 1000,
+        'mmap_size': int(os.environ.get('QUIZ_SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
     }
-}
+else:
+    raise ImproperlyConfigured(f"Unknown QUIZ_DB_PROFILE {QUIZ_DB_PROFILE!r}")
 
 
 # Password validation
@@ -101,6 +158,19 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. The first hasher creates new hashes; the others only
+# verify existing ones. ProfiledPBKDF2PasswordHasher replaces Django's
+# PBKDF2PasswordHasher (same algorithm name) and takes its work factor from
+# QUIZ_PASSWORD_PROFILE (see quiz/hashers.py).
+
+PASSWORD_HASHERS = [
+    'quiz.hashers.ProfiledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -123,3 +193,171 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Quiz attempts
+# Keep the questions of an in-progress quiz in a signed token embedded in the
+# quiz form instead of the session, so starting a quiz writes nothing to the
+# session table. Replay protection relies on the cache, so use a cache shared
+# by all workers when enabling this.
+
+QUIZ_ATTEMPT_TOKENS = False
+
+QUIZ_ATTEMPT_TOKEN_MAX_AGE = 60 * 60  # seconds
+
+# Serve the quiz, results and history pages with native async views
+# (quiz/async_views.py). Only worthwhile when deployed through asgi.py.
+
+QUIZ_ASYNC_VIEWS = False
+
+# Largest number of attempts accepted by the JSON batch-submit endpoint.
+
+QUIZ_API_MAX_BATCH_SIZE = 100
+
+# Seconds a rendered leaderboard top-N table is cached. Rankings are kept up
+# to date on every result; only the rendered table lags by up to this long.
+
+QUIZ_LEADERBOARD_CACHE_TIMEOUT = 60
+
+# Per-request SQL and timing instrumentation (quiz/middleware.py). Adds a
+# Server-Timing header to every response and keeps the last
+# QUIZ_INSTRUMENTATION_WINDOW requests of each route for the staff-only
+# /instrumentation/ endpoint. Requests issuing more than
+# QUIZ_INSTRUMENTATION_QUERY_WARNING queries are logged as warnings.
+
+QUIZ_INSTRUMENTATION = os.environ.get('QUIZ_INSTRUMENTATION', '') == '1'
+
+QUIZ_INSTRUMENTATION_WINDOW = 1000
+
+QUIZ_INSTRUMENTATION_QUERY_WARNING = 20
+
+# Prometheus metrics served at /metrics/ to QUIZ_METRICS_ALLOWED_IPS only.
+# The check reads REMOTE_ADDR: behind a reverse proxy on the same host every
+# request comes from 127.0.0.1, so either block /metrics/ at the proxy or
+# set QUIZ_METRICS_TOKEN, which scrapers then send as
+# "Authorization: Bearer <token>". With several worker processes, point
+# QUIZ_METRICS_DIR at a directory shared by them (emptied on each deploy);
+# every worker writes its values there at most every
+# QUIZ_METRICS_FLUSH_INTERVAL seconds.
+
+QUIZ_METRICS = True
+
+QUIZ_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+QUIZ_METRICS_TOKEN = os.environ.get('QUIZ_METRICS_TOKEN') or None
+
+QUIZ_METRICS_DIR = os.environ.get('QUIZ_METRICS_DIR') or None
+
+QUIZ_METRICS_FLUSH_INTERVAL = 5
+
+# Production profiling (quiz/profiling.py). Profiles every
+# QUIZ_PROFILING_SAMPLE_RATE-th request (0 = none) plus requests from staff
+# users carrying the QUIZ_PROFILING_HEADER header. Summarize the collected
+# profiles with "manage.py profile_summary".
+
+QUIZ_PROFILING = os.environ.get('QUIZ_PROFILING', '') == '1'
+
+QUIZ_PROFILING_MODE = os.environ.get('QUIZ_PROFILING_MODE', 'cprofile')  # or 'sampler'
+
+QUIZ_PROFILING_SAMPLE_RATE = int(os.environ.get('QUIZ_PROFILING_SAMPLE_RATE', 0))
+
+QUIZ_PROFILING_HEADER = 'X-Quiz-Profile'
+
+QUIZ_PROFILING_INTERVAL = 0.001  # seconds between stack samples
+
+QUIZ_PROFILING_DIR = os.environ.get('QUIZ_PROFILING_DIR', BASE_DIR / 'profiles')
+
+QUIZ_PROFILING_MAX_FILES = 200
+
+# Adaptive question selection (quiz/adaptive.py): draw quizzes weighted
+# towards questions the user misses or has not seen recently. The cached
+# weights of a user and topic only cover the questions the user answered;
+# QUIZ_ADAPTIVE_CACHE_SIZE bounds how many stay in memory per process.
+
+QUIZ_ADAPTIVE_SELECTION = False
+
+QUIZ_ADAPTIVE_CACHE_SIZE = 1024
+
+QUIZ_ADAPTIVE_TREE_TIMEOUT = 60 * 60  # seconds before weights are rebuilt
+
+# Rows fetched per database round trip by the streaming result exports
+# (/exports/results/ and "manage.py export_results").
+
+QUIZ_EXPORT_CHUNK_SIZE = 2000
+
+# PBKDF2 work factor of password hashes: 'django' (Django's default,
+# 1,000,000 iterations in Django 5.2) or 'owasp' (600,000 iterations, the
+# OWASP minimum). Stored hashes are rehashed to the selected work factor on
+# next login, so 'owasp' lowers the work factor of existing hashes as well.
+
+QUIZ_PASSWORD_PROFILE = os.environ.get('QUIZ_PASSWORD_PROFILE', 'django')
+
+# Memory-mapped question snapshot (quiz/snapshot.py), built with
+# "manage.py build_question_snapshot". When the file exists, quizzes are
+# drawn and graded from it without ORM queries. Workers check for a new
+# file every QUIZ_SNAPSHOT_CHECK_INTERVAL seconds. Question changes mark
+# it stale (workers read the database meanwhile) and rebuild it in the
+# background QUIZ_SNAPSHOT_REBUILD_DELAY seconds later.
+
+QUIZ_SNAPSHOT_PATH = os.environ.get('QUIZ_SNAPSHOT_PATH') or None
+
+QUIZ_SNAPSHOT_CHECK_INTERVAL = 1
+
+QUIZ_SNAPSHOT_REBUILD_DELAY = 1
+
+# Write-behind result storage (quiz/writebehind.py). Graded results are
+# journaled to QUIZ_WRITE_BEHIND_DIR and stored by a background thread per
+# process, QUIZ_WRITE_BEHIND_BATCH_SIZE rows at a time or every
+# QUIZ_WRITE_BEHIND_INTERVAL_MS. Without QUIZ_WRITE_BEHIND_FSYNC, results
+# acknowledged just before a power loss can be lost. Run
+# "manage.py flush_result_journal" after a crash or on deploy.
+
+QUIZ_WRITE_BEHIND = os.environ.get('QUIZ_WRITE_BEHIND', '') == '1'
+
+QUIZ_WRITE_BEHIND_DIR = os.environ.get('QUIZ_WRITE_BEHIND_DIR', BASE_DIR / 'journal')
+
+QUIZ_WRITE_BEHIND_BATCH_SIZE = 200
+
+QUIZ_WRITE_BEHIND_INTERVAL_MS = 50
+
+QUIZ_WRITE_BEHIND_FSYNC = True
+
+# Pre-generated quiz decks (quiz/decks.py). Quiz starts pop a pre-rendered
+# deck of questions from the cache instead of drawing one inline. Each
+# topic keeps up to QUIZ_DECK_POOL_SIZE decks; a pop that leaves fewer
+# than QUIZ_DECK_POOL_LOW_WATER starts a background refill. Fill the pool
+# ahead of traffic with "manage.py fill_deck_pool" (with the default local
+# memory cache, every worker process fills its own pool on first use).
+# Ignored with adaptive selection.
+
+QUIZ_DECK_POOL = os.environ.get('QUIZ_DECK_POOL', '') == '1'
+
+QUIZ_DECK_POOL_SIZE = 200
+
+QUIZ_DECK_POOL_LOW_WATER = 50
+
+QUIZ_DECK_TIMEOUT = 60 * 60  # seconds a deck may wait in the cache
+
+# Cache holding question pools, answer keys, decks and leaderboards. Each
+# process gets its own memory cache unless QUIZ_REDIS_URL points the
+# workers at a shared Redis (requires the redis package). Either way,
+# entries derived from the question bank are scoped by the version row in
+# the database, re-read by each worker every
+# QUIZ_BANK_VERSION_CHECK_INTERVAL seconds, so no worker serves a stale
+# bank for longer than that.
+
+if os.environ.get('QUIZ_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['QUIZ_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+QUIZ_BANK_VERSION_CHECK_INTERVAL = 1
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quiz_project.settings')
 
 application = get_wsgi_application()
+
+# Load the answer key before the worker takes traffic, so grading
+# submissions needs no reads against the question table.
+from quiz.answer_key import warm_answer_keys  # noqa: E402
+
+warm_answer_keys()